@@ -0,0 +1,164 @@
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # optional: reports.py keeps its pure-Python path
+    np = None
+
+import movies
+
+_EPOCH = datetime(1970, 1, 1)
+_MISSING_TS = -(2**62)  # unparseable datetimes never fall inside a period
+
+
+def available() -> bool:
+    return np is not None
+
+
+def _epoch_seconds(value: Optional[str], cache: Dict[str, int]) -> int:
+    ts = cache.get(value)
+    if ts is None:
+        dt = movies.parse_showtime_datetime(value)
+        ts = cache[value] = int((dt - _EPOCH).total_seconds()) if dt else _MISSING_TS
+    return ts
+
+
+def _codes(values: List, labels: Dict) -> List[int]:
+    return [labels.setdefault(value, len(labels)) for value in values]
+
+
+class BookingColumns:
+    """Bookings and showtimes projected into NumPy arrays for vectorised reports.
+
+    Showtimes become a dimension table (categorical movie/screen/language
+    codes, start time); bookings become fact columns (showtime
+    code, showtime epoch seconds, total in cents, seat count, active flag
+    and seats per zone). Build once, e.g. for a month-end run, and query as
+    often as needed; rebuild after the data changes. ``reports`` uses it when
+    passed as ``columns=``.
+    """
+
+    def __init__(self, bookings: List[Dict], showtimes: List[Dict], seat_maps: Optional[Dict] = None):
+        if np is None:
+            raise ImportError("numpy is required for columnar analytics")
+        ts_cache: Dict[str, int] = {}
+        self.showtime_ids = [st.get("id") for st in showtimes]
+        showtime_code = {sid: i for i, sid in enumerate(self.showtime_ids)}
+        movie_labels: Dict = {}
+        screen_labels: Dict = {}
+        language_labels: Dict = {}
+        self.st_movie = np.array(_codes([st.get("movie_id") for st in showtimes], movie_labels), dtype=np.int32)
+        self.st_screen = np.array(_codes([st.get("screen") for st in showtimes], screen_labels), dtype=np.int32)
+        self.st_language = np.array(_codes([st.get("language") for st in showtimes], language_labels), dtype=np.int32)
+        self.st_ts = np.array([_epoch_seconds(st.get("datetime"), ts_cache) for st in showtimes], dtype=np.int64)
+        self.movies = list(movie_labels)
+        self.screens = list(screen_labels)
+        self.languages = list(language_labels)
+
+        n = len(bookings)
+        unknown = len(self.showtime_ids)  # bookings of unknown showtimes get this code
+        self.showtime = np.fromiter(
+            (showtime_code.get(b.get("showtime_id"), unknown) for b in bookings), dtype=np.int32, count=n
+        )
+        self.ts = np.fromiter(
+            (_epoch_seconds(b.get("showtime_snapshot", {}).get("datetime"), ts_cache) for b in bookings),
+            dtype=np.int64,
+            count=n,
+        )
+        self.cents = np.fromiter(
+            (int(round(float(b.get("pricing", {}).get("total", 0)) * 100)) for b in bookings), dtype=np.int64, count=n
+        )
+        self.seats = np.fromiter((len(b.get("seats", [])) for b in bookings), dtype=np.int32, count=n)
+        self.active = np.fromiter((b.get("status") == "active" for b in bookings), dtype=bool, count=n)
+        # seats a seat-map reset released: sold, but no longer reserved
+        self.voided = np.fromiter((bool(b.get("seats_voided")) for b in bookings), dtype=bool, count=n)
+
+        zone_labels: Dict = {}
+        rows, cols = [], []
+        for i, b in enumerate(bookings):
+            seat_map = seat_maps.get(b.get("showtime_id")) if seat_maps else None
+            for code in b.get("seats", []):
+                zone = seat_map[code].get("zone") if seat_map is not None and code in seat_map else "standard"
+                rows.append(i)
+                cols.append(zone_labels.setdefault(zone, len(zone_labels)))
+        self.zones = list(zone_labels)
+        self.zone_seats = np.zeros((n, len(self.zones)), dtype=np.int32)
+        np.add.at(self.zone_seats, (np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)), 1)
+
+    def _mask(self, start_dt: Optional[datetime] = None, end_dt: Optional[datetime] = None, ts=None):
+        ts = self.ts if ts is None else ts
+        mask = self.active.copy()
+        if start_dt is not None and start_dt != datetime.min:
+            mask &= ts >= int((start_dt - _EPOCH).total_seconds())
+        if end_dt is not None and end_dt != datetime.max:
+            mask &= ts <= int((end_dt - _EPOCH).total_seconds())
+        return mask
+
+    def revenue_between(self, start_dt: datetime, end_dt: datetime) -> Tuple[int, int]:
+        """(cents, booking count) of active bookings for showtimes in [start_dt, end_dt]."""
+        mask = self._mask(start_dt, end_dt)
+        return int(self.cents[mask].sum()), int(mask.sum())
+
+    def seats_by_movie(self, start_dt: Optional[datetime] = None, end_dt: Optional[datetime] = None) -> Dict[str, int]:
+        """Seats sold per movie for showtimes (by their current time) in [start_dt, end_dt]."""
+        known = self.showtime < len(self.showtime_ids)
+        # unknown showtimes index the sentinel appended to st_ts and are masked out by ``known``
+        st_ts = np.append(self.st_ts, _MISSING_TS)[self.showtime]
+        mask = self._mask(start_dt, end_dt, st_ts) & known
+        movie = self.st_movie[self.showtime[mask]]
+        counts = np.bincount(movie, weights=self.seats[mask], minlength=len(self.movies))
+        return {self.movies[i]: int(counts[i]) for i in np.flatnonzero(counts)}
+
+    def showtime_counts(self) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """(reserved seats, active bookings) per showtime id."""
+        size = len(self.showtime_ids) + 1
+        codes = self.showtime[self.active]
+        reserved = np.bincount(codes, weights=np.where(self.voided, 0, self.seats)[self.active], minlength=size)
+        count = np.bincount(codes, minlength=size)
+        return (
+            {sid: int(reserved[i]) for i, sid in enumerate(self.showtime_ids)},
+            {sid: int(count[i]) for i, sid in enumerate(self.showtime_ids)},
+        )
+
+    def breakdown(self, by: str, start_dt: Optional[datetime] = None, end_dt: Optional[datetime] = None) -> Dict:
+        """Revenue, bookings and seats of active bookings grouped by day, screen, language, movie or zone."""
+        mask = self._mask(start_dt, end_dt)
+        if by == "zone":
+            zone_seats = self.zone_seats[mask]
+            seats = self.seats[mask]
+            share = np.divide(zone_seats, seats[:, None], out=np.zeros(zone_seats.shape), where=seats[:, None] > 0)
+            revenue = (self.cents[mask][:, None] * share).sum(axis=0)
+            return {
+                zone: _row(revenue[j], int((zone_seats[:, j] > 0).sum()), int(zone_seats[:, j].sum()))
+                for j, zone in enumerate(self.zones)
+                if zone_seats[:, j].any()
+            }
+        if by == "day":
+            mask &= self.ts != _MISSING_TS
+            days, group = np.unique(self.ts[mask] // 86400, return_inverse=True)
+            labels = [(_EPOCH + timedelta(days=int(d))).date().isoformat() for d in days]
+        elif by in ("screen", "language", "movie"):
+            mask &= self.showtime < len(self.showtime_ids)
+            dimension = {"screen": self.st_screen, "language": self.st_language, "movie": self.st_movie}[by]
+            labels = {"screen": self.screens, "language": self.languages, "movie": self.movies}[by]
+            group = dimension[self.showtime[mask]]
+        else:
+            raise ValueError(f"Unknown breakdown: {by}")
+        size = len(labels)
+        revenue = np.bincount(group, weights=self.cents[mask], minlength=size)
+        count = np.bincount(group, minlength=size)
+        seats = np.bincount(group, weights=self.seats[mask], minlength=size)
+        return {labels[i]: _row(revenue[i], int(count[i]), int(seats[i])) for i in np.flatnonzero(count)}
+
+
+def _row(cents: float, bookings: int, seats: int) -> Dict:
+    return {"revenue": round(float(cents) / 100, 2), "bookings": bookings, "seats": seats}
+
+
+def build_columns(bookings: List[Dict], showtimes: List[Dict], seat_maps: Optional[Dict] = None) -> Optional[BookingColumns]:
+    """Columns for ``reports``' ``columns=`` argument, or None without NumPy (pure-Python fallback)."""
+    if np is None:
+        return None
+    return BookingColumns(bookings, showtimes, seat_maps)
+
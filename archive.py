@@ -0,0 +1,147 @@
+import functools
+import gzip
+import json
+import os
+from datetime import datetime
+from typing import List, Dict, Iterator, Optional, Tuple
+
+import movies
+
+
+def partition_path(archive_dir: str, month: str) -> str:
+    return os.path.join(archive_dir, f"{month}.json.gz")
+
+
+def months_between(start_dt: datetime, end_dt: datetime) -> List[str]:
+    """Every 'YYYY-MM' from start_dt's month to end_dt's, inclusive."""
+    months = []
+    year, month = start_dt.year, start_dt.month
+    while (year, month) <= (end_dt.year, end_dt.month):
+        months.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def archive_past(store, archive_dir: str, now: Optional[datetime] = None) -> Dict[str, int]:
+    """Move showtimes that have started, with their seat maps and bookings, into monthly partitions.
+
+    Partitions are gzip'ed JSON files (``YYYY-MM.json.gz``) written via a temp
+    file and left read-only; archiving into a month that already has one
+    rewrites it with the union. The store drops the records only after the
+    partitions are on disk. Returns counts of what was moved.
+    """
+    now = now or datetime.now()
+    past = []
+    for st in store.showtimes:
+        start = movies.parse_showtime_datetime(st.get("datetime"))
+        if start is not None and start < now:
+            past.append(st.get("id"))
+    if not past:
+        return {"showtimes": 0, "bookings": 0, "partitions": 0}
+
+    counts = {}
+
+    def write(showtimes: List[Dict], seat_maps: Dict, bookings: List[Dict]) -> None:
+        by_month: Dict[str, Dict] = {}
+        month_of = {}
+        for st in showtimes:
+            month = movies.parse_showtime_datetime(st.get("datetime")).strftime("%Y-%m")
+            month_of[st["id"]] = month
+            part = by_month.setdefault(month, {"showtimes": [], "seat_maps": {}, "bookings": []})
+            part["showtimes"].append(st)
+            part["seat_maps"][st["id"]] = seat_maps[st["id"]].to_dict() if st["id"] in seat_maps else {}
+        for booking in bookings:
+            by_month[month_of[booking["showtime_id"]]]["bookings"].append(booking)
+        os.makedirs(archive_dir, exist_ok=True)
+        for month, part in by_month.items():
+            _write_partition(archive_dir, month, part)
+        counts.update(showtimes=len(showtimes), bookings=len(bookings), partitions=len(by_month))
+
+    store.archive_showtimes(past, write)
+    return counts
+
+
+def _write_partition(archive_dir: str, month: str, part: Dict) -> None:
+    path = partition_path(archive_dir, month)
+    if os.path.exists(path):
+        old = load_partition(path)
+        new_ids = {st["id"] for st in part["showtimes"]}
+        part = {
+            "showtimes": [st for st in old["showtimes"] if st["id"] not in new_ids] + part["showtimes"],
+            "seat_maps": {**old["seat_maps"], **part["seat_maps"]},
+            "bookings": [b for b in old["bookings"] if b["showtime_id"] not in new_ids] + part["bookings"],
+        }
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(dict(part, month=month), f, ensure_ascii=False, separators=(",", ":"))
+    with open(tmp_path, "rb") as f:
+        os.fsync(f.fileno())
+    os.chmod(tmp_path, 0o444)
+    if os.path.exists(path):
+        # Windows refuses to replace a read-only file
+        os.chmod(path, 0o644)
+    os.replace(tmp_path, path)
+
+
+def load_partition(path: str) -> Dict:
+    """Read one monthly partition (cached while the file is unchanged)."""
+    st = os.stat(path)
+    return _load_partition(path, st.st_mtime_ns, st.st_size)
+
+
+@functools.lru_cache(maxsize=24)
+def _load_partition(path: str, mtime_ns: int, size: int) -> Dict:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def iter_partitions(
+    archive_dir: str, start_dt: Optional[datetime] = None, end_dt: Optional[datetime] = None
+) -> Iterator[Dict]:
+    """Yield the partitions for the months [start_dt, end_dt] touches (all of them if open-ended)."""
+    if not archive_dir or not os.path.isdir(archive_dir):
+        return
+    if start_dt is not None and end_dt is not None:
+        months = months_between(start_dt, end_dt)
+    else:
+        months = sorted(name[: -len(".json.gz")] for name in os.listdir(archive_dir) if name.endswith(".json.gz"))
+        if start_dt is not None:
+            months = [m for m in months if m >= start_dt.strftime("%Y-%m")]
+        if end_dt is not None:
+            months = [m for m in months if m <= end_dt.strftime("%Y-%m")]
+    for month in months:
+        path = partition_path(archive_dir, month)
+        if os.path.exists(path):
+            yield load_partition(path)
+
+
+def revenue_between(archive_dir: str, start_dt: datetime, end_dt: datetime) -> Tuple[int, int]:
+    """(cents, booking count) of archived active bookings for showtimes in [start_dt, end_dt]."""
+    cents = count = 0
+    for part in iter_partitions(archive_dir, start_dt, end_dt):
+        for b in part["bookings"]:
+            if b.get("status") != "active":
+                continue
+            show_dt = movies.parse_showtime_datetime(b.get("showtime_snapshot", {}).get("datetime"))
+            if show_dt is not None and start_dt <= show_dt <= end_dt:
+                cents += int(round(float(b.get("pricing", {}).get("total", 0)) * 100))
+                count += 1
+    return cents, count
+
+
+def seats_by_movie(
+    archive_dir: str, start_dt: Optional[datetime] = None, end_dt: Optional[datetime] = None
+) -> Dict[str, int]:
+    """Seats sold per movie across archived showtimes in [start_dt, end_dt] (open-ended if None)."""
+    counter: Dict[str, int] = {}
+    for part in iter_partitions(archive_dir, start_dt, end_dt):
+        in_range = {}
+        for st in part["showtimes"]:
+            show_dt = movies.parse_showtime_datetime(st.get("datetime"))
+            if (start_dt is None or show_dt >= start_dt) and (end_dt is None or show_dt <= end_dt):
+                in_range[st["id"]] = st.get("movie_id")
+        for b in part["bookings"]:
+            movie_id = in_range.get(b.get("showtime_id"))
+            if movie_id is not None and b.get("status") == "active":
+                counter[movie_id] = counter.get(movie_id, 0) + len(b.get("seats", []))
+    return counter
@@ -0,0 +1,294 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Dict, Iterator, Optional
+
+import binary_snapshot
+import journal
+import movies
+import storage
+
+OBJECTS_DIR = "objects"
+MANIFESTS_DIR = "manifests"
+# records per chunk on average; boundaries are picked from record ids, so an
+# insert or change only rewrites the chunk around it
+CHUNK_RECORDS = 256
+SECTIONS = ("movies", "showtimes", "seat_maps", "bookings", "journal")
+
+
+class _ChunkWriter:
+    """Groups records into content-addressed JSONL objects, writing only unseen ones."""
+
+    def __init__(self, backup_dir: str, compress: bool, avg_records: int):
+        self.objects_dir = os.path.join(backup_dir, OBJECTS_DIR)
+        self.compress = compress
+        self.avg_records = avg_records
+        self.stats = {"chunks": 0, "new_chunks": 0, "bytes_written": 0}
+        self._lines: List[str] = []
+        self._hashes: List[str] = []
+
+    def add(self, key: str, record) -> None:
+        self._lines.append(json.dumps(record, ensure_ascii=False, sort_keys=True, separators=(",", ":")))
+        if zlib.crc32(str(key).encode("utf-8")) % self.avg_records == 0 or len(self._lines) >= 4 * self.avg_records:
+            self._cut()
+
+    def finish(self) -> List[str]:
+        """Close the current section; returns its chunk hashes in order."""
+        self._cut()
+        hashes, self._hashes = self._hashes, []
+        return hashes
+
+    def _cut(self) -> None:
+        if not self._lines:
+            return
+        raw = ("\n".join(self._lines) + "\n").encode("utf-8")
+        self._lines = []
+        digest = hashlib.sha256(raw).hexdigest()
+        self._hashes.append(digest)
+        self.stats["chunks"] += 1
+        path = object_path(os.path.dirname(self.objects_dir), digest)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = gzip.compress(raw, compresslevel=6, mtime=0) if self.compress else raw
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self.stats["new_chunks"] += 1
+        self.stats["bytes_written"] += len(data)
+
+
+def object_path(backup_dir: str, digest: str) -> str:
+    return os.path.join(backup_dir, OBJECTS_DIR, digest[:2], digest)
+
+
+def read_object(backup_dir: str, digest: str) -> Iterator:
+    """Yield the records of one chunk, checking its hash."""
+    with open(object_path(backup_dir, digest), "rb") as f:
+        data = f.read()
+    raw = gzip.decompress(data) if data[:2] == b"\x1f\x8b" else data
+    if hashlib.sha256(raw).hexdigest() != digest:
+        raise ValueError(f"Backup object {digest} is corrupt")
+    for line in raw.decode("utf-8").splitlines():
+        yield json.loads(line)
+
+
+def _snapshot_generation(base_dir: str) -> int:
+    path = os.path.join(base_dir, storage.MANIFEST_FILE)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return int(json.load(f).get("generation", 0))
+    except (OSError, ValueError):
+        return 0
+
+
+def create_backup(
+    base_dir: str,
+    backup_dir: str,
+    compress: bool = True,
+    avg_records: int = CHUNK_RECORDS,
+    now: Optional[datetime] = None,
+) -> Dict:
+    """Back up the data files (JSON or binary snapshot) incrementally; returns the new manifest.
+
+    Reads only what is on disk (snapshot files plus the journal tail), like
+    ``storage.compact_journal``, so it can run on a background thread while
+    the app keeps working. Bookings are streamed, never loaded as a whole.
+    Records are cut into chunks stored once under ``objects/`` by sha256;
+    ``manifests/<timestamp>.json`` lists the chunks of this backup. If a
+    snapshot is written mid-way the pass is retried.
+    """
+    now = now or datetime.now()
+    for _ in range(3):
+        generation = _snapshot_generation(base_dir)
+        manifest = _backup_pass(base_dir, backup_dir, compress, avg_records)
+        if _snapshot_generation(base_dir) == generation:
+            break
+    else:
+        raise RuntimeError("Data files kept changing during backup; try again")
+    manifest.update(created_at=now.isoformat(timespec="seconds"), generation=generation, compress=compress)
+    manifests_dir = os.path.join(backup_dir, MANIFESTS_DIR)
+    os.makedirs(manifests_dir, exist_ok=True)
+    path = os.path.join(manifests_dir, now.strftime("%Y%m%d-%H%M%S-%f") + ".json")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    manifest["path"] = path
+    return manifest
+
+
+def _backup_pass(base_dir: str, backup_dir: str, compress: bool, avg_records: int) -> Dict:
+    writer = _ChunkWriter(backup_dir, compress, avg_records)
+    sections: Dict[str, List[str]] = {}
+    counts = dict.fromkeys(SECTIONS, 0)
+    journal_seq, snapshot_format = 0, "json"
+    manifest_path = os.path.join(base_dir, storage.MANIFEST_FILE)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            data_manifest = json.load(f)
+        journal_seq = int(data_manifest.get("journal_seq", 0))
+        snapshot_format = data_manifest.get("format", "json")
+
+    for movie in movies.load_movies(os.path.join(base_dir, "movies.json")):
+        writer.add(movie.get("id"), movie)
+        counts["movies"] += 1
+    sections["movies"] = writer.finish()
+
+    showtimes_path = os.path.join(base_dir, "showtimes.json")
+    snapshot_path = os.path.join(base_dir, storage.SNAPSHOT_FILE)
+    snapshot, binary_bookings = {}, None
+    if snapshot_format == "binary" and os.path.exists(snapshot_path):
+        # records are backed up in the JSON shape, so chunks dedupe across both formats
+        showtimes, seat_maps, binary_bookings, _ = binary_snapshot.read(snapshot_path)
+        snapshot = {"showtimes": showtimes, "seat_maps": {sid: sm.to_dict() for sid, sm in seat_maps.items()}}
+    elif os.path.exists(showtimes_path):
+        with open(showtimes_path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+    if isinstance(snapshot, list):  # legacy layout: a bare list of showtimes
+        snapshot = {"showtimes": snapshot, "seat_maps": {}}
+    for st in snapshot.get("showtimes", []):
+        writer.add(st.get("id"), st)
+        counts["showtimes"] += 1
+    sections["showtimes"] = writer.finish()
+    for sid, seat_map in snapshot.get("seat_maps", {}).items():
+        writer.add(sid, [sid, seat_map])
+        counts["seat_maps"] += 1
+    sections["seat_maps"] = writer.finish()
+    del snapshot
+
+    bookings_path = os.path.join(base_dir, "bookings.json")
+    if binary_bookings is not None:
+        for record in binary_bookings:
+            writer.add(record.get("id"), record)
+            counts["bookings"] += 1
+        del binary_bookings
+    elif os.path.exists(bookings_path):
+        for record, _, _ in storage.iter_json_array(bookings_path):
+            writer.add(record.get("id"), record)
+            counts["bookings"] += 1
+    sections["bookings"] = writer.finish()
+
+    for event in journal.read_events(os.path.join(base_dir, storage.JOURNAL_FILE), journal_seq):
+        writer.add(event.get("seq"), event)
+        counts["journal"] += 1
+    sections["journal"] = writer.finish()
+    return {"journal_seq": journal_seq, "sections": sections, "counts": counts, "stats": writer.stats}
+
+
+def list_backups(backup_dir: str) -> List[Dict]:
+    """Manifests of every backup, oldest first."""
+    manifests_dir = os.path.join(backup_dir, MANIFESTS_DIR)
+    if not os.path.isdir(manifests_dir):
+        return []
+    result = []
+    for name in sorted(os.listdir(manifests_dir)):
+        if name.endswith(".json"):
+            path = os.path.join(manifests_dir, name)
+            with open(path, "r", encoding="utf-8") as f:
+                result.append(dict(json.load(f), path=path))
+    return result
+
+
+def find_backup(backup_dir: str, at: Optional[datetime] = None) -> Optional[Dict]:
+    """The latest backup taken at or before ``at`` (the latest overall without it)."""
+    chosen = None
+    for manifest in list_backups(backup_dir):
+        if at is None or datetime.fromisoformat(manifest["created_at"]) <= at:
+            chosen = manifest
+    return chosen
+
+
+def iter_section(backup_dir: str, manifest: Dict, section: str) -> Iterator:
+    for digest in manifest["sections"].get(section, []):
+        yield from read_object(backup_dir, digest)
+
+
+def restore_backup(backup_dir: str, base_dir: str, at: Optional[datetime] = None) -> Dict:
+    """Rebuild the data files as of the latest backup taken at or before ``at``.
+
+    Writes a fresh snapshot and a journal holding the backed-up tail, which
+    the next start replays as usual. Run it while the app is stopped.
+    """
+    manifest = find_backup(backup_dir, at)
+    if manifest is None:
+        raise ValueError("No backup found for that point in time")
+    movies.save_movies(os.path.join(base_dir, "movies.json"), list(iter_section(backup_dir, manifest, "movies")))
+    showtimes = list(iter_section(backup_dir, manifest, "showtimes"))
+    seat_maps = {sid: seat_map for sid, seat_map in iter_section(backup_dir, manifest, "seat_maps")}
+    bookings = list(iter_section(backup_dir, manifest, "bookings"))
+    storage.save_state(base_dir, showtimes, seat_maps, bookings, journal_seq=manifest["journal_seq"])
+
+    journal_path = os.path.join(base_dir, storage.JOURNAL_FILE)
+    tmp_path = f"{journal_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"op": "snapshot", "seq": manifest["journal_seq"]}) + "\n")
+        for event in iter_section(backup_dir, manifest, "journal"):
+            f.write(json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, journal_path)
+    index_path = os.path.join(base_dir, storage.HISTORY_INDEX_FILE)
+    if os.path.exists(index_path):
+        os.remove(index_path)
+    return manifest
+
+
+class BackupRunner:
+    """Runs backups one at a time on a background thread."""
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="backup")
+        self.pending: List[Future] = []
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future = self._executor.submit(fn, *args, **kwargs)
+        self.pending.append(future)
+        return future
+
+    def finished(self) -> List[Future]:
+        """Pop the backups that completed since the last call."""
+        done = [f for f in self.pending if f.done()]
+        self.pending = [f for f in self.pending if not f.done()]
+        return done
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Incremental backups of the JSON data files")
+    parser.add_argument("command", choices=["backup", "list", "restore"])
+    parser.add_argument("--data", default="data")
+    parser.add_argument("--dir", default="backups")
+    parser.add_argument("--at", help="restore the state as of this time (YYYY-MM-DD HH:MM)")
+    parser.add_argument("--no-compress", action="store_true")
+    args = parser.parse_args()
+    if args.command == "backup":
+        manifest = create_backup(args.data, args.dir, compress=not args.no_compress)
+        stats = manifest["stats"]
+        print(f"{manifest['path']}: {stats['new_chunks']}/{stats['chunks']} new chunks, {stats['bytes_written']} bytes")
+    elif args.command == "list":
+        for manifest in list_backups(args.dir):
+            counts = ", ".join(f"{count} {name}" for name, count in manifest["counts"].items())
+            print(f"{manifest['created_at']}  {counts}")
+    else:
+        at = movies.parse_showtime_datetime(args.at) if args.at else None
+        if args.at and at is None:
+            parser.error("--at must be YYYY-MM-DD or YYYY-MM-DD HH:MM")
+        manifest = restore_backup(args.dir, args.data, at)
+        print(f"Restored backup taken at {manifest['created_at']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Reproducible synthetic cinema datasets for benchmarks.
+
+Run ``python -m benchmarks.datagen --bookings 100000 --out /tmp/cinema`` to
+write a data directory that ``main.py`` / ``server.py`` can load.
+"""
+import argparse
+import math
+import os
+import random
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Tuple
+
+import bookings
+import movies
+import seating
+import storage
+
+ROW_LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+def generate_dataset(
+    n_bookings: int,
+    screens: int = 10,
+    showtimes: Optional[int] = None,
+    rows: int = 15,
+    seats_per_row: int = 20,
+    fill: float = 0.6,
+    cancelled_ratio: float = 0.1,
+    past_ratio: float = 0.5,
+    seed: int = 42,
+    start: Optional[datetime] = None,
+) -> Tuple[List[Dict], List[Dict], Dict, List[Dict]]:
+    """Build (movies, showtimes, seat_maps, bookings) with ``n_bookings`` bookings.
+
+    Showtimes are spread over the past and future around ``start`` (default:
+    today) so history and upcoming shows both exist; when ``showtimes`` is not
+    given, enough are created to keep each room about ``fill`` full.
+    """
+    rng = random.Random(seed)
+    start = start or datetime.now().replace(minute=0, second=0, microsecond=0)
+    seats_per_show = rows * seats_per_row
+    avg_party = 2
+    if showtimes is None:
+        showtimes = max(screens, math.ceil(n_bookings * avg_party / (seats_per_show * fill)))
+
+    movies_list = [
+        {"id": f"MV{m:04d}", "title": f"Movie {m}", "genre": "Drama", "duration_min": rng.choice([90, 110, 130, 150])}
+        for m in range(max(5, showtimes // 20))
+    ]
+    config = {
+        "rows": list(ROW_LETTERS[:rows]),
+        "seats_per_row": seats_per_row,
+        "premium_rows": list(ROW_LETTERS[:2]),
+    }
+    past = int(showtimes * past_ratio)
+    showtime_list: List[Dict] = []
+    for n in range(showtimes):
+        # four slots per screen per day, walking outwards from ``start``
+        is_past = n < past
+        day, slot = divmod((n if is_past else n - past) // screens, 4)
+        offset = -(day + 1) if is_past else day
+        st_dt = start + timedelta(days=offset, hours=12 + 3 * slot)
+        movies.schedule_showtime(
+            showtime_list,
+            {
+                "id": f"ST{n:07d}",
+                "movie_id": movies_list[rng.randrange(len(movies_list))]["id"],
+                "screen": f"Screen {n % screens + 1}",
+                "datetime": st_dt.strftime("%Y-%m-%d %H:%M"),
+                "language": rng.choice(["OV", "TR", "EN"]),
+                "pricing": {"standard": 10.0, "premium": 14.0},
+                "screen_config": config,
+            },
+        )
+    seat_maps = {st["id"]: seating.initialize_seat_map(config) for st in showtime_list}
+    codes = list(seat_maps[showtime_list[0]["id"]]) if showtime_list else []
+
+    booking_list: List[Dict] = []
+    free_codes = {st["id"]: codes[:] for st in showtime_list}
+    for n in range(n_bookings):
+        st = showtime_list[rng.randrange(showtimes)]
+        pool = free_codes[st["id"]]
+        if len(pool) < avg_party:
+            st = next((s for s in showtime_list if len(free_codes[s["id"]]) >= avg_party), None)
+            if st is None:
+                break
+            pool = free_codes[st["id"]]
+        party = [pool.pop(rng.randrange(len(pool))) for _ in range(min(len(pool), rng.randint(1, 3)))]
+        booking = bookings.book_seats(
+            st,
+            seat_maps[st["id"]],
+            {
+                "id": f"BK{n:08d}",
+                "seats": party,
+                "customer": {"name": f"Customer {n}", "email": f"customer{rng.randrange(max(1, n_bookings // 3))}@example.com"},
+            },
+        )
+        if rng.random() < cancelled_ratio:
+            for code in party:
+                seating.release_seat(seat_maps[st["id"]], code)
+            pool.extend(party)
+            booking["status"] = "cancelled"
+            booking["cancelled_at"] = booking["created_at"]
+        booking_list.append(booking)
+    return movies_list, showtime_list, seat_maps, booking_list
+
+
+def write_dataset(out_dir: str, **kwargs) -> Dict[str, int]:
+    """Generate a dataset and save it in the regular data-directory layout."""
+    movies_list, showtime_list, seat_maps, booking_list = generate_dataset(**kwargs)
+    movies.save_movies(os.path.join(out_dir, "movies.json"), movies_list)
+    storage.save_state(out_dir, showtime_list, seat_maps, booking_list)
+    return {"movies": len(movies_list), "showtimes": len(showtime_list), "bookings": len(booking_list)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic cinema dataset")
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--bookings", type=int, default=10000)
+    parser.add_argument("--screens", type=int, default=10)
+    parser.add_argument("--showtimes", type=int)
+    parser.add_argument("--rows", type=int, default=15)
+    parser.add_argument("--seats-per-row", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    counts = write_dataset(
+        args.out,
+        n_bookings=args.bookings,
+        screens=args.screens,
+        showtimes=args.showtimes,
+        rows=args.rows,
+        seats_per_row=args.seats_per_row,
+        seed=args.seed,
+    )
+    print(f"Wrote {counts} to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
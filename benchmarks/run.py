@@ -0,0 +1,175 @@
+"""Benchmark harness for the booking hot paths.
+
+    python -m benchmarks.run --sizes 1000,10000,100000,1000000
+
+For each dataset size it times create_booking, cancel_booking,
+occupancy_report (scan and aggregate paths), save_state, load_state and
+load_state_lazy,
+reporting throughput, p50/p99 latency and the tracemalloc peak of one run.
+Results are written as JSON (tagged with the git commit) so runs can be
+compared across commits.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, List, Dict
+
+import reports
+import storage
+from benchmarks import datagen
+from store import BookingStore
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def _summarise(latencies_ns: List[int], peak_bytes: int) -> Dict:
+    values = sorted(ns / 1e6 for ns in latencies_ns)
+    total_s = sum(values) / 1000.0
+    return {
+        "ops": len(values),
+        "throughput_ops_s": round(len(values) / total_s, 1) if total_s else None,
+        "p50_ms": round(_percentile(values, 50), 4),
+        "p99_ms": round(_percentile(values, 99), 4),
+        "max_ms": round(values[-1], 4) if values else 0.0,
+        "peak_mem_mb": round(peak_bytes / 2**20, 3),
+    }
+
+
+def _measure(ops: List[Callable[[], object]], memory_op: Callable[[], object] = None) -> Dict:
+    """Time each op individually, then run ``memory_op`` under tracemalloc for its peak."""
+    latencies = []
+    for op in ops:
+        t0 = time.perf_counter_ns()
+        op()
+        latencies.append(time.perf_counter_ns() - t0)
+    peak = 0
+    if memory_op is not None:
+        tracemalloc.start()
+        memory_op()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return _summarise(latencies, peak)
+
+
+def bench_size(n_bookings: int, ops: int, repeats: int, seed: int) -> Dict:
+    rng = random.Random(seed)
+    t0 = time.perf_counter()
+    _, showtimes, seat_maps, bookings_list = datagen.generate_dataset(n_bookings, seed=seed)
+    gen_s = time.perf_counter() - t0
+    store = BookingStore(showtimes, seat_maps, bookings_list)
+    now = datetime.now()
+    future_ids = [st["id"] for st in showtimes if store.showtime_index.start_of(st["id"]) > now]
+    results: Dict[str, Dict] = {}
+
+    def booking_op(sid: str, code: str):
+        def op():
+            try:
+                store.create_booking({"showtime_id": sid, "seats": [code], "customer": {"email": "bench@example.com"}})
+            except ValueError:
+                pass
+        return op
+
+    create_ops = []
+    for _ in range(ops + 1):
+        sid = rng.choice(future_ids)
+        free = [code for code in seat_maps[sid] if seat_maps[sid][code]["status"] == "available"]
+        if free:
+            create_ops.append(booking_op(sid, rng.choice(free)))
+    results["create_booking"] = _measure(create_ops[:-1], create_ops[-1] if create_ops else None)
+
+    active_future = [b["id"] for sid in future_ids for b in store.bookings_for_showtime(sid)]
+    cancel_ids = rng.sample(active_future, min(ops + 1, len(active_future)))
+    cancel_ops = [lambda bid=bid: store.cancel_booking(bid) for bid in cancel_ids]
+    results["cancel_booking"] = _measure(cancel_ops[:-1], cancel_ops[-1] if cancel_ops else None)
+
+    scan = lambda: reports.occupancy_report(store.showtimes, store.seat_maps, store.bookings)  # noqa: E731
+    agg = lambda: reports.occupancy_report(store.showtimes, store.seat_maps, store.bookings, aggregates=store.aggregates)  # noqa: E731
+    results["occupancy_report_scan"] = _measure([scan] * repeats, scan)
+    results["occupancy_report_aggregates"] = _measure([agg] * repeats, agg)
+
+    tmp_dir = tempfile.mkdtemp(prefix="mtb-bench-")
+    try:
+        save = lambda: storage.save_state(tmp_dir, store.showtimes, store.seat_maps, store.bookings)  # noqa: E731
+        load = lambda: storage.load_state(tmp_dir)  # noqa: E731
+        load_lazy = lambda: storage.load_state_lazy(tmp_dir)  # noqa: E731
+        results["save_state"] = _measure([save] * repeats, save)
+        results["load_state"] = _measure([load] * repeats, load)
+        # a save with the history in hand writes the sidecar index the lazy path reads
+        _, _, resident, history = storage.load_state_lazy(tmp_dir)
+        storage.save_state(tmp_dir, store.showtimes, store.seat_maps, resident, history=history)
+        results["load_state_lazy"] = _measure([load_lazy] * repeats, load_lazy)
+        snapshot_bytes = sum(os.path.getsize(os.path.join(tmp_dir, name)) for name in os.listdir(tmp_dir))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return {
+        "bookings": len(bookings_list),
+        "showtimes": len(showtimes),
+        "generate_s": round(gen_s, 3),
+        "snapshot_bytes": snapshot_bytes,
+        "paths": results,
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(sizes: List[int], ops: int = 1000, repeats: int = 3, seed: int = 42) -> Dict:
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {"ops": ops, "repeats": repeats, "seed": seed},
+        "sizes": {str(n): bench_size(n, ops, repeats, seed) for n in sizes},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark booking, reporting and persistence paths")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma-separated booking counts")
+    parser.add_argument("--ops", type=int, default=1000, help="create/cancel operations per size")
+    parser.add_argument("--repeats", type=int, default=3, help="runs of report/save/load per size")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="result file (default: benchmarks/results/<commit>-<time>.json)")
+    args = parser.parse_args()
+
+    result = run([int(n) for n in args.sizes.split(",") if n], args.ops, args.repeats, args.seed)
+    out = args.out or os.path.join(RESULTS_DIR, f"{result['commit']}-{result['timestamp'].replace(':', '')}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+
+    for size, data in result["sizes"].items():
+        print(f"\n{size} bookings ({data['showtimes']} showtimes, snapshot {data['snapshot_bytes'] / 2**20:.1f} MB)")
+        for path, stats in data["paths"].items():
+            print(
+                f"  {path:<28} {stats['throughput_ops_s'] or 0:>12,.1f} ops/s  p50 {stats['p50_ms']:.4f} ms  "
+                f"p99 {stats['p99_ms']:.4f} ms  peak {stats['peak_mem_mb']:.2f} MB"
+            )
+    print(f"\nResults written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from typing import List, Dict, Tuple
+
+import seating
+
+SNAPSHOT_FILE = "state.snap"
+MAGIC = b"CINESNAP"
+VERSION = 1
+
+# magic, version, flags, generation, journal_seq, crc32 of the body, then (offset, length) per section
+_SECTIONS = 8
+_HEADER = struct.Struct("<8sIIQQI4x" + "QQ" * _SECTIONS)
+_STRINGS, _META, _SEAT_MAPS, _BITS, _SHARED, _PRICES, _BOOKINGS, _SEAT_REFS = range(_SECTIONS)
+# showtime id, layout number, byte offset of the seat bits
+_SEAT_MAP = struct.Struct("<III")
+# fields most bookings of a showtime have in common, stored once as a row:
+# showtime_id, status, snapshot movie_id/screen/datetime/language, phone (string refs)
+_SHARED_ROW = struct.Struct("<7I")
+# subtotal, discount, tax, total in cents
+_PRICE_ROW = struct.Struct("<4q")
+# string refs id, created_at, cancelled_at, name, email; shared row; price row;
+# extra JSON ref; first seat ref; seat count; flags
+_BOOKING = struct.Struct("<8IIHH")
+_GENERIC = 1  # the whole record is the JSON string in ``extra``
+_CANCELLED_AT = 2  # the record has a cancelled_at key
+
+# string ref 0 stands for None
+_NONE = 0
+_CUSTOMER_KEYS = {"name", "email", "phone"}
+_PRICING_KEYS = ("subtotal", "discount", "tax", "total")
+_SNAPSHOT_KEYS = ("movie_id", "screen", "datetime", "language")
+_FIXED_KEYS = {"id", "showtime_id", "seats", "customer", "pricing", "status", "created_at", "showtime_snapshot", "cancelled_at"}
+
+_TO_BITS = bytes.maketrans(b"\x00\x01\x02", b"010")  # held seats are stored as available
+_FROM_BITS = bytes.maketrans(b"01", b"\x00\x01")
+
+
+class _Strings:
+    """Interning table: each distinct string is stored once and referenced by number."""
+
+    def __init__(self):
+        self.refs: Dict[str, int] = {}
+        self.values: List[str] = [""]
+
+    def ref(self, value) -> int:
+        if value is None:
+            return _NONE
+        ref = self.refs.get(value)
+        if ref is None:
+            ref = self.refs[value] = len(self.values)
+            self.values.append(value)
+        return ref
+
+    def encode(self) -> bytes:
+        # NUL-separated, so loading is a single decode + split
+        return "\0".join(self.values).encode("utf-8")
+
+
+def _cents(value) -> int:
+    """Price as exact cents, or None if it would not round-trip."""
+    if not isinstance(value, float):
+        return None
+    cents = round(value * 100)
+    return cents if cents / 100 == value else None
+
+
+class _Rows:
+    """Interning table of fixed-width rows (shared fields, prices)."""
+
+    def __init__(self, layout: struct.Struct):
+        self.layout = layout
+        self.refs: Dict[tuple, int] = {}
+
+    def ref(self, row: tuple) -> int:
+        return self.refs.setdefault(row, len(self.refs))
+
+    def encode(self) -> bytes:
+        return b"".join(self.layout.pack(*row) for row in self.refs)
+
+
+def _fixed_record(booking: Dict, strings: _Strings, shared: _Rows, prices: _Rows, seat_refs: array) -> bytes:
+    """Pack a booking of the usual shape; None if it has to be stored as JSON."""
+    customer = booking.get("customer")
+    pricing = booking.get("pricing")
+    snapshot = booking.get("showtime_snapshot")
+    seats = booking.get("seats")
+    if not (
+        isinstance(customer, dict) and customer.keys() == _CUSTOMER_KEYS
+        and isinstance(pricing, dict) and len(pricing) == 4 and all(k in pricing for k in _PRICING_KEYS)
+        and isinstance(snapshot, dict) and len(snapshot) == 4 and all(k in snapshot for k in _SNAPSHOT_KEYS)
+        and isinstance(seats, list) and len(seats) < 0x10000
+    ):
+        return None
+    own = [booking.get("id"), booking.get("created_at"), booking.get("cancelled_at"), customer["name"], customer["email"]]
+    common = [booking.get("showtime_id"), booking.get("status")] + [snapshot[k] for k in _SNAPSHOT_KEYS] + [customer["phone"]]
+    if not all(t is None or (isinstance(t, str) and "\0" not in t) for t in own + common + seats):
+        return None
+    cents = tuple(_cents(pricing[k]) for k in _PRICING_KEYS)
+    if None in cents:
+        return None
+    extra = {k: v for k, v in booking.items() if k not in _FIXED_KEYS}
+    flags = _CANCELLED_AT if "cancelled_at" in booking else 0
+    first_seat = len(seat_refs)
+    seat_refs.extend(strings.ref(code) for code in seats)
+    return _BOOKING.pack(
+        *[strings.ref(t) for t in own],
+        shared.ref(tuple(strings.ref(t) for t in common)),
+        prices.ref(cents),
+        strings.ref(json.dumps(extra, ensure_ascii=False, separators=(",", ":"))) if extra else _NONE,
+        first_seat,
+        len(seats),
+        flags,
+    )
+
+
+def _little_endian(values: array) -> array:
+    """Seat refs are stored as little-endian uint32 (swapped in place on big-endian hosts)."""
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+def _pack_bits(status: bytearray) -> bytes:
+    if not status:
+        return b""
+    # seat i becomes bit i: reverse the 0/1 digits so seat 0 is the least significant
+    return int(status.translate(_TO_BITS)[::-1], 2).to_bytes((len(status) + 7) // 8, "little")
+
+
+def _unpack_bits(data, count: int) -> bytearray:
+    if not count:
+        return bytearray()
+    digits = format(int.from_bytes(data, "little"), f"0{count}b")[::-1]
+    return bytearray(digits.encode("ascii").translate(_FROM_BITS))
+
+
+def write(path: str, showtimes: List[Dict], seat_maps: Dict, bookings: List[Dict], generation: int = 0, journal_seq: int = 0) -> str:
+    """Write the binary snapshot atomically; returns its sha256."""
+    strings = _Strings()
+    layouts: Dict[tuple, int] = {}
+    seat_map_rows, bits = [], bytearray()
+    for sid, seat_map in seat_maps.items():
+        if not isinstance(seat_map, seating.SeatMap):
+            seat_map = seating.SeatMap.from_dict(seat_map)
+        layout_no = layouts.setdefault(seat_map.layout.key, len(layouts))
+        seat_map_rows.append(_SEAT_MAP.pack(strings.ref(sid), layout_no, len(bits)))
+        bits += _pack_bits(seat_map.status)
+    shared, prices = _Rows(_SHARED_ROW), _Rows(_PRICE_ROW)
+    seat_refs = array("I")
+    records = []
+    for booking in bookings:
+        record = _fixed_record(booking, strings, shared, prices, seat_refs)
+        if record is None:
+            blob = strings.ref(json.dumps(booking, ensure_ascii=False, separators=(",", ":")))
+            record = _BOOKING.pack(*([_NONE] * 7), blob, 0, 0, _GENERIC)
+        records.append(record)
+    meta = json.dumps({"layouts": list(layouts), "showtimes": showtimes}, ensure_ascii=False, separators=(",", ":"))
+    sections = [
+        strings.encode(),
+        meta.encode("utf-8"),
+        b"".join(seat_map_rows),
+        bytes(bits),
+        shared.encode(),
+        prices.encode(),
+        b"".join(records),
+        _little_endian(seat_refs).tobytes(),
+    ]
+    table, offset = [], _HEADER.size
+    for section in sections:
+        table += [offset, len(section)]
+        offset += len(section)
+    crc = 0
+    for section in sections:
+        crc = zlib.crc32(section, crc)
+    header = _HEADER.pack(MAGIC, VERSION, 0, generation, journal_seq, crc, *table)
+    digest = hashlib.sha256(header)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        for section in sections:
+            f.write(section)
+            digest.update(section)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return digest.hexdigest()
+
+
+def read(path: str) -> Tuple[List, Dict, List, Dict]:
+    """Load a binary snapshot; returns (showtimes, seat_maps, bookings, info).
+
+    ``info`` holds the generation and journal_seq it was written with and
+    ``intact`` (the body checksum matched). The file is memory-mapped, so
+    sections are unpacked straight from the page cache.
+    """
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        view = memoryview(mm)
+        try:
+            return _read_view(view)
+        finally:
+            view.release()
+
+
+def _read_view(view: memoryview) -> Tuple[List, Dict, List, Dict]:
+    if len(view) < _HEADER.size:
+        raise ValueError("Not a binary snapshot (truncated header)")
+    magic, version, _, generation, journal_seq, crc, *table = _HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise ValueError("Not a binary snapshot")
+    if version != VERSION:
+        raise ValueError(f"Unsupported binary snapshot version {version}")
+    spans = [view[table[2 * i]:table[2 * i] + table[2 * i + 1]] for i in range(_SECTIONS)]
+    try:
+        intact = zlib.crc32(view[_HEADER.size:]) == crc
+        strs: List = bytes(spans[_STRINGS]).decode("utf-8").split("\0")
+        strs[_NONE] = None
+        meta = json.loads(bytes(spans[_META]))
+        layouts = [seating.layout_for_key(key) for key in meta["layouts"]]
+        bits = spans[_BITS]
+        seat_maps = {}
+        for sid, layout_no, start in _SEAT_MAP.iter_unpack(spans[_SEAT_MAPS]):
+            layout = layouts[layout_no]
+            seat_maps[strs[sid]] = seating.SeatMap(layout, _unpack_bits(bits[start:start + (len(layout) + 7) // 8], len(layout)))
+        seat_refs = array("I")
+        seat_refs.frombytes(spans[_SEAT_REFS])
+        # decoded once, so each booking's seat list is a plain list slice
+        seat_codes = [strs[r] for r in _little_endian(seat_refs)]
+        shared = [tuple(strs[r] for r in row) for row in _SHARED_ROW.iter_unpack(spans[_SHARED])]
+        prices = [tuple(c / 100 for c in row) for row in _PRICE_ROW.iter_unpack(spans[_PRICES])]
+        bookings = []
+        append = bookings.append
+        for id_, created_at, cancelled_at, name, email, shared_no, price_no, extra, first_seat, seat_count, flags in (
+            _BOOKING.iter_unpack(spans[_BOOKINGS])
+        ):
+            if flags & _GENERIC:
+                append(json.loads(strs[extra]))
+                continue
+            showtime_id, status, movie_id, screen, show_dt, language, phone = shared[shared_no]
+            subtotal, discount, tax, total = prices[price_no]
+            booking = {
+                "id": strs[id_],
+                "showtime_id": showtime_id,
+                "seats": seat_codes[first_seat:first_seat + seat_count],
+                "customer": {"name": strs[name], "email": strs[email], "phone": phone},
+                "pricing": {"subtotal": subtotal, "discount": discount, "tax": tax, "total": total},
+                "status": status,
+                "created_at": strs[created_at],
+                "showtime_snapshot": {"movie_id": movie_id, "screen": screen, "datetime": show_dt, "language": language},
+            }
+            if flags & _CANCELLED_AT:
+                booking["cancelled_at"] = strs[cancelled_at]
+            if extra:
+                booking.update(json.loads(strs[extra]))
+            append(booking)
+    finally:
+        for span in spans:
+            span.release()
+    info = {"generation": generation, "journal_seq": journal_seq, "intact": intact}
+    return meta["showtimes"], seat_maps, bookings, info
+
+
+def main() -> None:
+    import storage
+
+    parser = argparse.ArgumentParser(description="Convert between the binary snapshot and the JSON data files")
+    parser.add_argument("command", choices=["convert", "export"])
+    parser.add_argument("--data", default="data")
+    parser.add_argument("--out", help="export: directory for the JSON files (default: --data, replacing the snapshot)")
+    args = parser.parse_args()
+    showtimes, seat_maps, bookings = storage.load_state(args.data)
+    if args.command == "export" and args.out:
+        storage.save_state(args.out, showtimes, seat_maps, bookings)
+        print(f"Wrote JSON files to {args.out}")
+        return
+    # in place: fold the journal into the new snapshot, as the app does on exit
+    event_log = storage.open_journal(args.data)
+    try:
+        storage.snapshot_state(args.data, showtimes, seat_maps, bookings, event_log, binary=args.command == "convert")
+    finally:
+        event_log.close()
+    written = SNAPSHOT_FILE if args.command == "convert" else "showtimes.json and bookings.json"
+    print(f"Wrote {written} in {args.data} ({len(showtimes)} showtimes, {len(bookings)} bookings)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,12 @@
-import os
 import uuid
 from datetime import datetime, timezone, timedelta
 from typing import List, Dict, Optional
 
+import metrics
+import pricing
 import seating
+import tickets
+from pricing import totals as _totals
 
 
 def _parse_showtime_dt(value: str) -> Optional[datetime]:
@@ -22,44 +25,77 @@ def _parse_showtime_dt(value: str) -> Optional[datetime]:
 def create_booking(showtimes: List[Dict], seat_maps: Dict, booking_data: Dict) -> Dict:
     """Create a booking, reserve seats, and return the booking record."""
     showtime_id = booking_data["showtime_id"]
-    seats = [s for s in (booking_data.get("seats") or []) if s]
-    if not seats:
-        raise ValueError("No seats selected.")
-    customer = booking_data.get("customer") or {}
     bookings_list: Optional[List[Dict]] = booking_data.get("bookings")
 
     showtime = next((s for s in showtimes if s.get("id") == showtime_id), None)
     if not showtime:
+        metrics.booking_failed("unknown_showtime")
         raise ValueError("Showtime not found")
     if showtime_id not in seat_maps:
         raise ValueError("Seat map missing for showtime")
 
-    seat_map = seat_maps[showtime_id]
-    if all(seat.get("status") != "available" for seat in seat_map.values()):
+    booking = book_seats(showtime, seat_maps[showtime_id], booking_data)
+    if bookings_list is not None:
+        bookings_list.append(booking)
+    return booking
+
+
+def book_seats(showtime: Dict, seat_map: Dict, booking_data: Dict) -> Dict:
+    """Reserve seats on an already resolved showtime and build the booking record."""
+    seats = [s for s in (booking_data.get("seats") or []) if s]
+    if not seats:
+        metrics.booking_failed("no_seats")
+        raise ValueError("No seats selected.")
+
+    if seating.free_seat_count(seat_map) == 0:
+        metrics.booking_failed("sold_out")
         raise ValueError("Showtime is sold out.")
 
+    # reject unknown promo codes before anything is reserved
+    try:
+        pricing.ENGINE.resolve_discounts(booking_data.get("discounts"))
+    except ValueError:
+        metrics.booking_failed("invalid_promo")
+        raise
+
     invalid = [code for code in seats if code not in seat_map]
     if invalid:
+        metrics.booking_failed("invalid_seats")
         raise ValueError(f"Invalid seat codes: {', '.join(invalid)}")
 
     unavailable = [code for code in seats if not seating.is_seat_available(seat_map, code)]
     if unavailable:
+        metrics.booking_failed("unavailable_seats")
         raise ValueError(f"Seats not available: {', '.join(unavailable)}")
 
-    for code in seats:
-        seating.reserve_seat(seat_map, code)
+    reserved = []
+    try:
+        for code in seats:
+            seating.reserve_seat(seat_map, code)
+            reserved.append(code)
+    except ValueError:
+        # all-or-nothing: undo partial reservations (e.g. duplicate codes in the request)
+        for code in reserved:
+            seating.release_seat(seat_map, code)
+        metrics.booking_failed("unavailable_seats")
+        raise
 
-    pricing = calculate_booking_total(seats, showtime.get("pricing", {}), seat_map=seat_map)
-    booking = {
+    return _build_booking(showtime, seat_map, seats, booking_data)
+
+
+def _build_booking(showtime: Dict, seat_map: Dict, seats: List[str], booking_data: Dict) -> Dict:
+    customer = booking_data.get("customer") or {}
+    quote = pricing.quote(showtime, seat_map, seats, booking_data.get("discounts"))
+    return {
         "id": booking_data.get("id") or str(uuid.uuid4())[:10],
-        "showtime_id": showtime_id,
+        "showtime_id": showtime["id"],
         "seats": seats,
         "customer": {
             "name": customer.get("name", "Guest"),
             "email": customer.get("email", ""),
             "phone": customer.get("phone", ""),
         },
-        "pricing": pricing,
+        "pricing": quote,
         "status": "active",
         "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
         "showtime_snapshot": {
@@ -70,9 +106,92 @@ def create_booking(showtimes: List[Dict], seat_maps: Dict, booking_data: Dict) -
         },
     }
 
-    if bookings_list is not None:
-        bookings_list.append(booking)
-    return booking
+
+def create_bookings_batch(
+    showtimes: List[Dict],
+    seat_maps: Dict,
+    requests: List[Dict],
+    atomic: str = "showtime",
+    bookings_list: Optional[List[Dict]] = None,
+) -> List[Dict]:
+    """Book many requests at once; returns one result dict per request, in order.
+
+    Requests are grouped by showtime and every seat is checked in one pass per
+    group before anything is reserved. With ``atomic="showtime"`` a bad request
+    fails its whole showtime group; with ``atomic="batch"`` it fails the batch.
+    Each result is ``{"ok": True, "booking": ...}`` or ``{"ok": False, "error": ...}``.
+    """
+    if atomic not in ("showtime", "batch"):
+        raise ValueError("atomic must be 'showtime' or 'batch'")
+    showtime_by_id = {st.get("id"): st for st in showtimes}
+    groups: Dict[str, List[int]] = {}
+    for pos, data in enumerate(requests):
+        groups.setdefault(data.get("showtime_id"), []).append(pos)
+
+    results: List[Optional[Dict]] = [None] * len(requests)
+    failed_groups = []
+    for showtime_id, positions in groups.items():
+        errors = _validate_group(showtime_by_id.get(showtime_id), seat_maps.get(showtime_id), requests, positions)
+        if errors:
+            failed_groups.append(showtime_id)
+            for pos in positions:
+                results[pos] = {"ok": False, "error": errors.get(pos, "Batch aborted: another request for this showtime failed.")}
+    if failed_groups and atomic == "batch":
+        return [r or {"ok": False, "error": "Batch aborted: another request failed."} for r in results]
+
+    for showtime_id, positions in groups.items():
+        if showtime_id in failed_groups:
+            continue
+        showtime = showtime_by_id[showtime_id]
+        seat_map = seat_maps[showtime_id]
+        for pos in positions:
+            seats = [s for s in requests[pos].get("seats") or [] if s]
+            # validated above, so this cannot fail half-way
+            for code in seats:
+                seating.reserve_seat(seat_map, code)
+            booking = _build_booking(showtime, seat_map, seats, requests[pos])
+            if bookings_list is not None:
+                bookings_list.append(booking)
+            results[pos] = {"ok": True, "booking": booking}
+    return results
+
+
+def _validate_group(
+    showtime: Optional[Dict], seat_map: Optional[Dict], requests: List[Dict], positions: List[int]
+) -> Dict[int, str]:
+    """Check every request of one showtime group; returns {position: error}."""
+    if not showtime:
+        metrics.booking_failed("unknown_showtime")
+        return {pos: "Showtime not found" for pos in positions}
+    if seat_map is None:
+        metrics.booking_failed("missing_seat_map")
+        return {pos: "Seat map missing for showtime" for pos in positions}
+    errors = {}
+    claimed = set()
+    for pos in positions:
+        seats = [s for s in (requests[pos].get("seats") or []) if s]
+        if not seats:
+            metrics.booking_failed("no_seats")
+            errors[pos] = "No seats selected."
+            continue
+        invalid = [code for code in seats if code not in seat_map]
+        if invalid:
+            metrics.booking_failed("invalid_seats")
+            errors[pos] = f"Invalid seat codes: {', '.join(invalid)}"
+            continue
+        taken = [code for code in seats if code in claimed or not seating.is_seat_available(seat_map, code)]
+        if taken or len(set(seats)) != len(seats):
+            metrics.booking_failed("unavailable_seats")
+            errors[pos] = f"Seats not available: {', '.join(taken or seats)}"
+            continue
+        try:
+            pricing.ENGINE.resolve_discounts(requests[pos].get("discounts"))
+        except ValueError as exc:
+            metrics.booking_failed("invalid_promo")
+            errors[pos] = str(exc)
+            continue
+        claimed.update(seats)
+    return errors
 
 
 def cancel_booking(
@@ -83,8 +202,18 @@ def cancel_booking(
     cancellation_window_min: int = 30,
 ) -> (bool, str):
     """Cancel booking with cutoff; frees seats. Returns (success, message)."""
-    now = now or datetime.now()
     booking = next((b for b in bookings if b.get("id") == booking_id), None)
+    return cancel_booking_record(booking, seat_maps, now, cancellation_window_min)
+
+
+def cancel_booking_record(
+    booking: Optional[Dict],
+    seat_maps: Dict,
+    now: Optional[datetime] = None,
+    cancellation_window_min: int = 30,
+) -> (bool, str):
+    """Cancel an already resolved booking record; frees seats. Returns (success, message)."""
+    now = now or datetime.now()
     if not booking or booking.get("status") == "cancelled":
         return False, "Booking not found or already cancelled."
 
@@ -96,7 +225,8 @@ def cancel_booking(
 
     showtime_id = booking.get("showtime_id")
     seat_map = seat_maps.get(showtime_id)
-    if seat_map:
+    if seat_map and not booking.get("seats_voided"):
+        # a seat-map reset already freed voided seats; they may be sold again
         for code in booking.get("seats", []):
             seating.release_seat(seat_map, code)
 
@@ -105,6 +235,7 @@ def cancel_booking(
     return True, "Booking cancelled."
 
 
+@metrics.timed("calculate_booking_total")
 def calculate_booking_total(
     seats: List[str],
     pricing: Dict,
@@ -112,8 +243,10 @@ def calculate_booking_total(
     discounts: Optional[List[Dict]] = None,
     seat_map: Optional[Dict] = None,
 ) -> Dict:
-    """Calculate subtotal, discount, tax, and total."""
-    discounts = discounts or []
+    """Calculate subtotal, discount, tax, and total.
+
+    Ad-hoc helper walking the seat map; bookings are priced by ``pricing.quote``.
+    """
     subtotal = 0.0
     for code in seats:
         zone = None
@@ -121,24 +254,7 @@ def calculate_booking_total(
             zone = seat_map[code].get("zone")
         price = pricing.get(zone or "standard", pricing.get("standard", 0.0))
         subtotal += float(price)
-
-    discount_value = 0.0
-    for disc in discounts:
-        if disc.get("type") == "percent":
-            discount_value += subtotal * float(disc.get("value", 0)) / 100.0
-        elif disc.get("type") == "flat":
-            discount_value += float(disc.get("value", 0))
-    discount_value = min(discount_value, subtotal)
-
-    taxable = subtotal - discount_value
-    tax = round(taxable * tax_rate, 2)
-    total = round(taxable + tax, 2)
-    return {
-        "subtotal": round(subtotal, 2),
-        "discount": round(discount_value, 2),
-        "tax": tax,
-        "total": total,
-    }
+    return _totals(subtotal, discounts or [], tax_rate)
 
 
 def list_customer_bookings(bookings: List[Dict], email: str) -> List[Dict]:
@@ -147,23 +263,5 @@ def list_customer_bookings(bookings: List[Dict], email: str) -> List[Dict]:
 
 
 def generate_ticket(booking: Dict, directory: str) -> str:
-    """Create a text ticket file and return its path."""
-    os.makedirs(directory, exist_ok=True)
-    filename = os.path.join(directory, f"ticket_{booking['id']}.txt")
-    showtime = booking.get("showtime_snapshot", {})
-    lines = [
-        "=== MOVIE TICKET ===",
-        f"Booking ID : {booking['id']}",
-        f"Showtime   : {showtime.get('datetime', '')}",
-        f"Screen     : {showtime.get('screen', '')}",
-        f"Seats      : {', '.join(booking.get('seats', []))}",
-        f"Status     : {booking.get('status')}",
-        f"Name       : {booking.get('customer', {}).get('name', '')}",
-        f"Email      : {booking.get('customer', {}).get('email', '')}",
-        f"Total      : {booking.get('pricing', {}).get('total', 0):.2f}",
-    ]
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write("\n".join(lines))
-    return filename
-
-
+    """Create a text ticket file and return its path (synchronously; see ``tickets.TicketPipeline``)."""
+    return tickets.DirectorySink(directory).write_many([(booking["id"], tickets.render(booking))])[0]
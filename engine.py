@@ -0,0 +1,42 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict
+
+from store import BookingStore
+
+
+class BookingEngine:
+    """Runs store bookings and cancellations on a worker thread pool.
+
+    Correctness comes from the store's per-showtime locks; the pool only lets
+    many request handlers feed it at once.
+    """
+
+    def __init__(self, store: BookingStore, max_workers: int = 16):
+        self.store = store
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="booking")
+
+    def submit_booking(self, booking_data: Dict) -> Future:
+        return self._pool.submit(self.store.create_booking, booking_data)
+
+    def submit_cancel(self, booking_id: str, **kwargs) -> Future:
+        return self._pool.submit(self.store.cancel_booking, booking_id, **kwargs)
+
+    def book_many(self, requests: List[Dict]) -> List[Dict]:
+        """Book every request concurrently; returns one result dict per request, in order."""
+        futures = [self.submit_booking(data) for data in requests]
+        results = []
+        for future in futures:
+            try:
+                results.append({"ok": True, "booking": future.result()})
+            except ValueError as exc:
+                results.append({"ok": False, "error": str(exc)})
+        return results
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
+
+    def __enter__(self) -> "BookingEngine":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
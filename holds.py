@@ -0,0 +1,154 @@
+import heapq
+import itertools
+import threading
+import time
+import uuid
+from typing import Callable, List, Dict, Optional, Tuple
+
+import seating
+
+
+class HoldManager:
+    """Temporary seat holds with TTL expiry.
+
+    Holds are kept in a dict by id and their expiry times in a min-heap, so
+    expiring the due holds costs O(log n) each instead of a seat-map scan.
+    Seat changes happen under the store's per-showtime lock. Holds are not
+    persisted: a restart simply frees the seats.
+    """
+
+    def __init__(self, store, default_ttl: int = 300, clock: Callable[[], float] = time.time):
+        self.store = store
+        self.default_ttl = default_ttl
+        self.clock = clock
+        self._holds: Dict[str, Dict] = {}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def hold_seats(self, showtime_id: str, seats: List[str], ttl: Optional[int] = None) -> Dict:
+        """Hold seats for ``ttl`` seconds; all-or-nothing. Returns the hold record."""
+        self.expire()
+        seats = [s for s in (seats or []) if s]
+        if not seats:
+            raise ValueError("No seats selected.")
+        if not self.store.get_showtime(showtime_id):
+            raise ValueError("Showtime not found")
+        with self.store.lock_for(showtime_id):
+            seat_map = self.store.seat_maps.get(showtime_id)
+            if seat_map is None:
+                raise ValueError("Seat map missing for showtime")
+            invalid = [code for code in seats if code not in seat_map]
+            if invalid:
+                raise ValueError(f"Invalid seat codes: {', '.join(invalid)}")
+            unavailable = [code for code in seats if not seating.is_seat_available(seat_map, code)]
+            if unavailable or len(set(seats)) != len(seats):
+                raise ValueError(f"Seats not available: {', '.join(unavailable or seats)}")
+            for code in seats:
+                seating.hold_seat(seat_map, code)
+        hold = {
+            "id": str(uuid.uuid4())[:10],
+            "showtime_id": showtime_id,
+            "seats": seats,
+            "expires_at": self.clock() + (ttl if ttl is not None else self.default_ttl),
+        }
+        with self._lock:
+            self._holds[hold["id"]] = hold
+            heapq.heappush(self._heap, (hold["expires_at"], next(self._counter), hold["id"]))
+        self._wakeup.set()
+        return hold
+
+    def get(self, hold_id: str) -> Optional[Dict]:
+        return self._holds.get(hold_id)
+
+    def confirm(self, hold_id: str, customer: Optional[Dict] = None, **booking_fields) -> Dict:
+        """Turn a live hold into a booking.
+
+        If the booking is rejected (e.g. an unknown promo code) the hold is
+        kept, so the caller can retry before it expires.
+        """
+        self.expire()
+        with self._lock:
+            hold = self._holds.pop(hold_id, None)
+        if not hold:
+            raise ValueError("Hold not found or expired.")
+        with self.store.lock_for(hold["showtime_id"]):
+            seat_map = self.store.seat_maps.get(hold["showtime_id"])
+            for code in hold["seats"]:
+                seating.release_hold(seat_map, code)
+            booking_data = dict(booking_fields, showtime_id=hold["showtime_id"], seats=hold["seats"], customer=customer)
+            try:
+                return self.store.create_booking(booking_data)
+            except ValueError:
+                # still under the showtime lock, so nobody took the seats in between
+                for code in hold["seats"]:
+                    seating.hold_seat(seat_map, code)
+                with self._lock:
+                    self._holds[hold["id"]] = hold
+                    heapq.heappush(self._heap, (hold["expires_at"], next(self._counter), hold["id"]))
+                raise
+
+    def release(self, hold_id: str) -> bool:
+        """Give held seats back before the hold expires."""
+        with self._lock:
+            hold = self._holds.pop(hold_id, None)
+        if not hold:
+            return False
+        self._free(hold)
+        return True
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Release every hold whose TTL has passed; returns how many expired."""
+        now = self.clock() if now is None else now
+        expired = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                expires_at, _, hold_id = heapq.heappop(self._heap)
+                hold = self._holds.get(hold_id)
+                # confirmed or released holds leave stale heap entries behind
+                if hold and hold["expires_at"] == expires_at:
+                    expired.append(self._holds.pop(hold_id))
+        for hold in expired:
+            self._free(hold)
+        return len(expired)
+
+    def next_expiry(self) -> Optional[float]:
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def _free(self, hold: Dict) -> None:
+        with self.store.lock_for(hold["showtime_id"]):
+            seat_map = self.store.seat_maps.get(hold["showtime_id"])
+            if seat_map is not None:
+                for code in hold["seats"]:
+                    seating.release_hold(seat_map, code)
+        self.store.seats_freed(hold["showtime_id"])
+
+    # -- background expiry ---------------------------------------------------
+
+    def start(self) -> None:
+        """Expire holds from a daemon thread that sleeps until the next deadline."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="hold-expiry", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wakeup.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.expire()
+            deadline = self.next_expiry()
+            timeout = None if deadline is None else max(0.0, deadline - self.clock())
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
@@ -0,0 +1,217 @@
+import json
+import os
+import threading
+import time
+from typing import List, Dict, Iterator, Optional
+
+import seating
+
+
+class Journal:
+    """Append-only JSONL event log with group-commit fsync.
+
+    Events are serialised on ``append`` and buffered; the buffer is written and
+    fsync'ed once per group (``group_size`` events or ``max_delay`` seconds,
+    whichever comes first) or on an explicit ``flush``. With ``autoflush``
+    off, only explicit flushes write, so a caller such as the HTTP server can
+    keep disk I/O on a background thread.
+    """
+
+    def __init__(self, path: str, group_size: int = 64, max_delay: float = 0.05, autoflush: bool = True):
+        self.path = path
+        self.group_size = group_size
+        self.max_delay = max_delay
+        self.autoflush = autoflush
+        self.seq = 0
+        self.events_since_snapshot = 0
+        self._buffer: List[str] = []
+        self._first_buffered = 0.0
+        # _lock guards the buffer and is only held briefly; _write_lock
+        # serialises file writes so appends never wait on an fsync
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._recover()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _recover(self) -> None:
+        """Find the last sequence number and cut off a torn trailing line."""
+        if not os.path.exists(self.path):
+            return
+        valid_bytes = 0
+        with open(self.path, "rb") as f:
+            for raw in f:
+                try:
+                    event = json.loads(raw)
+                except ValueError:
+                    break
+                if not raw.endswith(b"\n"):
+                    break
+                valid_bytes += len(raw)
+                self.seq = max(self.seq, event.get("seq", 0))
+                if event.get("op") != "snapshot":
+                    self.events_since_snapshot += 1
+        if valid_bytes != os.path.getsize(self.path):
+            with open(self.path, "r+b") as f:
+                f.truncate(valid_bytes)
+
+    @property
+    def pending(self) -> int:
+        """Number of buffered events not yet written."""
+        return len(self._buffer)
+
+    def append(self, event: Dict) -> int:
+        """Buffer an event and return its sequence number."""
+        with self._lock:
+            self.seq += 1
+            seq = self.seq
+            event = dict(event, seq=seq)
+            if not self._buffer:
+                self._first_buffered = time.monotonic()
+            self._buffer.append(json.dumps(event, ensure_ascii=False, separators=(",", ":")))
+            self.events_since_snapshot += 1
+            group_full = self.autoflush and (
+                len(self._buffer) >= self.group_size or time.monotonic() - self._first_buffered >= self.max_delay
+            )
+        if group_full:
+            self.flush()
+        return seq
+
+    def flush(self) -> None:
+        """Write buffered events and fsync them as one group."""
+        with self._write_lock:
+            self._write_buffer()
+
+    def _write_buffer(self) -> None:
+        with self._lock:
+            lines, self._buffer = self._buffer, []
+        if not lines:
+            return
+        self._file.write("\n".join(lines) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def truncate(self, upto_seq: Optional[int] = None) -> None:
+        """Drop logged events once a snapshot covering them is on disk.
+
+        Events newer than ``upto_seq`` (default: everything written so far) are
+        kept. The log is swapped for one starting with a snapshot marker so the
+        sequence numbers keep increasing across restarts.
+        """
+        with self._write_lock:
+            self._write_buffer()
+            self._file.close()
+            upto_seq = self.seq if upto_seq is None else upto_seq
+            kept = [json.dumps(event, ensure_ascii=False, separators=(",", ":")) for event in read_events(self.path, upto_seq)]
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"op": "snapshot", "seq": upto_seq}) + "\n")
+                for line in kept:
+                    f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._file = open(self.path, "a", encoding="utf-8")
+            self.events_since_snapshot = len(kept) + self.pending
+
+    def close(self) -> None:
+        self.flush()
+        self._file.close()
+
+
+def read_events(path: str, after_seq: int = 0) -> Iterator[Dict]:
+    """Yield logged events newer than ``after_seq``; stops at a torn trailing line."""
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                return
+            try:
+                event = json.loads(line)
+            except ValueError:
+                return
+            if event.get("seq", 0) > after_seq:
+                yield event
+
+
+def replay(path: str, showtimes: List[Dict], seat_maps: Dict, bookings: List[Dict], after_seq: int = 0) -> int:
+    """Apply logged events on top of a loaded snapshot; returns the last applied seq."""
+    showtime_by_id = {st.get("id"): st for st in showtimes}
+    booking_by_id = {b.get("id"): b for b in bookings}
+    last_seq = after_seq
+    for event in read_events(path, after_seq):
+        _apply(event, showtimes, showtime_by_id, seat_maps, bookings, booking_by_id)
+        last_seq = event["seq"]
+    return last_seq
+
+
+def _apply(
+    event: Dict,
+    showtimes: List[Dict],
+    showtime_by_id: Dict[str, Dict],
+    seat_maps: Dict,
+    bookings: List[Dict],
+    booking_by_id: Dict[str, Dict],
+) -> None:
+    op = event.get("op")
+    if op == "booking_created":
+        _apply_booking(event["booking"], seat_maps, bookings, booking_by_id)
+    elif op == "booking_batch":
+        for booking in event["bookings"]:
+            _apply_booking(booking, seat_maps, bookings, booking_by_id)
+    elif op == "booking_cancelled":
+        booking = booking_by_id.get(event["id"])
+        if not booking or booking.get("status") == "cancelled":
+            return
+        booking["status"] = "cancelled"
+        booking["cancelled_at"] = event.get("cancelled_at")
+        seat_map = seat_maps.get(booking.get("showtime_id"))
+        if seat_map is not None and not booking.get("seats_voided"):
+            for code in booking.get("seats", []):
+                seating.release_seat(seat_map, code)
+    elif op == "showtime_scheduled":
+        showtime = event["showtime"]
+        if showtime["id"] in showtime_by_id:
+            return
+        showtimes.append(showtime)
+        showtime_by_id[showtime["id"]] = showtime
+        seat_maps[showtime["id"]] = seating.initialize_seat_map(showtime.get("screen_config", {}))
+    elif op == "showtime_updated":
+        showtime = showtime_by_id.get(event["id"])
+        if not showtime:
+            return
+        for key, value in event.get("updates", {}).items():
+            if key != "id":
+                showtime[key] = value
+        showtime["updated_at"] = event.get("updated_at")
+    elif op == "showtimes_archived":
+        ids = set(event["ids"])
+        showtimes[:] = [st for st in showtimes if st.get("id") not in ids]
+        bookings[:] = [b for b in bookings if b.get("showtime_id") not in ids]
+        for showtime_id in ids:
+            showtime_by_id.pop(showtime_id, None)
+            seat_maps.pop(showtime_id, None)
+        for bid in [bid for bid, b in booking_by_id.items() if b.get("showtime_id") in ids]:
+            del booking_by_id[bid]
+    elif op == "seat_map_reset":
+        showtime = showtime_by_id.get(event["showtime_id"])
+        if showtime:
+            seat_maps[showtime["id"]] = seating.initialize_seat_map(showtime.get("screen_config", {}))
+        for bid in event.get("booking_ids", []):
+            if bid in booking_by_id:
+                booking_by_id[bid]["seats_voided"] = True
+
+
+def _apply_booking(booking: Dict, seat_maps: Dict, bookings: List[Dict], booking_by_id: Dict[str, Dict]) -> None:
+    if booking["id"] in booking_by_id:
+        return
+    bookings.append(booking)
+    booking_by_id[booking["id"]] = booking
+    seat_map = seat_maps.get(booking.get("showtime_id"))
+    if seat_map is not None:
+        for code in booking.get("seats", []):
+            if seating.is_seat_available(seat_map, code):
+                seating.reserve_seat(seat_map, code)
@@ -1,34 +1,63 @@
 import os
 from datetime import datetime, timedelta
 
-import bookings
+import archive
+import backups
+import metrics
 import movies
+import pricing
 import reports
 import seating
 import storage
+import tickets
+import waitlist
+from store import BookingStore
 
 DATA_DIR = "data"
 TICKET_DIR = "tickets"
+# "files" (tickets/ticket_<id>.txt) or "store" (append-only tickets/tickets.dat + tickets.idx)
+TICKET_OUTPUT = "files"
 BACKUP_DIR = "backups"
 REPORT_DIR = "reports"
+ARCHIVE_DIR = os.path.join(DATA_DIR, "archive")
+PROMOS_FILE = os.path.join(DATA_DIR, "promos.json")
+# Prometheus text file, rewritten every 15 s (e.g. for node_exporter's textfile collector)
+METRICS_FILE = os.path.join(DATA_DIR, "metrics.prom")
+# append changes to data/journal.jsonl instead of rewriting the JSON files each session
+JOURNAL_MODE = True
+SNAPSHOT_EVERY = 500
+HOLD_SECONDS = 300
+WAITLIST_FILE = os.path.join(DATA_DIR, waitlist.WAITLIST_FILE)
+# keep cancelled and past bookings on disk (storage.BookingHistory) instead of in memory
+LAZY_HISTORY = True
+# "json" (data/*.json + journal) or "sqlite" (data/cinema.db; import with `python sqlite_storage.py`)
+STORAGE_BACKEND = "json"
+# JSON backend snapshot files: "json" (showtimes.json + bookings.json) or "binary"
+# (data/state.snap, loads every booking; `python binary_snapshot.py export` writes JSON back)
+SNAPSHOT_FORMAT = "json"
 
 
 def _init_state():
-    movie_path = os.path.join(DATA_DIR, "movies.json")
-    movies_list = movies.load_movies(movie_path)
-    showtimes, seat_maps, bookings_list = storage.load_state(DATA_DIR)
-
+    backend = storage.open_storage(STORAGE_BACKEND, DATA_DIR, lazy=LAZY_HISTORY, binary=SNAPSHOT_FORMAT == "binary")
+    movies_list = backend.load_movies()
+    pricing.load_promos(PROMOS_FILE)
+    showtimes, seat_maps, bookings_list, history = backend.load_state()
+    event_log = backend.open_journal() if JOURNAL_MODE else None
+    store = BookingStore(showtimes, seat_maps, bookings_list, journal=event_log, history=history, movies_list=movies_list)
     # auto-generate seat maps for showtimes missing one
-    for st in showtimes:
-        sid = st.get("id")
-        if sid not in seat_maps:
-            seat_maps[sid] = seating.initialize_seat_map(st.get("screen_config", {}))
-    return movies_list, showtimes, seat_maps, bookings_list
+    store.ensure_seat_maps()
+    metrics.track_store(store)
+    return movies_list, store, backend
 
 
-def _persist(movies_list, showtimes, seat_maps, bookings_list):
-    movies.save_movies(os.path.join(DATA_DIR, "movies.json"), movies_list)
-    storage.save_state(DATA_DIR, showtimes, seat_maps, bookings_list)
+def _persist(movies_list, store, backend, snapshot=False):
+    backend.save_movies(movies_list)
+    if store.journal is None:
+        backend.save(store)
+    elif snapshot or store.journal.events_since_snapshot >= SNAPSHOT_EVERY:
+        backend.snapshot(store)
+    else:
+        store.journal.flush()
 
 
 def _print_movies(movies_list):
@@ -57,7 +86,30 @@ def _parse_input_datetime(value: str) -> str:
         raise ValueError("Invalid datetime format. Use YYYY-MM-DD HH:MM.")
 
 
-def customer_menu(movies_list, showtimes, seat_maps, bookings_list):
+def _announce_offer(entry):
+    offer = entry["offer"]
+    until = datetime.fromtimestamp(offer["expires_at"]).strftime("%H:%M")
+    print(
+        f"[Waitlist] Seats {', '.join(offer['seats'])} of showtime {entry['showtime_id']} are held for "
+        f"{entry['customer'].get('email') or entry['id']} until {until} (Customer > My waitlist to accept)."
+    )
+
+
+def _join_waitlist(waiting, sid):
+    count = input("How many seats? ").strip()
+    zone = input("Zone (premium/standard, blank = any): ").strip().lower() or None
+    name = input("Name: ").strip()
+    email = input("Email: ").strip()
+    try:
+        entry = waiting.join(sid, count, {"name": name, "email": email}, zone=zone)
+    except ValueError as exc:
+        print(f"Could not join the waitlist: {exc}")
+        return
+    if entry["status"] == "waiting":
+        print(f"Added to the waitlist (ID: {entry['id']}, position {waiting.position(entry['id'])}).")
+
+
+def customer_menu(movies_list, store, ticket_pipeline, waiting):
     while True:
         print("\n-- Customer Menu --")
         print("1) List movies")
@@ -65,56 +117,79 @@ def customer_menu(movies_list, showtimes, seat_maps, bookings_list):
         print("3) View seats & book")
         print("4) Cancel booking")
         print("5) My bookings")
+        print("6) My waitlist")
         print("0) Back")
         choice = input("Select option: ").strip()
         if choice == "1":
             _print_movies(movies_list)
         elif choice == "2":
-            _print_showtimes(showtimes, movies_list)
+            _print_showtimes(store.showtimes, movies_list)
         elif choice == "3":
-            _print_showtimes(showtimes, movies_list)
+            _print_showtimes(store.showtimes, movies_list)
             sid = input("Showtime ID (0=back): ").strip()
             if sid == "0" or not sid:
                 continue
-            seat_map = seat_maps.get(sid)
+            seat_map = store.seat_maps.get(sid)
             if not seat_map:
                 print("Seat map not found. Choose a valid showtime ID.")
                 continue
-            showtime = next((s for s in showtimes if s.get("id") == sid), None)
+            showtime = store.get_showtime(sid)
             if not showtime:
                 print("Showtime not found. Choose a valid showtime ID.")
                 continue
+            store.holds.expire()
+            if not seat_map.free:
+                if input("Sold out. Join the waitlist? (y/n): ").strip().lower() == "y":
+                    _join_waitlist(waiting, sid)
+                continue
             print(seating.render_seat_map(seat_map))
-            premium_rows = sorted({meta["row"] for meta in seat_map.values() if meta.get("zone") == "premium"})
-            standard_rows = sorted({meta["row"] for meta in seat_map.values() if meta.get("zone") != "premium"})
-            print("\nLegend: O = available, X = reserved")
+            premium_rows = seating.zone_rows(seat_map, "premium")
+            standard_rows = seating.zone_rows(seat_map, "standard")
+            print("\nLegend: O = available, X = reserved, H = on hold")
             print(
                 f"Pricing: Premium rows {''.join(premium_rows) or '-'} = premium price; "
                 f"rows {''.join(standard_rows) or '-'} = standard price."
             )
-            seats = input("Seats (comma, e.g., A1,A2): ").replace(" ", "").split(",")
-            seats = [s for s in seats if s]
+            raw_seats = input("Seats (comma, e.g., A1,A2; or a number for best available): ").replace(" ", "")
+            if raw_seats.isdigit():
+                seats = seating.find_best_seats(seat_map, int(raw_seats))
+                if not seats:
+                    print(f"No {raw_seats} adjacent seats available.")
+                    continue
+                print(f"Best available: {', '.join(seats)}")
+            else:
+                seats = [s for s in raw_seats.split(",") if s]
             if not seats:
                 print("No seats selected.")
                 continue
-            price_preview = bookings.calculate_booking_total(seats, showtime.get("pricing", {}), seat_map=seat_map)
+            try:
+                hold = store.holds.hold_seats(sid, seats, ttl=HOLD_SECONDS)
+            except ValueError as exc:
+                print(f"Booking failed: {exc}")
+                continue
+            promo = input("Promo code (optional): ").strip()
+            discounts = [{"code": promo}] if promo else []
+            try:
+                price_preview = pricing.quote(showtime, seat_map, seats, discounts)
+            except ValueError as exc:
+                store.holds.release(hold["id"])
+                print(f"Booking failed: {exc}")
+                continue
             confirm = input(
-                f"Confirm booking? Seats: {', '.join(seats)} | Total: {price_preview['total']:.2f} (y/n): "
+                f"Seats held for {HOLD_SECONDS // 60} min. Confirm booking? Seats: {', '.join(seats)} | "
+                f"Total: {price_preview['total']:.2f} (y/n): "
             ).strip().lower()
             if confirm != "y":
+                store.holds.release(hold["id"])
                 print("Booking cancelled by user.")
                 continue
             name = input("Name: ").strip()
             email = input("Email: ").strip()
             phone = input("Phone (optional): ").strip()
             try:
-                booking = bookings.create_booking(
-                    showtimes,
-                    seat_maps,
-                    {"showtime_id": sid, "seats": seats, "customer": {"name": name, "email": email, "phone": phone}, "bookings": bookings_list},
-                )
-                path = bookings.generate_ticket(booking, TICKET_DIR)
-                print(f"Booking confirmed! ID: {booking['id']}. Ticket saved to {path}")
+                booking = store.holds.confirm(hold["id"], {"name": name, "email": email, "phone": phone}, discounts=discounts)
+                ticket_pipeline.submit(booking)
+                print(f"Booking confirmed! ID: {booking['id']}. Ticket: {ticket_pipeline.sink.location(booking['id'])}")
             except Exception as exc:
                 print(f"Booking failed: {exc}")
         elif choice == "4":
@@ -123,28 +198,56 @@ def customer_menu(movies_list, showtimes, seat_maps, bookings_list):
             if confirm != "y":
                 print("Cancellation aborted.")
                 continue
-            success, msg = bookings.cancel_booking(bookings_list, bid, seat_maps)
+            success, msg = store.cancel_booking(bid)
             print(msg if msg else ("Booking cancelled." if success else "Cancellation failed."))
         elif choice == "5":
             email = input("Email: ").strip()
-            mine = bookings.list_customer_bookings(bookings_list, email)
+            mine = store.list_customer_bookings(email)
             if not mine:
                 print("No active bookings.")
             for b in mine:
                 print(f"- {b['id']} | {b['showtime_snapshot'].get('datetime')} | Seats: {', '.join(b['seats'])} | Total: {b['pricing']['total']}")
+        elif choice == "6":
+            store.holds.expire()
+            email = input("Email: ").strip()
+            mine = waiting.entries(email=email)
+            if not mine:
+                print("No waitlist entries.")
+            for entry in mine:
+                if entry["status"] == "offered":
+                    seats = ", ".join(entry["offer"]["seats"])
+                    print(f"- {entry['id']} | {entry['showtime_id']} | OFFER: seats {seats}")
+                else:
+                    print(f"- {entry['id']} | {entry['showtime_id']} | {entry['seats']} seat(s) | position {waiting.position(entry['id'])}")
+            entry_id = input("Entry ID to accept/leave (blank = back): ").strip()
+            if not entry_id:
+                continue
+            action = input("a) Accept offer  l) Leave waitlist: ").strip().lower()
+            if action == "a":
+                try:
+                    booking = waiting.accept(entry_id)
+                    ticket_pipeline.submit(booking)
+                    print(f"Booking confirmed! ID: {booking['id']}. Ticket: {ticket_pipeline.sink.location(booking['id'])}")
+                except ValueError as exc:
+                    print(f"Booking failed: {exc}")
+            elif action == "l":
+                print("Removed from the waitlist." if waiting.leave(entry_id) else "Entry not found.")
         elif choice == "0":
             return
         else:
             print("Invalid option.")
 
 
-def admin_menu(movies_list, showtimes, seat_maps):
+def admin_menu(movies_list, store, ticket_pipeline):
     while True:
         print("\n-- Admin Menu --")
         print("1) Add movie")
         print("2) Schedule showtime")
         print("3) Create/Rebuild seat map")
         print("4) Update showtime pricing/date")
+        print("5) Archive past showtimes")
+        print("6) Start/stop profiling")
+        print("7) Import schedule (JSON file)")
         print("0) Back")
         choice = input("Select option: ").strip()
         if choice == "1":
@@ -176,28 +279,28 @@ def admin_menu(movies_list, showtimes, seat_maps):
             rows = input("Rows (e.g., ABCDEF): ").strip() or "ABCDEFGH"
             seats_per_row = int(input("Seats per row: ") or "12")
             premium_rows = list(input("Premium rows (e.g., AB): ").strip() or "AB")
-            showtime = movies.schedule_showtime(
-                showtimes,
-                {
-                    "movie_id": movie_id,
-                    "screen": screen,
-                    "datetime": dt,
-                    "language": lang,
-                    "pricing": {"standard": std_price, "premium": prem_price},
-                    "screen_config": {"rows": list(rows), "seats_per_row": seats_per_row, "premium_rows": premium_rows},
-                },
-            )
-            seat_maps[showtime["id"]] = seating.initialize_seat_map(showtime["screen_config"])
+            try:
+                showtime = store.schedule_showtime(
+                    {
+                        "movie_id": movie_id,
+                        "screen": screen,
+                        "datetime": dt,
+                        "language": lang,
+                        "pricing": {"standard": std_price, "premium": prem_price},
+                        "screen_config": {"rows": list(rows), "seats_per_row": seats_per_row, "premium_rows": premium_rows},
+                    },
+                )
+            except ValueError as exc:
+                print(exc)
+                continue
             print(f"Showtime created: {showtime['id']}")
         elif choice == "3":
             sid = input("Showtime ID (0=back): ").strip()
             if sid == "0" or not sid:
                 continue
-            st = next((s for s in showtimes if s.get("id") == sid), None)
-            if not st:
+            if not store.reset_seat_map(sid):
                 print("Showtime not found.")
                 continue
-            seat_maps[sid] = seating.initialize_seat_map(st.get("screen_config", {}))
             print("Seat map rebuilt. All seats set to available.")
         elif choice == "4":
             sid = input("Showtime ID: ").strip()
@@ -208,56 +311,114 @@ def admin_menu(movies_list, showtimes, seat_maps):
             if new_dt:
                 updates["datetime"] = new_dt
             if new_std or new_pre:
-                pricing = next((s.get("pricing", {}).copy() for s in showtimes if s.get("id") == sid), {})
+                price_table = (store.get_showtime(sid) or {}).get("pricing", {}).copy()
                 if new_std:
-                    pricing["standard"] = float(new_std)
+                    price_table["standard"] = float(new_std)
                 if new_pre:
-                    pricing["premium"] = float(new_pre)
-                updates["pricing"] = pricing
-            updated = movies.update_showtime(showtimes, sid, updates)
+                    price_table["premium"] = float(new_pre)
+                updates["pricing"] = price_table
+            try:
+                updated = store.update_showtime(sid, updates)
+            except ValueError as exc:
+                print(exc)
+                continue
             if updated:
-                print("Showtime updated.")
+                reissued = ticket_pipeline.reissue(store.bookings_for_showtime(sid), updated) if updates else []
+                print(f"Showtime updated. {len(reissued)} ticket(s) re-issued.")
             else:
                 print("Showtime not found.")
+        elif choice == "5":
+            counts = archive.archive_past(store, ARCHIVE_DIR)
+            print(
+                f"Archived {counts['showtimes']} showtimes and {counts['bookings']} bookings "
+                f"into {counts['partitions']} monthly file(s) under {ARCHIVE_DIR}"
+            )
+        elif choice == "6":
+            if metrics.profiling_active():
+                path = os.path.join(REPORT_DIR, f"profile-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.txt")
+                result = metrics.stop_profiling(path)
+                print(f"Profiling stopped ({result['samples']} sampled calls); report saved to {path}")
+            else:
+                metrics.start_profiling(sample_every=10, trace_memory=True)
+                print("Profiling started: every 10th timed call is profiled and memory is traced.")
+        elif choice == "7":
+            path = input("Schedule file (JSON list of showtimes): ").strip()
+            try:
+                entries = movies.load_schedule(path)
+            except (OSError, ValueError) as exc:
+                print(f"Could not read schedule: {exc}")
+                continue
+            partial = input("Skip conflicting shows and import the rest? (y/N): ").strip().lower() == "y"
+            result = store.import_schedule(entries, partial=partial)
+            for problem in result["rejected"]:
+                entry = entries[problem["index"]] if isinstance(entries[problem["index"]], dict) else {}
+                clashes = f" (overlaps {', '.join(problem['conflicts'])})" if problem["conflicts"] else ""
+                print(f"  #{problem['index']} {entry.get('screen', '')} {entry.get('datetime', '')}: {problem['error']}{clashes}")
+            print(f"Scheduled {len(result['scheduled'])} of {len(entries)} showtime(s).")
         elif choice == "0":
             return
         else:
             print("Invalid option.")
 
 
-def reports_menu(showtimes, seat_maps, bookings_list):
+def reports_menu(store):
     print("\n-- Reports --")
-    occ = reports.occupancy_report(showtimes, seat_maps, bookings_list)
+    occ = reports.occupancy_report(store.showtimes, store.seat_maps, store.bookings, aggregates=store.aggregates)
     for sid, data in occ.items():
-        print(f"{sid} | {data['datetime']} | {data['screen']} | {data['occupancy']}% full ({data['reserved']}/{data['total_seats']})")
+        print(
+            f"{sid} | {data['datetime']} | {data['screen']} | {data['occupancy']}% full "
+            f"({data['reserved']}/{data['total_seats']}, {data['held']} on hold)"
+        )
 
     start = datetime.utcnow().strftime("%Y-%m-%d 00:00")
     end = (datetime.utcnow() + timedelta(days=30)).strftime("%Y-%m-%d 23:59")
-    rev = reports.revenue_summary(bookings_list, (start, end))
+    rev = reports.revenue_summary(store.bookings, (start, end), aggregates=store.aggregates, archive_dir=ARCHIVE_DIR)
     print(f"Projected revenue {start} to {end}: {rev['total_revenue']} ({rev['booking_count']} bookings)")
 
-    top = reports.top_movies(bookings_list, showtimes, limit=5)
+    top = reports.top_movies(
+        store.bookings, store.showtimes, limit=5, aggregates=store.aggregates, archive_dir=ARCHIVE_DIR
+    )
     if top:
         print("Top movies by seats sold:")
         for item in top:
             print(f"- {item['movie_id']}: {item['seats_sold']} seats")
 
+    # one columnar projection (when NumPy is installed) serves every breakdown; rebuilt only after changes
+    columns = store.columns()
+    breakdowns = {
+        by: reports.breakdown(store.bookings, store.showtimes, by, (start, end), seat_maps=store.seat_maps, columns=columns)
+        for by in reports.BREAKDOWNS
+    }
+    for by in ("screen", "language", "zone"):
+        if breakdowns[by]:
+            print(f"Revenue by {by}: " + ", ".join(f"{key}: {row['revenue']}" for key, row in breakdowns[by].items()))
+
     export_choice = input("Export report to file? (y/n): ").strip().lower()
     if export_choice == "y":
         os.makedirs(REPORT_DIR, exist_ok=True)
         ts = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
         path = os.path.join(REPORT_DIR, f"report-{ts}.json")
-        payload = {"generated_at": ts, "occupancy": occ, "revenue": rev, "top_movies": top}
+        payload = {"generated_at": ts, "occupancy": occ, "revenue": rev, "top_movies": top, "breakdowns": breakdowns}
         reports.export_report(payload, path)
         print(f"Report saved to {path}")
 
 
 def main():
-    movies_list, showtimes, seat_maps, bookings_list = _init_state()
-    os.makedirs(TICKET_DIR, exist_ok=True)
+    movies_list, store, backend = _init_state()
+    ticket_pipeline = tickets.TicketPipeline(tickets.open_sink(TICKET_OUTPUT, TICKET_DIR))
+    backup_runner = backups.BackupRunner()
+    metrics_exporter = metrics.TextfileExporter(METRICS_FILE).start()
     os.makedirs(BACKUP_DIR, exist_ok=True)
+    waiting = waitlist.Waitlist(store, WAITLIST_FILE, on_offer=_announce_offer)
+    # offers do not survive a restart (holds are in memory), so make them again
+    waiting.match_all()
 
     while True:
+        for done in backup_runner.finished():
+            try:
+                print(f"Backup finished: {done.result()}")
+            except Exception as exc:
+                print(f"Backup failed: {exc}")
         print("\n=== Movie Ticket Booking System ===")
         print("1) Customer (buy/cancel tickets)")
         print("2) Admin (manage movies & showtimes)")
@@ -266,18 +427,29 @@ def main():
         print("0) Exit")
         choice = input("Select option: ").strip()
         if choice == "1":
-            customer_menu(movies_list, showtimes, seat_maps, bookings_list)
-            _persist(movies_list, showtimes, seat_maps, bookings_list)
+            customer_menu(movies_list, store, ticket_pipeline, waiting)
+            _persist(movies_list, store, backend)
+            waiting.flush()
         elif choice == "2":
-            admin_menu(movies_list, showtimes, seat_maps)
-            _persist(movies_list, showtimes, seat_maps, bookings_list)
+            admin_menu(movies_list, store, ticket_pipeline)
+            _persist(movies_list, store, backend)
+            # a seat-map reset can hand seats to waiters
+            waiting.flush()
         elif choice == "3":
-            reports_menu(showtimes, seat_maps, bookings_list)
+            reports_menu(store)
         elif choice == "9":
-            paths = storage.backup_state(DATA_DIR, showtimes, seat_maps, bookings_list, BACKUP_DIR)
-            print(f"Backups created: {paths}")
+            # runs on a background thread; the result is reported on a later menu pass
+            backup_runner.submit(backend.backup, store, BACKUP_DIR)
+            print("Backup started in the background.")
         elif choice == "0":
-            _persist(movies_list, showtimes, seat_maps, bookings_list)
+            backup_runner.close()
+            waiting.close()
+            _persist(movies_list, store, backend, snapshot=True)
+            if store.journal is not None:
+                store.journal.close()
+            backend.close()
+            ticket_pipeline.close()
+            metrics_exporter.stop()
             print("Goodbye!")
             break
         else:
@@ -0,0 +1,392 @@
+import bisect
+import cProfile
+import functools
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+import weakref
+from typing import Callable, List, Dict, Optional, Tuple
+
+# set to False to turn every timer into a plain call
+ENABLED = True
+
+# latency buckets in seconds (upper bounds), roughly x2.5 apart from 50us to 10s
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_text(names: Tuple[str, ...], values: Tuple) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Counter:
+    """Monotonic counter, optionally split by label values."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values) -> float:
+        return self._values.get(label_values, 0)
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, _label_text(self.labels, values), value) for values, value in items]
+
+
+class Gauge:
+    """Current value, either set directly or read from a callback at export time.
+
+    The callback returns a number, or ``{label_values_tuple: number}`` for a
+    labelled gauge, so values such as free seats per showtime cost nothing
+    until someone scrapes them.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (), callback: Optional[Callable] = None):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.callback = callback
+        self._values: Dict[Tuple, float] = {}
+
+    def set(self, value: float, *label_values) -> None:
+        self._values[label_values] = value
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        values = dict(self._values)
+        if self.callback is not None:
+            result = self.callback()
+            if isinstance(result, dict):
+                values.update(result)
+            elif result is not None:
+                values[()] = result
+        return [(self.name, _label_text(self.labels, key), value) for key, value in values.items()]
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *label_values) -> int:
+        series = self._series.get(label_values)
+        return series[2] if series else 0
+
+    def quantile(self, q: float, *label_values) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th observation (None without data)."""
+        series = self._series.get(label_values)
+        if not series or not series[2]:
+            return None
+        target = q * series[2]
+        running = 0
+        for bound, n in zip(self.buckets + (float("inf"),), series[0]):
+            running += n
+            if running >= target:
+                return bound
+        return float("inf")
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        with self._lock:
+            items = [(values, list(counts), total, n) for values, (counts, total, n) in self._series.items()]
+        out = []
+        for values, counts, total, n in items:
+            running = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                running += c
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                out.append((f"{self.name}_bucket", _label_text(self.labels + ("le",), values + (le,)), running))
+            out.append((f"{self.name}_sum", _label_text(self.labels, values), total))
+            out.append((f"{self.name}_count", _label_text(self.labels, values), n))
+        return out
+
+
+class RateMeter:
+    """Events over the last ``window`` seconds, kept in one-second buckets."""
+
+    def __init__(self, window: int = 60, clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.clock = clock
+        self._counts = [0] * window
+        self._seconds = [0] * window
+        self._lock = threading.Lock()
+
+    def mark(self, n: int = 1) -> None:
+        second = int(self.clock())
+        slot = second % self.window
+        with self._lock:
+            if self._seconds[slot] != second:
+                self._seconds[slot] = second
+                self._counts[slot] = 0
+            self._counts[slot] += n
+
+    def total(self) -> int:
+        now = int(self.clock())
+        with self._lock:
+            return sum(c for c, s in zip(self._counts, self._seconds) if now - s < self.window)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def get(self, name: str):
+        return self._metrics.get(name)
+
+    def counter(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: Tuple[str, ...] = (), callback: Optional[Callable] = None) -> Gauge:
+        return self.register(Gauge(name, help_text, labels, callback))
+
+    def histogram(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Histogram:
+        return self.register(Histogram(name, help_text, labels))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+REGISTRY = Registry()
+
+LATENCY = REGISTRY.histogram("cinema_operation_seconds", "Latency of instrumented operations", ("operation",))
+BOOKINGS_CREATED = REGISTRY.counter("cinema_bookings_created_total", "Bookings created")
+BOOKINGS_CANCELLED = REGISTRY.counter("cinema_bookings_cancelled_total", "Bookings cancelled")
+BOOKING_FAILURES = REGISTRY.counter("cinema_booking_failures_total", "Rejected booking attempts by reason", ("reason",))
+BOOKING_RATE = RateMeter()
+REGISTRY.gauge("cinema_bookings_per_minute", "Bookings created in the last 60 seconds", callback=BOOKING_RATE.total)
+
+
+def booking_created(n: int = 1) -> None:
+    BOOKINGS_CREATED.inc(amount=n)
+    BOOKING_RATE.mark(n)
+
+
+def booking_failed(reason: str) -> None:
+    BOOKING_FAILURES.inc(reason)
+
+
+# -- timers --------------------------------------------------------------------
+
+
+def timed(operation: str) -> Callable:
+    """Decorator recording the call's latency under ``operation``.
+
+    Costs two clock reads and a bucket increment while ``ENABLED``; with a
+    sampling profiler switched on (``start_profiling``), every Nth call is
+    also run under cProfile.
+    """
+
+    def decorate(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            profiler = _PROFILER
+            start = time.perf_counter()
+            try:
+                if profiler is not None and profiler.should_sample():
+                    return profiler.run(fn, *args, **kwargs)
+                return fn(*args, **kwargs)
+            finally:
+                LATENCY.observe(time.perf_counter() - start, operation)
+
+        return wrapper
+
+    return decorate
+
+
+# -- runtime profiling hooks ----------------------------------------------------
+
+
+class SamplingProfiler:
+    """Runs every ``sample_every``-th timed call under one shared cProfile profile."""
+
+    def __init__(self, sample_every: int = 100):
+        self.sample_every = max(1, sample_every)
+        self.profile = cProfile.Profile()
+        self.samples = 0
+        self._calls = 0
+        self._busy = threading.Lock()
+
+    def should_sample(self) -> bool:
+        self._calls += 1
+        return self._calls % self.sample_every == 0
+
+    def run(self, fn: Callable, *args, **kwargs):
+        # one profiled call at a time; nested or concurrent calls run unprofiled
+        if not self._busy.acquire(blocking=False):
+            return fn(*args, **kwargs)
+        try:
+            self.samples += 1
+            return self.profile.runcall(fn, *args, **kwargs)
+        finally:
+            self._busy.release()
+
+    def report(self, limit: int = 20) -> str:
+        out = io.StringIO()
+        with self._busy:
+            pstats.Stats(self.profile, stream=out).sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+
+_PROFILER: Optional[SamplingProfiler] = None
+
+
+def start_profiling(sample_every: int = 100, trace_memory: bool = False) -> None:
+    """Turn on cProfile sampling of timed calls and, optionally, tracemalloc."""
+    global _PROFILER
+    _PROFILER = SamplingProfiler(sample_every)
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def stop_profiling(path: Optional[str] = None, limit: int = 20) -> Dict:
+    """Turn profiling off; returns (and with ``path`` also writes) what was collected."""
+    global _PROFILER
+    profiler, _PROFILER = _PROFILER, None
+    result = {"samples": 0, "profile": "", "memory": []}
+    if profiler is not None:
+        result["samples"] = profiler.samples
+        result["profile"] = profiler.report(limit)
+    if tracemalloc.is_tracing():
+        snapshot = tracemalloc.take_snapshot()
+        result["memory"] = [str(stat) for stat in snapshot.statistics("lineno")[:limit]]
+        tracemalloc.stop()
+    if path:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(result["profile"])
+            if result["memory"]:
+                f.write("\nTop allocations:\n" + "\n".join(result["memory"]) + "\n")
+    return result
+
+
+def profiling_active() -> bool:
+    return _PROFILER is not None
+
+
+REGISTRY.gauge(
+    "cinema_tracemalloc_bytes",
+    "Memory traced by tracemalloc (0 when off)",
+    callback=lambda: tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0,
+)
+
+
+# -- store gauges -------------------------------------------------------------
+
+_store_ref: Optional[weakref.ref] = None
+
+
+def _free_seats() -> Dict[Tuple, int]:
+    store = _store_ref() if _store_ref is not None else None
+    if store is None:
+        return {}
+    return {(sid,): seat_map.free for sid, seat_map in list(store.seat_maps.items()) if hasattr(seat_map, "free")}
+
+
+def track_store(store) -> None:
+    """Export gauges (free seats per showtime) for this store; the last one tracked wins."""
+    global _store_ref
+    _store_ref = weakref.ref(store)
+
+
+REGISTRY.gauge("cinema_free_seats", "Free seats per showtime", ("showtime",), callback=_free_seats)
+
+
+# -- exporters ------------------------------------------------------------------
+
+
+def write_textfile(path: str, registry: Registry = REGISTRY) -> None:
+    """Write the metrics atomically, e.g. for node_exporter's textfile collector."""
+    tmp_path = f"{path}.tmp"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(registry.render())
+    os.replace(tmp_path, path)
+
+
+class TextfileExporter:
+    """Rewrites a Prometheus text file every ``interval`` seconds on a daemon thread."""
+
+    def __init__(self, path: str, interval: float = 15.0, registry: Registry = REGISTRY):
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-export", daemon=True)
+
+    def start(self) -> "TextfileExporter":
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            write_textfile(self.path, self.registry)
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        write_textfile(self.path, self.registry)
@@ -1,8 +1,15 @@
+import bisect
 import json
 import os
 import uuid
-from datetime import datetime
-from typing import List, Dict, Optional
+from datetime import datetime, timedelta
+from typing import Container, List, Dict, Iterable, Optional, Tuple
+
+# minutes a screen stays blocked after the film ends
+CLEANING_MIN = 15
+# runtime assumed for showtimes whose movie is unknown (add_movie's default)
+DEFAULT_DURATION_MIN = 90
+_SCHEDULE_FIELDS = {"datetime", "screen", "movie_id"}
 
 
 def _ensure_parent(path: str) -> None:
@@ -43,8 +50,12 @@ def add_movie(movies: List[Dict], movie_data: Dict) -> Dict:
     return movie
 
 
-def schedule_showtime(showtimes: List[Dict], showtime_data: Dict) -> Dict:
-    """Create a new showtime entry."""
+def schedule_showtime(showtimes: List[Dict], showtime_data: Dict, schedule: Optional["ScreenSchedule"] = None) -> Dict:
+    """Create a new showtime entry.
+
+    With a ``schedule`` the show is rejected (ValueError) when its screen is
+    still busy with another show, cleaning time included.
+    """
     showtime = {
         "id": showtime_data.get("id") or str(uuid.uuid4())[:10],
         "movie_id": showtime_data["movie_id"],
@@ -57,17 +68,176 @@ def schedule_showtime(showtimes: List[Dict], showtime_data: Dict) -> Dict:
         "screen_config": showtime_data.get("screen_config")
         or {"rows": list("ABCDEFGH"), "seats_per_row": 12, "premium_rows": ["A", "B"]},
     }
+    if schedule is not None:
+        schedule.check(showtime)
+        schedule.add(showtime)
     showtimes.append(showtime)
     return showtime
 
 
+def parse_showtime_datetime(value: Optional[str]) -> Optional[datetime]:
+    """Parse a stored showtime datetime ("YYYY-MM-DD HH:MM", ISO, or a bare date)."""
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        try:
+            dt = datetime.strptime(value, "%Y-%m-%d %H:%M")
+        except ValueError:
+            return None
+    # keep every key naive so they stay comparable
+    return dt.replace(tzinfo=None)
+
+
+class _TimeBucket:
+    """Showtime ids kept sorted by start time (parallel lists for bisect)."""
+
+    __slots__ = ("times", "ids")
+
+    def __init__(self):
+        self.times: List[datetime] = []
+        self.ids: List[str] = []
+
+    def add(self, start: datetime, showtime_id: str) -> None:
+        pos = bisect.bisect_right(self.times, start)
+        self.times.insert(pos, start)
+        self.ids.insert(pos, showtime_id)
+
+    def remove(self, start: datetime, showtime_id: str) -> None:
+        lo = bisect.bisect_left(self.times, start)
+        hi = bisect.bisect_right(self.times, start)
+        pos = self.ids.index(showtime_id, lo, hi)
+        del self.times[pos]
+        del self.ids[pos]
+
+    def between(self, start: Optional[datetime], end: Optional[datetime]) -> List[str]:
+        lo = 0 if start is None else bisect.bisect_left(self.times, start)
+        hi = len(self.times) if end is None else bisect.bisect_left(self.times, end)
+        return self.ids[lo:hi]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+class ShowtimeIndex:
+    """Showtimes ordered by start time, with per-movie and per-screen buckets.
+
+    Datetimes are parsed once when a showtime is added or moved, so range
+    queries cost O(log n + k). Showtimes whose datetime cannot be parsed are
+    only returned by queries without a time range.
+    """
+
+    def __init__(self, showtimes: Iterable[Dict] = ()):
+        self._showtimes: Dict[str, Dict] = {}
+        self._keys: Dict[str, Tuple[Optional[datetime], str, str]] = {}
+        self._all = _TimeBucket()
+        self._by_movie: Dict[str, _TimeBucket] = {}
+        self._by_screen: Dict[str, _TimeBucket] = {}
+        self._undated: Dict[str, None] = {}
+        for st in showtimes:
+            self.add(st)
+
+    def add(self, showtime: Dict) -> None:
+        sid = showtime.get("id")
+        if sid in self._keys:
+            self.remove(sid)
+        start = parse_showtime_datetime(showtime.get("datetime"))
+        key = (start, showtime.get("movie_id"), showtime.get("screen"))
+        self._showtimes[sid] = showtime
+        self._keys[sid] = key
+        if start is None:
+            self._undated[sid] = None
+            return
+        self._all.add(start, sid)
+        self._by_movie.setdefault(key[1], _TimeBucket()).add(start, sid)
+        self._by_screen.setdefault(key[2], _TimeBucket()).add(start, sid)
+
+    def remove(self, showtime_id: str) -> None:
+        key = self._keys.pop(showtime_id, None)
+        if key is None:
+            return
+        self._showtimes.pop(showtime_id, None)
+        start, movie_id, screen = key
+        if start is None:
+            self._undated.pop(showtime_id, None)
+            return
+        self._all.remove(start, showtime_id)
+        self._by_movie[movie_id].remove(start, showtime_id)
+        self._by_screen[screen].remove(start, showtime_id)
+
+    def update(self, showtime: Dict) -> None:
+        """Re-index a showtime whose datetime, movie or screen may have changed."""
+        key = (parse_showtime_datetime(showtime.get("datetime")), showtime.get("movie_id"), showtime.get("screen"))
+        if self._keys.get(showtime.get("id")) != key:
+            self.add(showtime)
+
+    def start_of(self, showtime_id: str) -> Optional[datetime]:
+        key = self._keys.get(showtime_id)
+        return key[0] if key else None
+
+    def between(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        movie_id: Optional[str] = None,
+        screen: Optional[str] = None,
+    ) -> List[Dict]:
+        """Showtimes starting in [start, end), in time order, optionally for one movie and/or screen.
+
+        An empty ``movie_id`` or ``screen`` means no filter, as in the linear scan.
+        """
+        movie_id = movie_id or None
+        screen = screen or None
+        buckets = []
+        if movie_id is not None:
+            buckets.append(self._by_movie.get(movie_id, _TimeBucket()))
+        if screen is not None:
+            buckets.append(self._by_screen.get(screen, _TimeBucket()))
+        bucket = min(buckets, key=len) if buckets else self._all
+        results = []
+        for sid in bucket.between(start, end):
+            _, st_movie, st_screen = self._keys[sid]
+            if movie_id is not None and st_movie != movie_id:
+                continue
+            if screen is not None and st_screen != screen:
+                continue
+            results.append(self._showtimes[sid])
+        if start is None and end is None:
+            for sid in self._undated:
+                _, st_movie, st_screen = self._keys[sid]
+                if (movie_id is None or st_movie == movie_id) and (screen is None or st_screen == screen):
+                    results.append(self._showtimes[sid])
+        return results
+
+    def on_date(self, date: str, movie_id: Optional[str] = None, screen: Optional[str] = None) -> List[Dict]:
+        """Showtimes on a calendar day (YYYY-MM-DD)."""
+        day = datetime.strptime(date, "%Y-%m-%d")
+        return self.between(day, day + timedelta(days=1), movie_id=movie_id, screen=screen)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
 def list_showtimes(
     showtimes: List[Dict],
     movie_id: Optional[str] = None,
     date: Optional[str] = None,
     screen: Optional[str] = None,
+    index: Optional[ShowtimeIndex] = None,
 ) -> List[Dict]:
-    """Filter showtimes by movie, date (YYYY-MM-DD), or screen."""
+    """Filter showtimes by movie, date (YYYY-MM-DD), or screen.
+
+    With an ``index`` the lookup is O(log n + k) and results come back in
+    time order; partial dates (e.g. "2026-03") still use the linear scan.
+    """
+    if index is not None:
+        if not date:
+            return index.between(movie_id=movie_id, screen=screen)
+        try:
+            return index.on_date(date, movie_id=movie_id, screen=screen)
+        except ValueError:
+            pass
     results = []
     for st in showtimes:
         if movie_id and st.get("movie_id") != movie_id:
@@ -80,16 +250,165 @@ def list_showtimes(
     return results
 
 
-def update_showtime(showtimes: List[Dict], showtime_id: str, updates: Dict) -> Optional[Dict]:
-    """Update a showtime by id; returns the updated record or None if not found."""
+def update_showtime(
+    showtimes: List[Dict], showtime_id: str, updates: Dict, schedule: Optional["ScreenSchedule"] = None
+) -> Optional[Dict]:
+    """Update a showtime by id; returns the updated record or None if not found.
+
+    With a ``schedule``, moving the show onto a busy slot raises ValueError
+    and leaves it unchanged.
+    """
     for st in showtimes:
         if st.get("id") == showtime_id:
+            if schedule is not None and _SCHEDULE_FIELDS & updates.keys():
+                moved = dict(st, **{k: v for k, v in updates.items() if k != "id"})
+                schedule.check(moved)
             for key, value in updates.items():
                 if key == "id":
                     continue
                 st[key] = value
             st["updated_at"] = datetime.utcnow().isoformat(timespec="seconds")
+            if schedule is not None:
+                schedule.update(st)
             return st
     return None
 
 
+class ScreenSchedule:
+    """When each screen is busy: from a show's start to the end of the film plus cleaning.
+
+    Every screen keeps its shows in a ``_TimeBucket`` sorted by start and
+    remembers its longest slot, so an overlap check only bisects to the
+    shows starting at most that long before the new one ends: O(log n + k)
+    with k the (normally zero) clashing shows. Runtimes come from
+    ``movies_list``; an unknown movie id reads only the movies appended
+    since the last lookup, so movies added later are picked up. Overlaps already present
+    in loaded data are indexed as they are; only new or moved shows are
+    checked.
+    """
+
+    def __init__(
+        self, showtimes: Iterable[Dict] = (), movies_list: Optional[List[Dict]] = None, cleaning_min: int = CLEANING_MIN
+    ):
+        self.movies_list = movies_list if movies_list is not None else []
+        self.cleaning = timedelta(minutes=cleaning_min)
+        self._durations: Dict[str, int] = {}
+        self._known = 0
+        self._slots: Dict[str, Tuple[str, datetime, datetime]] = {}
+        self._screens: Dict[str, _TimeBucket] = {}
+        self._longest: Dict[str, timedelta] = {}
+        for st in showtimes:
+            self.add(st)
+
+    def _duration(self, movie_id: Optional[str]) -> int:
+        if movie_id not in self._durations and self._known < len(self.movies_list):
+            # add_movie only appends, so just the movies added since the last miss are read
+            for movie in self.movies_list[self._known:]:
+                self._durations[movie.get("id")] = int(movie.get("duration_min") or DEFAULT_DURATION_MIN)
+            self._known = len(self.movies_list)
+        return self._durations.get(movie_id, DEFAULT_DURATION_MIN)
+
+    def slot(self, showtime: Dict) -> Optional[Tuple[datetime, datetime]]:
+        """(start, end) the show occupies its screen, cleaning included; None if undated."""
+        start = parse_showtime_datetime(showtime.get("datetime"))
+        if start is None:
+            return None
+        return start, start + timedelta(minutes=self._duration(showtime.get("movie_id"))) + self.cleaning
+
+    def conflicts(self, showtime: Dict) -> List[str]:
+        """Ids of other shows on the same screen whose slots overlap this one's."""
+        slot = self.slot(showtime)
+        bucket = self._screens.get(showtime.get("screen"))
+        if slot is None or bucket is None:
+            return []
+        start, end = slot
+        clashes = []
+        for sid in bucket.between(start - self._longest[showtime.get("screen")], end):
+            if sid != showtime.get("id") and self._slots[sid][2] > start:
+                clashes.append(sid)
+        return clashes
+
+    def check(self, showtime: Dict) -> None:
+        """Raise ValueError if the show's screen is busy during its slot."""
+        clashes = self.conflicts(showtime)
+        if clashes:
+            raise ValueError(f"{showtime.get('screen')} is busy at {showtime.get('datetime')} (overlaps {', '.join(clashes)})")
+
+    def add(self, showtime: Dict) -> None:
+        sid = showtime.get("id")
+        self.remove(sid)
+        slot = self.slot(showtime)
+        if slot is None:
+            return
+        screen = showtime.get("screen")
+        self._slots[sid] = (screen, slot[0], slot[1])
+        self._screens.setdefault(screen, _TimeBucket()).add(slot[0], sid)
+        self._longest[screen] = max(self._longest.get(screen, timedelta(0)), slot[1] - slot[0])
+
+    def remove(self, showtime_id: str) -> None:
+        slot = self._slots.pop(showtime_id, None)
+        if slot is not None:
+            self._screens[slot[0]].remove(slot[1], showtime_id)
+
+    def update(self, showtime: Dict) -> None:
+        """Re-index a show whose datetime, screen or movie may have changed."""
+        self.add(showtime)
+
+    def validate(self, entries: List[Dict], known_ids: Container = ()) -> List[Dict]:
+        """Check a whole programme of new shows in one pass; returns one problem per bad entry.
+
+        Entries are grouped by screen and swept in start order, so clashes
+        inside the programme cost O(m log m); each entry is also checked
+        against the shows already scheduled. Entries that pass are exactly
+        the ones ``import_schedule(partial=True)`` schedules. A problem is
+        ``{"index", "error", "conflicts"}``, where ``conflicts`` holds ids of
+        scheduled shows and ``#<index>`` for entries of the programme itself.
+        Entries reusing an id from ``known_ids`` (the existing showtimes) or
+        from an earlier entry are rejected too.
+        """
+        problems: Dict[int, Dict] = {}
+        by_screen: Dict[str, List[Tuple[datetime, datetime, int]]] = {}
+        ids: Dict[str, int] = {}
+        for pos, entry in enumerate(entries):
+            if not isinstance(entry, dict) or not entry.get("movie_id"):
+                problems[pos] = {"index": pos, "error": "movie_id is required", "conflicts": []}
+                continue
+            sid = entry.get("id")
+            if sid:
+                if sid in known_ids or sid in ids:
+                    clash = sid if sid in known_ids else f"#{ids[sid]}"
+                    problems[pos] = {"index": pos, "error": f"showtime id {sid} already exists", "conflicts": [clash]}
+                    continue
+                ids[sid] = pos
+            entry = dict(entry, screen=entry.get("screen", "Screen 1"))
+            slot = self.slot(entry)
+            if slot is None:
+                problems[pos] = {"index": pos, "error": "datetime must be YYYY-MM-DD HH:MM", "conflicts": []}
+                continue
+            clashes = self.conflicts(entry)
+            if clashes:
+                problems[pos] = {"index": pos, "error": f"{entry['screen']} is busy", "conflicts": clashes}
+            by_screen.setdefault(entry["screen"], []).append((slot[0], slot[1], pos))
+        for screen, slots in by_screen.items():
+            slots.sort()
+            # the accepted show ending last so far: a later start before its end overlaps it;
+            # rejected entries do not block the ones after them
+            latest_end, latest_pos = None, None
+            for start, end, pos in slots:
+                if latest_end is not None and start < latest_end:
+                    problem = problems.setdefault(pos, {"index": pos, "error": f"{screen} is busy", "conflicts": []})
+                    problem["conflicts"].append(f"#{latest_pos}")
+                elif pos not in problems and (latest_end is None or end > latest_end):
+                    latest_end, latest_pos = end, pos
+        return [problems[pos] for pos in sorted(problems)]
+
+
+def load_schedule(path: str) -> List[Dict]:
+    """Read a programme to import: a JSON list of showtimes, or ``{"showtimes": [...]}``."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("showtimes")
+    if not isinstance(data, list):
+        raise ValueError("Schedule file must hold a list of showtimes")
+    return data
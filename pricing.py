@@ -0,0 +1,222 @@
+import json
+import os
+import threading
+from typing import List, Dict, Optional, Tuple
+
+import metrics
+import movies
+import seating
+
+TAX_RATE = 0.08
+
+
+def totals(subtotal: float, discounts: List[Dict], tax_rate: float = TAX_RATE) -> Dict:
+    """Apply percent/flat discounts and tax to a subtotal (shared by every pricing path)."""
+    discount_value = 0.0
+    for disc in discounts:
+        if disc.get("type") == "percent":
+            discount_value += subtotal * float(disc.get("value", 0)) / 100.0
+        elif disc.get("type") == "flat":
+            discount_value += float(disc.get("value", 0))
+    discount_value = min(discount_value, subtotal)
+
+    taxable = subtotal - discount_value
+    tax = round(taxable * tax_rate, 2)
+    total = round(taxable + tax, 2)
+    return {
+        "subtotal": round(subtotal, 2),
+        "discount": round(discount_value, 2),
+        "tax": tax,
+        "total": total,
+    }
+
+
+def _minutes(value: str) -> int:
+    hours, minutes = value.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def _adjust(cents: int, percent: float) -> int:
+    return int(round(cents * (100 + percent) / 100))
+
+
+class PriceTable:
+    """A showtime's ``pricing`` dict and rules compiled into per-zone prices in cents.
+
+    Time-of-day rules depend only on the showtime, so they are folded into
+    ``zone_cents`` up front; surge rules become occupancy bands, each with
+    its own zone price table built on first use.
+    """
+
+    __slots__ = ("source", "datetime", "zone_cents", "default_cents", "surge", "_band_cents")
+
+    def __init__(self, showtime: Dict, rules: List[Dict]):
+        self.source = showtime.get("pricing")
+        pricing = self.source or {}
+        self.datetime = showtime.get("datetime")
+        start = movies.parse_showtime_datetime(self.datetime)
+        minute = start.hour * 60 + start.minute if start else None
+        base = {zone: int(round(float(price) * 100)) for zone, price in pricing.items()}
+        self.default_cents = base.get("standard", 0)
+        surge = []
+        for rule in rules:
+            kind = rule.get("type")
+            if kind == "time_of_day":
+                if minute is None or not _minutes(rule["from"]) <= minute <= _minutes(rule["to"]):
+                    continue
+                for zone in rule.get("zones") or list(base):
+                    if zone in base:
+                        base[zone] = _adjust(base[zone], float(rule["percent"]))
+                if "standard" in base:
+                    self.default_cents = base["standard"]
+            elif kind == "surge":
+                surge.append((float(rule["min_occupancy"]), float(rule["percent"])))
+            else:
+                raise ValueError(f"Unknown pricing rule: {kind}")
+        self.zone_cents = base
+        # bands sorted by threshold; band 0 is "no surge"
+        self.surge = sorted(surge)
+        self._band_cents: Dict[int, Dict[str, int]] = {0: base}
+
+    def band(self, occupancy: float) -> int:
+        """Index of the highest surge band reached at ``occupancy`` percent (0 = none)."""
+        band = 0
+        for i, (threshold, _) in enumerate(self.surge, start=1):
+            if occupancy >= threshold:
+                band = i
+        return band
+
+    def prices(self, band: int) -> Dict[str, int]:
+        table = self._band_cents.get(band)
+        if table is None:
+            percent = self.surge[band - 1][1]
+            table = self._band_cents[band] = {zone: _adjust(cents, percent) for zone, cents in self.zone_cents.items()}
+        return table
+
+
+class PricingEngine:
+    """Quotes bookings from compiled price tables and caches the results.
+
+    Rules come from the engine (applied to every showtime) followed by the
+    showtime's own ``pricing_rules``:
+
+    - ``{"type": "time_of_day", "from": "18:00", "to": "23:59", "percent": 15, "zones": [...]}``
+    - ``{"type": "surge", "min_occupancy": 70, "percent": 20}`` (occupancy in percent)
+
+    Discounts are ``{"type": "percent"|"flat", "value": ...}`` or
+    ``{"code": "..."}`` looked up in ``promos``. Quotes are cached by
+    (showtime, seats per zone, discounts, occupancy band); a showtime's
+    table and quotes are dropped by ``invalidate`` and rebuilt when its
+    ``pricing``/``pricing_rules`` objects or datetime change.
+    """
+
+    def __init__(
+        self,
+        rules: Optional[List[Dict]] = None,
+        promos: Optional[Dict[str, Dict]] = None,
+        tax_rate: float = TAX_RATE,
+        max_quotes: int = 256,
+    ):
+        self.rules = list(rules or [])
+        self.promos = {code.upper(): disc for code, disc in (promos or {}).items()}
+        self.tax_rate = tax_rate
+        self.max_quotes = max_quotes
+        self._tables: Dict[str, Tuple[object, PriceTable]] = {}
+        self._quotes: Dict[str, Dict[Tuple, Dict]] = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self, showtime_id: Optional[str] = None) -> None:
+        """Forget compiled prices and cached quotes for one showtime (or all)."""
+        with self._lock:
+            if showtime_id is None:
+                self._tables.clear()
+                self._quotes.clear()
+            else:
+                self._tables.pop(showtime_id, None)
+                self._quotes.pop(showtime_id, None)
+
+    def table(self, showtime: Dict) -> PriceTable:
+        sid = showtime.get("id")
+        rules = showtime.get("pricing_rules")
+        cached = self._tables.get(sid)
+        if cached is not None:
+            cached_rules, table = cached
+            if table.source is showtime.get("pricing") and cached_rules is rules and table.datetime == showtime.get("datetime"):
+                return table
+        table = PriceTable(showtime, self.rules + list(rules or []))
+        with self._lock:
+            self._tables[sid] = (rules, table)
+            self._quotes.pop(sid, None)
+        return table
+
+    def resolve_discounts(self, discounts: Optional[List[Dict]]) -> Tuple[Tuple[str, float], ...]:
+        resolved = []
+        for disc in discounts or []:
+            if "code" in disc:
+                promo = self.promos.get(str(disc["code"]).upper())
+                if promo is None:
+                    raise ValueError(f"Unknown promo code: {disc['code']}")
+                disc = promo
+            resolved.append((disc.get("type"), float(disc.get("value", 0))))
+        return tuple(resolved)
+
+    def quote(self, showtime: Dict, seat_map: Dict, seats: List[str], discounts: Optional[List[Dict]] = None) -> Dict:
+        """Price ``seats`` for ``showtime``; the same seats and state always give the same total.
+
+        The surge band is taken from seats occupied by *other* customers, so
+        a preview (seats free or held) and the booking (seats reserved) agree.
+        """
+        table = self.table(showtime)
+        zone_counts: Dict[str, int] = {}
+        layout = getattr(seat_map, "layout", None)
+        for code in seats:
+            if layout is not None and code in layout.index:
+                zone = layout.zones[layout.index[code]]
+            elif code in seat_map:
+                zone = seat_map[code].get("zone")
+            else:
+                zone = None
+            zone = zone or "standard"
+            zone_counts[zone] = zone_counts.get(zone, 0) + 1
+        band = 0
+        if table.surge and len(seat_map):
+            own_taken = sum(1 for code in seats if code in seat_map and not seating.is_seat_available(seat_map, code))
+            taken = len(seat_map) - seating.free_seat_count(seat_map) - own_taken
+            band = table.band(taken * 100 / len(seat_map))
+        resolved = self.resolve_discounts(discounts)
+        key = (tuple(sorted(zone_counts.items())), resolved, band)
+        quotes = self._quotes.get(showtime.get("id"))
+        cached = quotes.get(key) if quotes is not None else None
+        if cached is None:
+            prices = table.prices(band)
+            subtotal_cents = sum(prices.get(zone, table.default_cents) * n for zone, n in zone_counts.items())
+            cached = totals(subtotal_cents / 100, [{"type": t, "value": v} for t, v in resolved], self.tax_rate)
+            with self._lock:
+                quotes = self._quotes.setdefault(showtime.get("id"), {})
+                if len(quotes) >= self.max_quotes:
+                    quotes.clear()
+                quotes[key] = cached
+        return dict(cached)
+
+
+# shared by bookings, the CLI and the HTTP server so previews and bookings use the same prices
+ENGINE = PricingEngine()
+
+
+@metrics.timed("price_quote")
+def quote(showtime: Dict, seat_map: Dict, seats: List[str], discounts: Optional[List[Dict]] = None) -> Dict:
+    return ENGINE.quote(showtime, seat_map, seats, discounts)
+
+
+def invalidate(showtime_id: Optional[str] = None) -> None:
+    ENGINE.invalidate(showtime_id)
+
+
+def load_promos(path: str) -> int:
+    """Register promo codes from a ``{"CODE": {"type", "value"}}`` JSON file, if present."""
+    if not os.path.exists(path):
+        return 0
+    with open(path, "r", encoding="utf-8") as f:
+        promos = json.load(f)
+    ENGINE.promos.update({code.upper(): disc for code, disc in promos.items()})
+    return len(promos)
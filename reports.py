@@ -1,37 +1,173 @@
+import bisect
+import copy
 import json
 import os
 from datetime import datetime
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 
+import analytics
+import archive
+import metrics
+import seating
 
-def occupancy_report(showtimes: List[Dict], seat_maps: Dict, bookings: List[Dict]) -> Dict:
+
+class ReportAggregates:
+    """Report totals maintained on write, so reports cost O(1) per row.
+
+    ``record_booking``/``record_cancellation`` are called once per event and
+    keep: reserved seats and active bookings per showtime, revenue (in cents)
+    per showtime day with a per-showtime-time breakdown for partial days, and
+    seats sold per movie.
+    """
+
+    def __init__(self):
+        self.reserved_by_showtime: Dict[str, int] = {}
+        self.bookings_by_showtime: Dict[str, int] = {}
+        self.seats_by_movie: Dict[str, int] = {}
+        self.revenue_by_day: Dict[str, List[int]] = {}
+        self.revenue_by_slot: Dict[str, Dict[datetime, List[int]]] = {}
+        self._days: List[str] = []
+
+    @classmethod
+    def build(
+        cls, bookings: List[Dict], showtimes: List[Dict], base: Optional["ReportAggregates"] = None
+    ) -> "ReportAggregates":
+        """One pass over existing bookings (e.g. at startup), on top of ``base`` totals if given."""
+        aggregates = copy.deepcopy(base) if base is not None else cls()
+        st_by_id = {st.get("id"): st for st in showtimes}
+        for b in bookings:
+            if b.get("status") == "active":
+                aggregates.record_booking(b, st_by_id.get(b.get("showtime_id")))
+        return aggregates
+
+    def record_booking(self, booking: Dict, showtime: Optional[Dict]) -> None:
+        self._apply(booking, showtime, 1)
+
+    def record_cancellation(self, booking: Dict, showtime: Optional[Dict]) -> None:
+        self._apply(booking, showtime, -1)
+
+    def reset_showtime(self, showtime_id: str) -> None:
+        """A rebuilt seat map has no reserved seats, whatever the bookings say.
+
+        The store marks the showtime's active bookings ``seats_voided``, so
+        they no longer count towards ``reserved_by_showtime``.
+        """
+        self.reserved_by_showtime[showtime_id] = 0
+
+    def _apply(self, booking: Dict, showtime: Optional[Dict], sign: int) -> None:
+        self.add(
+            booking.get("showtime_id"),
+            showtime.get("movie_id") if showtime else None,
+            len(booking.get("seats", [])),
+            booking_cents(booking),
+            booking.get("showtime_snapshot", {}).get("datetime", ""),
+            sign,
+            bool(booking.get("seats_voided")),
+        )
+
+    def add(
+        self, sid: str, movie_id: Optional[str], seats: int, cents: int, show_dt: str, sign: int = 1, voided: bool = False
+    ) -> None:
+        """Count one booking from its summary fields (see ``_apply``).
+
+        The seats of a ``voided`` booking were released by a seat-map reset:
+        they still count as sold but no longer as reserved.
+        """
+        if not voided:
+            self.reserved_by_showtime[sid] = self.reserved_by_showtime.get(sid, 0) + sign * seats
+        self.bookings_by_showtime[sid] = self.bookings_by_showtime.get(sid, 0) + sign
+        if movie_id is not None:
+            self.seats_by_movie[movie_id] = self.seats_by_movie.get(movie_id, 0) + sign * seats
+
+        show_dt = _parse_dt(show_dt)
+        if show_dt == datetime.min:
+            return
+        cents = sign * cents
+        day = show_dt.date().isoformat()
+        if day not in self.revenue_by_day:
+            bisect.insort(self._days, day)
+            self.revenue_by_day[day] = [0, 0]
+            self.revenue_by_slot[day] = {}
+        bucket = self.revenue_by_day[day]
+        bucket[0] += cents
+        bucket[1] += sign
+        slot = self.revenue_by_slot[day].setdefault(show_dt, [0, 0])
+        slot[0] += cents
+        slot[1] += sign
+
+    def revenue_between(self, start_dt: datetime, end_dt: datetime) -> Tuple[int, int]:
+        """Return (cents, booking count) for showtimes within [start_dt, end_dt]."""
+        start_day = start_dt.date().isoformat()
+        end_day = end_dt.date().isoformat()
+        cents = count = 0
+        lo = bisect.bisect_left(self._days, start_day)
+        hi = bisect.bisect_right(self._days, end_day)
+        for day in self._days[lo:hi]:
+            if start_day < day < end_day:
+                day_cents, day_count = self.revenue_by_day[day]
+            else:
+                # boundary day: only the showtimes inside the range count
+                day_cents = day_count = 0
+                for show_dt, (slot_cents, slot_count) in self.revenue_by_slot[day].items():
+                    if start_dt <= show_dt <= end_dt:
+                        day_cents += slot_cents
+                        day_count += slot_count
+            cents += day_cents
+            count += day_count
+        return cents, count
+
+
+@metrics.timed("occupancy_report")
+def occupancy_report(
+    showtimes: List[Dict],
+    seat_maps: Dict,
+    bookings: List[Dict],
+    aggregates: Optional[ReportAggregates] = None,
+    columns: Optional[analytics.BookingColumns] = None,
+) -> Dict:
     """Return occupancy metrics per showtime."""
     report = {}
-    booking_by_showtime = {}
-    for b in bookings:
-        if b.get("status") != "active":
-            continue
-        sid = b.get("showtime_id")
-        booking_by_showtime.setdefault(sid, 0)
-        booking_by_showtime[sid] += 1
+    reserved_by_showtime = None
+    if aggregates is not None:
+        booking_by_showtime = aggregates.bookings_by_showtime
+        reserved_by_showtime = aggregates.reserved_by_showtime
+    elif columns is not None:
+        reserved_by_showtime, booking_by_showtime = columns.showtime_counts()
+    else:
+        booking_by_showtime = {}
+        for b in bookings:
+            if b.get("status") != "active":
+                continue
+            sid = b.get("showtime_id")
+            booking_by_showtime.setdefault(sid, 0)
+            booking_by_showtime[sid] += 1
 
     for st in showtimes:
         sid = st.get("id")
         seat_map = seat_maps.get(sid, {})
         total_seats = len(seat_map)
-        reserved = sum(1 for seat in seat_map.values() if seat.get("status") == "reserved")
+        if reserved_by_showtime is not None:
+            reserved = reserved_by_showtime.get(sid, 0)
+        else:
+            reserved = seating.count_status(seat_map, "reserved")
+        held = seating.count_status(seat_map, "held")
         occupancy = (reserved / total_seats) if total_seats else 0
         report[sid] = {
             "screen": st.get("screen"),
             "datetime": st.get("datetime"),
             "total_seats": total_seats,
             "reserved": reserved,
+            "held": held,
             "occupancy": round(occupancy * 100, 2),
             "bookings": booking_by_showtime.get(sid, 0),
         }
     return report
 
 
+def booking_cents(booking: Dict) -> int:
+    return int(round(float(booking.get("pricing", {}).get("total", 0)) * 100))
+
+
 def _parse_dt(value: str) -> datetime:
     try:
         return datetime.fromisoformat(value)
@@ -39,39 +175,151 @@ def _parse_dt(value: str) -> datetime:
         return datetime.min
 
 
-def revenue_summary(bookings: List[Dict], period: Tuple[str, str]) -> Dict:
-    """Summaries revenue for bookings within [start, end]."""
+@metrics.timed("revenue_summary")
+def revenue_summary(
+    bookings: List[Dict],
+    period: Tuple[str, str],
+    aggregates: Optional[ReportAggregates] = None,
+    archive_dir: Optional[str] = None,
+    columns: Optional[analytics.BookingColumns] = None,
+) -> Dict:
+    """Summaries revenue for bookings within [start, end].
+
+    With ``archive_dir``, archived bookings count too; only the monthly
+    partitions the period touches are read. ``columns`` (see ``analytics``)
+    replaces the per-booking loop with a vectorised filter and sum.
+    """
     start, end = period
     start_dt = _parse_dt(start)
     end_dt = _parse_dt(end)
-    total = 0.0
-    count = 0
-    for b in bookings:
-        show_dt = _parse_dt(b.get("showtime_snapshot", {}).get("datetime", ""))
-        if not (start_dt <= show_dt <= end_dt):
-            continue
-        if b.get("status") != "active":
-            continue
-        total += float(b.get("pricing", {}).get("total", 0))
-        count += 1
+    if aggregates is not None and start_dt != datetime.min and end_dt != datetime.min:
+        cents, count = aggregates.revenue_between(start_dt, end_dt)
+        total = cents / 100
+    elif columns is not None and start_dt != datetime.min and end_dt != datetime.min:
+        cents, count = columns.revenue_between(start_dt, end_dt)
+        total = cents / 100
+    else:
+        total = 0.0
+        count = 0
+        for b in bookings:
+            show_dt = _parse_dt(b.get("showtime_snapshot", {}).get("datetime", ""))
+            if not (start_dt <= show_dt <= end_dt):
+                continue
+            if b.get("status") != "active":
+                continue
+            total += float(b.get("pricing", {}).get("total", 0))
+            count += 1
+    if archive_dir and start_dt != datetime.min and end_dt != datetime.min:
+        archived_cents, archived_count = archive.revenue_between(archive_dir, start_dt, end_dt)
+        total += archived_cents / 100
+        count += archived_count
     return {"total_revenue": round(total, 2), "booking_count": count, "period": {"start": start, "end": end}}
 
 
-def top_movies(bookings: List[Dict], showtimes: List[Dict], limit: int = 5) -> List[Dict]:
-    """Return top movies by number of seats sold."""
+@metrics.timed("top_movies")
+def top_movies(
+    bookings: List[Dict],
+    showtimes: List[Dict],
+    limit: int = 5,
+    aggregates: Optional[ReportAggregates] = None,
+    period: Optional[Tuple[str, str]] = None,
+    archive_dir: Optional[str] = None,
+    columns: Optional[analytics.BookingColumns] = None,
+) -> List[Dict]:
+    """Return top movies by number of seats sold.
+
+    ``period`` limits the count to showtimes within [start, end]; with
+    ``archive_dir`` archived showtimes count too, reading only the months
+    the period touches (all of them without a period).
+    """
+    start_dt = _parse_dt(period[0]) if period else datetime.min
+    end_dt = _parse_dt(period[1]) if period else datetime.max
+    if aggregates is not None and period is None:
+        counter = {movie_id: seats for movie_id, seats in aggregates.seats_by_movie.items() if seats > 0}
+    elif columns is not None:
+        counter = columns.seats_by_movie(start_dt, end_dt)
+    else:
+        st_by_id = {st.get("id"): st for st in showtimes}
+        counter = {}
+        for b in bookings:
+            if b.get("status") != "active":
+                continue
+            st = st_by_id.get(b.get("showtime_id"))
+            if not st:
+                continue
+            if period and not (start_dt <= _parse_dt(st.get("datetime", "")) <= end_dt):
+                continue
+            movie_id = st.get("movie_id")
+            counter.setdefault(movie_id, 0)
+            counter[movie_id] += len(b.get("seats", []))
+    if archive_dir:
+        archived = archive.seats_by_movie(archive_dir, start_dt if period else None, end_dt if period else None)
+        for movie_id, seats in archived.items():
+            counter[movie_id] = counter.get(movie_id, 0) + seats
+    ranked = sorted(counter.items(), key=lambda kv: kv[1], reverse=True)[:limit]
+    return [{"movie_id": movie_id, "seats_sold": seats} for movie_id, seats in ranked]
+
+
+BREAKDOWNS = ("day", "screen", "language", "movie", "zone")
+
+
+@metrics.timed("breakdown")
+def breakdown(
+    bookings: List[Dict],
+    showtimes: List[Dict],
+    by: str,
+    period: Optional[Tuple[str, str]] = None,
+    seat_maps: Optional[Dict] = None,
+    columns: Optional[analytics.BookingColumns] = None,
+) -> Dict:
+    """Revenue, bookings and seats of active bookings grouped by ``by``.
+
+    ``by`` is one of BREAKDOWNS. Days come from the booked showtime time;
+    screen, language and movie from the showtime; zones from ``seat_maps``,
+    with a booking's revenue split across its zones by seat count.
+    """
+    if by not in BREAKDOWNS:
+        raise ValueError(f"Unknown breakdown: {by}")
+    start_dt = _parse_dt(period[0]) if period else datetime.min
+    end_dt = _parse_dt(period[1]) if period else datetime.max
+    if columns is not None:
+        return columns.breakdown(by, start_dt, end_dt)
     st_by_id = {st.get("id"): st for st in showtimes}
-    counter = {}
+    totals: Dict = {}
     for b in bookings:
         if b.get("status") != "active":
             continue
-        st = st_by_id.get(b.get("showtime_id"))
-        if not st:
+        show_dt = _parse_dt(b.get("showtime_snapshot", {}).get("datetime", ""))
+        if period and not (start_dt <= show_dt <= end_dt):
             continue
-        movie_id = st.get("movie_id")
-        counter.setdefault(movie_id, 0)
-        counter[movie_id] += len(b.get("seats", []))
-    ranked = sorted(counter.items(), key=lambda kv: kv[1], reverse=True)[:limit]
-    return [{"movie_id": movie_id, "seats_sold": seats} for movie_id, seats in ranked]
+        cents = booking_cents(b)
+        seats = b.get("seats", [])
+        if by == "zone":
+            seat_map = seat_maps.get(b.get("showtime_id")) if seat_maps else None
+            per_zone: Dict[str, int] = {}
+            for code in seats:
+                zone = seat_map[code].get("zone") if seat_map is not None and code in seat_map else "standard"
+                per_zone[zone] = per_zone.get(zone, 0) + 1
+            for zone, n in per_zone.items():
+                row = totals.setdefault(zone, [0.0, 0, 0])
+                row[0] += cents * n / len(seats)
+                row[1] += 1
+                row[2] += n
+            continue
+        if by == "day":
+            if show_dt == datetime.min:
+                continue
+            key = show_dt.date().isoformat()
+        else:
+            st = st_by_id.get(b.get("showtime_id"))
+            if not st:
+                continue
+            key = st.get("movie_id" if by == "movie" else by)
+        row = totals.setdefault(key, [0.0, 0, 0])
+        row[0] += cents
+        row[1] += 1
+        row[2] += len(seats)
+    return {key: {"revenue": round(c / 100, 2), "bookings": n, "seats": s} for key, (c, n, s) in totals.items()}
 
 
 def export_report(report: Dict, filename: str) -> str:
@@ -1,22 +1,287 @@
-from typing import Dict
+import itertools
+import uuid
+from collections.abc import Mapping, MutableMapping
+from typing import Dict, List, Tuple
 
+AVAILABLE = 0
+RESERVED = 1
+HELD = 2
+_STATUS_NAMES = ("available", "reserved", "held")
+_MARKERS = "OXH"
+_MARKER_BYTES = b"OXH"
+_STATUS_CODES = {name: code for code, name in enumerate(_STATUS_NAMES)}
+# seat map instances are numbered within a process run tagged at random, so
+# change tokens never repeat across resets, snapshot loads or restarts
+_RUN_TAG = uuid.uuid4().hex[:8]
+_instances = itertools.count(1)
 
-def initialize_seat_map(screen_config: Dict) -> Dict:
-    """Generate seat map based on screen configuration."""
+
+class SeatLayout:
+    """Seat codes, rows, numbers and zones shared by every seat map of one screen config."""
+
+    __slots__ = ("codes", "rows", "numbers", "zones", "index", "row_order", "seat_pos", "zone_masks", "zone_rows", "row_template", "key")
+
+    def __init__(self, seats: List[Tuple[str, str, int, str]], key: tuple = None):
+        # the _LAYOUTS cache key this layout was built for (see layout_for_key)
+        self.key = key if key is not None else ("seats", tuple(seats))
+        self.codes = [code for code, _, _, _ in seats]
+        self.rows = [row for _, row, _, _ in seats]
+        self.numbers = [num for _, _, num, _ in seats]
+        self.zones = [zone for _, _, _, zone in seats]
+        self.index = {code: i for i, code in enumerate(self.codes)}
+        by_row: Dict[str, List[int]] = {}
+        for i, row in enumerate(self.rows):
+            by_row.setdefault(row, []).append(i)
+        # (row, seat indexes sorted by number) in display order
+        self.row_order = [
+            (row, sorted(by_row[row], key=lambda i: self.numbers[i])) for row in sorted(by_row.keys())
+        ]
+        # seat index -> (row position, bit position within the row)
+        self.seat_pos: List[Tuple[int, int]] = [(0, 0)] * len(self.codes)
+        self.zone_masks: Dict[str, List[int]] = {}
+        for r, (_, indexes) in enumerate(self.row_order):
+            for col, i in enumerate(indexes):
+                self.seat_pos[i] = (r, col)
+                masks = self.zone_masks.setdefault(self.zones[i], [0] * len(self.row_order))
+                masks[r] |= 1 << col
+        # zone -> rows having a seat of that zone, in display order (e.g. the premium rows)
+        self.zone_rows: Dict[str, List[str]] = {
+            zone: [row for r, (row, _) in enumerate(self.row_order) if masks[r]] for zone, masks in self.zone_masks.items()
+        }
+        # "A: " prefix per row; seat ``col`` of a row sits at character len(prefix) + 2 * col
+        self.row_template = [f"{row}: " for row, _ in self.row_order]
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+
+_LAYOUTS: Dict[tuple, SeatLayout] = {}
+
+
+def get_layout(screen_config: Dict) -> SeatLayout:
+    """Return the cached layout for a screen configuration."""
     rows = screen_config.get("rows") or list("ABCDEFGH")
     seats_per_row = int(screen_config.get("seats_per_row", 12))
     premium_rows = set(screen_config.get("premium_rows", []))
-    seat_map: Dict[str, Dict] = {}
-    for row in rows:
-        for num in range(1, seats_per_row + 1):
-            code = f"{row}{num}"
-            zone = "premium" if row in premium_rows else "standard"
-            seat_map[code] = {"row": row, "number": num, "zone": zone, "status": "available"}
-    return seat_map
+    key = ("config", tuple(rows), seats_per_row, tuple(sorted(premium_rows)))
+    layout = _LAYOUTS.get(key)
+    if layout is None:
+        seats = []
+        for row in rows:
+            for num in range(1, seats_per_row + 1):
+                zone = "premium" if row in premium_rows else "standard"
+                seats.append((f"{row}{num}", row, num, zone))
+        layout = _LAYOUTS[key] = SeatLayout(seats, key)
+    return layout
+
+
+def layout_for_key(key) -> SeatLayout:
+    """Rebuild (or fetch from the cache) the layout behind ``SeatLayout.key``, e.g. after a JSON round trip."""
+    if key[0] == "config":
+        _, rows, seats_per_row, premium_rows = key
+        return get_layout({"rows": list(rows), "seats_per_row": seats_per_row, "premium_rows": list(premium_rows)})
+    key = ("seats", tuple(tuple(seat) for seat in key[1]))
+    layout = _LAYOUTS.get(key)
+    if layout is None:
+        layout = _LAYOUTS[key] = SeatLayout(list(key[1]), key)
+    return layout
+
+
+class _SeatView(MutableMapping):
+    """Dict-like view of one seat so older ``seat_map[code]["status"]`` callers keep working."""
+
+    __slots__ = ("_seat_map", "_idx")
+    _KEYS = ("row", "number", "zone", "status")
+
+    def __init__(self, seat_map: "SeatMap", idx: int):
+        self._seat_map = seat_map
+        self._idx = idx
+
+    def __getitem__(self, key):
+        layout = self._seat_map.layout
+        if key == "status":
+            return _STATUS_NAMES[self._seat_map.status[self._idx]]
+        if key == "row":
+            return layout.rows[self._idx]
+        if key == "number":
+            return layout.numbers[self._idx]
+        if key == "zone":
+            return layout.zones[self._idx]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key != "status":
+            raise KeyError(f"Seat field '{key}' is shared by the layout and cannot be changed")
+        self._seat_map.set_status(self._seat_map.layout.codes[self._idx], value)
+
+    def __delitem__(self, key):
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self._KEYS)
+
+    def __len__(self) -> int:
+        return len(self._KEYS)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class SeatMap(Mapping):
+    """Compact seat map: one status byte per seat plus a shared layout.
+
+    Behaves like the old ``{code: {"row", "number", "zone", "status"}}`` dict
+    for reads and status writes, and keeps a running count of free seats.
+    ``version`` goes up on every status change and ``token`` pairs it with
+    the map instance, for clients polling for changes; the rendered grid is
+    cached and only the seats changed since the last render are patched in.
+    """
+
+    __slots__ = ("layout", "status", "free", "version", "instance", "_row_free", "_lines", "_text", "_dirty")
+
+    def __init__(self, layout: SeatLayout, status: bytearray = None):
+        self.layout = layout
+        self.status = status if status is not None else bytearray(len(layout))
+        self.free = self.status.count(AVAILABLE)
+        self.version = 0
+        self.instance = f"{_RUN_TAG}-{next(_instances)}"
+        # per-row free-seat bitmasks, built on first use by find_best_seats
+        self._row_free = None
+        # render cache: one bytearray per row, the joined text, seats changed since
+        self._lines = None
+        self._text = None
+        self._dirty: List[int] = []
+
+    @property
+    def token(self) -> str:
+        """Change token: differs whenever the seats may differ, even across map instances."""
+        return f"{self.instance}.{self.version}"
+
+    def row_free_masks(self) -> List[int]:
+        """Bitmask of available seats per row (bit = position in number order)."""
+        if self._row_free is None:
+            status = self.status
+            self._row_free = [
+                sum(1 << col for col, i in enumerate(indexes) if status[i] == AVAILABLE)
+                for _, indexes in self.layout.row_order
+            ]
+        return self._row_free
+
+    @classmethod
+    def from_dict(cls, seat_dict: Dict) -> "SeatMap":
+        """Build a seat map from the legacy per-seat dict format."""
+        seats = [(code, meta["row"], meta["number"], meta.get("zone", "standard")) for code, meta in seat_dict.items()]
+        key = ("seats", tuple(seats))
+        layout = _LAYOUTS.get(key)
+        if layout is None:
+            layout = _LAYOUTS[key] = SeatLayout(seats, key)
+        status = bytearray(_STATUS_CODES.get(meta.get("status"), RESERVED) for meta in seat_dict.values())
+        return cls(layout, status)
+
+    def to_dict(self) -> Dict:
+        """Return the legacy per-seat dict format (used for JSON export).
+
+        Holds are short-lived leases and are not persisted: held seats are
+        written as available.
+        """
+        layout = self.layout
+        return {
+            code: {
+                "row": layout.rows[i],
+                "number": layout.numbers[i],
+                "zone": layout.zones[i],
+                "status": _STATUS_NAMES[self.status[i] if self.status[i] != HELD else AVAILABLE],
+            }
+            for i, code in enumerate(layout.codes)
+        }
+
+    def status_of(self, seat_code: str) -> str:
+        return _STATUS_NAMES[self.status[self.layout.index[seat_code]]]
+
+    def set_status(self, seat_code: str, status: str) -> None:
+        idx = self.layout.index[seat_code]
+        new = _STATUS_CODES[status]
+        old = self.status[idx]
+        if old == new:
+            return
+        self.status[idx] = new
+        if old == AVAILABLE:
+            self.free -= 1
+        elif new == AVAILABLE:
+            self.free += 1
+        if self._row_free is not None and (old == AVAILABLE or new == AVAILABLE):
+            row, col = self.layout.seat_pos[idx]
+            self._row_free[row] ^= 1 << col
+        self.version += 1
+        if self._lines is not None:
+            if len(self._dirty) < len(self.status):
+                self._dirty.append(idx)
+            else:
+                self._lines = None  # cheaper to rebuild than to patch
+
+    def _render_lines(self) -> List[bytearray]:
+        """Cached per-row grid lines with pending seat changes patched in."""
+        layout = self.layout
+        if self._lines is None:
+            status = self.status
+            self._lines = [
+                bytearray((prefix + " ".join(_MARKERS[status[i]] for i in indexes)).encode("ascii"))
+                for prefix, (_, indexes) in zip(layout.row_template, layout.row_order)
+            ]
+            self._dirty = []
+            self._text = None
+        elif self._dirty:
+            dirty, self._dirty = self._dirty, []
+            for idx in dirty:
+                r, col = layout.seat_pos[idx]
+                self._lines[r][len(layout.row_template[r]) + 2 * col] = _MARKER_BYTES[self.status[idx]]
+            self._text = None
+        return self._lines
+
+    def render(self) -> str:
+        """The O/X/H grid; unchanged seat maps return the cached string.
+
+        Not thread-safe against concurrent status changes: call it under the
+        showtime's lock when other threads may book.
+        """
+        lines = self._render_lines()
+        if self._text is None:
+            self._text = "\n".join(line.decode("ascii") for line in lines)
+        return self._text
+
+    def row_strings(self) -> Dict[str, str]:
+        """Compact encoding: one status string per row, e.g. ``{"A": "OOXH"}``."""
+        lines = self._render_lines()
+        return {
+            row: lines[r][len(prefix)::2].decode("ascii")
+            for r, ((row, _), prefix) in enumerate(zip(self.layout.row_order, self.layout.row_template))
+        }
+
+    def __getitem__(self, seat_code: str) -> _SeatView:
+        return _SeatView(self, self.layout.index[seat_code])
+
+    def __contains__(self, seat_code) -> bool:
+        return seat_code in self.layout.index
+
+    def __iter__(self):
+        return iter(self.layout.codes)
+
+    def __len__(self) -> int:
+        return len(self.layout.codes)
+
+    def __repr__(self) -> str:
+        return f"SeatMap({len(self)} seats, {self.free} free)"
+
+
+def initialize_seat_map(screen_config: Dict) -> SeatMap:
+    """Generate seat map based on screen configuration."""
+    return SeatMap(get_layout(screen_config))
 
 
 def render_seat_map(seat_map: Dict) -> str:
     """Return a human-friendly seat grid with occupancy markers."""
+    if isinstance(seat_map, SeatMap):
+        return seat_map.render()
     rows = {}
     for code, meta in seat_map.items():
         rows.setdefault(meta["row"], {})[meta["number"]] = meta["status"]
@@ -26,26 +291,146 @@ def render_seat_map(seat_map: Dict) -> str:
         markers = []
         for num in sorted(seats.keys()):
             status = seats[num]
-            marker = "O" if status == "available" else "X"
+            marker = "O" if status == "available" else ("H" if status == "held" else "X")
             markers.append(f"{marker}")
         lines.append(f"{row}: {' '.join(markers)}")
     return "\n".join(lines)
 
 
+def encode_seat_map(seat_map: Dict) -> Dict:
+    """Machine-readable seat map: ``{"version", "free", "rows": {"A": "OOXH", ...}}`` (O/X/H as in the grid).
+
+    ``version`` is the map's change ``token``.
+    """
+    if not isinstance(seat_map, SeatMap):
+        seat_map = SeatMap.from_dict(seat_map)
+    return {"version": seat_map.token, "free": seat_map.free, "rows": seat_map.row_strings()}
+
+
+def zone_rows(seat_map: Dict, zone: str) -> List[str]:
+    """Rows that contain seats of ``zone``, in display order."""
+    if not isinstance(seat_map, SeatMap):
+        seat_map = SeatMap.from_dict(seat_map)
+    return seat_map.layout.zone_rows.get(zone, [])
+
+
+def free_seat_count(seat_map: Dict) -> int:
+    """Number of available seats; O(1) for a SeatMap."""
+    if isinstance(seat_map, SeatMap):
+        return seat_map.free
+    return sum(1 for seat in seat_map.values() if seat.get("status") == "available")
+
+
+def count_status(seat_map: Dict, status: str) -> int:
+    """Number of seats with the given status."""
+    if isinstance(seat_map, SeatMap):
+        return seat_map.status.count(_STATUS_CODES[status])
+    return sum(1 for seat in seat_map.values() if seat.get("status") == status)
+
+
+def reserved_seats(seat_map: Dict) -> set:
+    """Codes of all reserved seats."""
+    if isinstance(seat_map, SeatMap):
+        codes = seat_map.layout.codes
+        return {codes[i] for i, status in enumerate(seat_map.status) if status == RESERVED}
+    return {code for code, seat in seat_map.items() if seat.get("status") == "reserved"}
+
+
 def is_seat_available(seat_map: Dict, seat_code: str) -> bool:
+    if isinstance(seat_map, SeatMap):
+        idx = seat_map.layout.index.get(seat_code)
+        return idx is not None and seat_map.status[idx] == AVAILABLE
     return seat_code in seat_map and seat_map[seat_code]["status"] == "available"
 
 
 def reserve_seat(seat_map: Dict, seat_code: str) -> Dict:
     if not is_seat_available(seat_map, seat_code):
         raise ValueError(f"Seat {seat_code} is not available")
-    seat_map[seat_code]["status"] = "reserved"
+    if isinstance(seat_map, SeatMap):
+        seat_map.set_status(seat_code, "reserved")
+    else:
+        seat_map[seat_code]["status"] = "reserved"
     return seat_map
 
 
 def release_seat(seat_map: Dict, seat_code: str) -> Dict:
     if seat_code in seat_map:
-        seat_map[seat_code]["status"] = "available"
+        if isinstance(seat_map, SeatMap):
+            seat_map.set_status(seat_code, "available")
+        else:
+            seat_map[seat_code]["status"] = "available"
+    return seat_map
+
+
+def hold_seat(seat_map: Dict, seat_code: str) -> Dict:
+    """Put an available seat on hold."""
+    if not is_seat_available(seat_map, seat_code):
+        raise ValueError(f"Seat {seat_code} is not available")
+    if isinstance(seat_map, SeatMap):
+        seat_map.set_status(seat_code, "held")
+    else:
+        seat_map[seat_code]["status"] = "held"
+    return seat_map
+
+
+def release_hold(seat_map: Dict, seat_code: str) -> Dict:
+    """Return a held seat to available; other statuses are left alone."""
+    if seat_code in seat_map and seat_map[seat_code]["status"] == "held":
+        release_seat(seat_map, seat_code)
     return seat_map
 
 
+def find_best_seats(seat_map: Dict, n: int, zone: str = None) -> List[str]:
+    """Return the best-scored block of ``n`` adjacent free seats, or [] if none.
+
+    Rows are tried from the preferred viewing row outwards (about two thirds
+    back) and, within a row, the free run closest to the centre wins. Runs are
+    found with bit operations on the per-row free masks, so a search costs a
+    few integer operations per row rather than a scan over seat combinations.
+    """
+    if n <= 0:
+        return []
+    if not isinstance(seat_map, SeatMap):
+        seat_map = SeatMap.from_dict(seat_map)
+    layout = seat_map.layout
+    masks = seat_map.row_free_masks()
+    zone_masks = layout.zone_masks.get(zone) if zone else None
+    if zone and zone_masks is None:
+        return []
+    n_rows = len(layout.row_order)
+    ideal_row = (n_rows - 1) * 2 / 3
+    rows_by_preference = sorted(range(n_rows), key=lambda r: abs(r - ideal_row))
+
+    best = None
+    for r in rows_by_preference:
+        row_score = abs(r - ideal_row) / max(n_rows, 1)
+        if best is not None and row_score >= best[0]:
+            break
+        row_len = len(layout.row_order[r][1])
+        if row_len < n:
+            continue
+        free = masks[r] & zone_masks[r] if zone_masks else masks[r]
+        starts = free
+        for k in range(1, n):
+            starts &= free >> k
+        if not starts:
+            continue
+        # start position that centres the block, then the nearest valid starts around it
+        target = max(0, int((row_len - n) / 2 + 0.5))
+        below = starts & ((1 << (target + 1)) - 1)
+        above = starts >> target
+        candidates = []
+        if below:
+            candidates.append(below.bit_length() - 1)
+        if above:
+            candidates.append(target + (above & -above).bit_length() - 1)
+        for start in candidates:
+            col_score = abs(start + (n - 1) / 2 - (row_len - 1) / 2) / row_len
+            score = row_score + col_score
+            if best is None or score < best[0]:
+                best = (score, r, start)
+    if best is None:
+        return []
+    _, r, start = best
+    indexes = layout.row_order[r][1]
+    return [layout.codes[i] for i in indexes[start:start + n]]
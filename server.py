@@ -0,0 +1,441 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import metrics
+import movies
+import pricing
+import reports
+import seating
+import storage
+from store import BookingStore
+from tickets import TicketPipeline, TicketStore
+from waitlist import WAITLIST_FILE, Waitlist
+
+_ROUTES = ("movies", "showtimes", "holds", "bookings", "customers", "tickets", "waitlist", "reports", "metrics", "debug")
+_REQUEST_LATENCY = metrics.REGISTRY.histogram(
+    "cinema_http_request_seconds", "HTTP request handling time", ("method", "route")
+)
+_REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _positive_int(value, name: str, default: Optional[int]) -> Optional[int]:
+    """Parse a query/body number, answering 400 instead of letting ValueError become a 500."""
+    if value is None or value == "":
+        return default
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise HttpError(400, f"{name} must be a positive integer")
+    if number < 1:
+        raise HttpError(400, f"{name} must be a positive integer")
+    return number
+
+
+class BookingServer:
+    """Asyncio HTTP/JSON front-end over the store, movies and reports modules.
+
+    Requests are handled on the event loop; store operations are short and
+    guarded by per-showtime locks. Journal writes are buffered and flushed,
+    and the journal compacted, from a background task on a worker thread.
+    """
+
+    def __init__(
+        self,
+        store: BookingStore,
+        movies_list: list,
+        backend=None,
+        flush_interval: float = 0.05,
+        archive_dir: Optional[str] = None,
+        snapshot_every: int = 10000,
+        tickets: Optional[TicketPipeline] = None,
+        waitlist: Optional[Waitlist] = None,
+    ):
+        self.store = store
+        self.movies_list = movies_list
+        self.backend = backend
+        self.archive_dir = archive_dir
+        self.tickets = tickets
+        self.waitlist = waitlist
+        self.flush_interval = flush_interval
+        self.snapshot_every = snapshot_every
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._persister: Optional[asyncio.Task] = None
+
+    # -- lifecycle -----------------------------------------------------------
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080) -> Tuple[str, int]:
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        self.store.holds.start()
+        if self.store.journal is not None or self.waitlist is not None:
+            self._persister = asyncio.create_task(self._persist_loop())
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.store.holds.stop()
+        if self._persister is not None:
+            self._persister.cancel()
+            try:
+                await self._persister
+            except asyncio.CancelledError:
+                pass
+        if self.store.journal is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.store.journal.flush)
+        if self.waitlist is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.waitlist.flush)
+
+    async def _persist_loop(self) -> None:
+        """Group-commit journal and waitlist events and compact the log off the event loop."""
+        loop = asyncio.get_running_loop()
+        event_log = self.store.journal
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if event_log is not None and event_log.pending:
+                await loop.run_in_executor(None, event_log.flush)
+            if self.waitlist is not None and self.waitlist.pending:
+                await loop.run_in_executor(None, self.waitlist.flush)
+            if self.backend is not None and event_log is not None and event_log.events_since_snapshot >= self.snapshot_every:
+                await loop.run_in_executor(None, self.backend.compact, event_log)
+
+    # -- HTTP plumbing -------------------------------------------------------
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._write(writer, 400, {"error": "Malformed request line"}, keep_alive=False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = b""
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._write(writer, 400, {"error": "Invalid Content-Length"}, keep_alive=False)
+                    break
+                if length:
+                    body = await reader.readexactly(length)
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                started = time.perf_counter()
+                try:
+                    status, payload = self.dispatch(method, target, body)
+                except HttpError as exc:
+                    status, payload = exc.status, {"error": str(exc)}
+                except Exception as exc:  # keep the connection handler alive
+                    status, payload = 500, {"error": str(exc)}
+                route = urlsplit(target).path.strip("/").split("/")[0] or "root"
+                _REQUEST_LATENCY.observe(time.perf_counter() - started, method, route if route in _ROUTES else "other")
+                await self._write(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _write(writer: asyncio.StreamWriter, status: int, payload, keep_alive: bool) -> None:
+        # plain strings (the Prometheus text format) go out as text, everything else as JSON
+        if isinstance(payload, str):
+            body, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body, content_type = json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8"
+        head = (
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    # -- routing -------------------------------------------------------------
+
+    def dispatch(self, method: str, target: str, body: bytes = b"") -> Tuple[int, object]:
+        """Route one request; returns (status, JSON-serialisable payload)."""
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        parts = [unquote(p) for p in url.path.strip("/").split("/") if p]
+        data = self._json_body(body) if method in ("POST", "PUT") else {}
+
+        if parts == ["metrics"] and method == "GET":
+            return 200, metrics.REGISTRY.render()
+        if parts == ["debug", "profile"] and method == "POST":
+            if data.get("action") == "start":
+                sample_every = _positive_int(data.get("sample_every"), "sample_every", 100)
+                metrics.start_profiling(sample_every, trace_memory=bool(data.get("trace_memory")))
+                return 200, {"profiling": True}
+            if data.get("action") == "stop":
+                return 200, metrics.stop_profiling(limit=_positive_int(data.get("limit"), "limit", 20))
+            raise HttpError(400, "action must be 'start' or 'stop'")
+        if parts == ["movies"] and method == "GET":
+            return 200, self.movies_list
+        if parts == ["showtimes"] and method == "GET":
+            if "from" in query or "to" in query:
+                start = movies.parse_showtime_datetime(query.get("from"))
+                end = movies.parse_showtime_datetime(query.get("to"))
+                if (query.get("from") and start is None) or (query.get("to") and end is None):
+                    raise HttpError(400, "from/to must be YYYY-MM-DD or YYYY-MM-DD HH:MM")
+                return 200, self.store.find_showtimes(start, end, movie_id=query.get("movie_id"), screen=query.get("screen"))
+            return 200, self.store.list_showtimes(
+                movie_id=query.get("movie_id"), date=query.get("date"), screen=query.get("screen")
+            )
+        if parts == ["showtimes", "import"] and method == "POST":
+            entries = data.get("showtimes")
+            if not isinstance(entries, list):
+                raise HttpError(400, "showtimes must be a list")
+            result = self.store.import_schedule(entries, partial=bool(data.get("partial")))
+            return (400 if result["rejected"] and not result["scheduled"] else 201), result
+        if len(parts) == 3 and parts[0] == "showtimes" and parts[2] == "seats" and method == "GET":
+            seat_map = self.store.seat_maps.get(parts[1])
+            if seat_map is None:
+                raise HttpError(404, "Showtime not found")
+            with self.store.lock_for(parts[1]):
+                version = getattr(seat_map, "token", None)
+                if query.get("since") and query["since"] == version:
+                    # polling clients: nothing changed since the version they hold
+                    return 200, {"showtime_id": parts[1], "version": version, "unchanged": True}
+                if query.get("format") == "compact":
+                    return 200, dict(seating.encode_seat_map(seat_map), showtime_id=parts[1])
+                return 200, {
+                    "showtime_id": parts[1],
+                    "version": version,
+                    "free": seating.free_seat_count(seat_map),
+                    "seat_map": seating.render_seat_map(seat_map),
+                }
+        if len(parts) == 3 and parts[0] == "showtimes" and parts[2] == "best-seats" and method == "GET":
+            seat_map = self.store.seat_maps.get(parts[1])
+            if seat_map is None:
+                raise HttpError(404, "Showtime not found")
+            count = _positive_int(query.get("n"), "n", 1)
+            with self.store.lock_for(parts[1]):
+                return 200, {"seats": seating.find_best_seats(seat_map, count, zone=query.get("zone"))}
+        if len(parts) == 3 and parts[0] == "showtimes" and parts[2] == "quote" and method == "GET":
+            showtime = self.store.get_showtime(parts[1])
+            seat_map = self.store.seat_maps.get(parts[1])
+            if showtime is None or seat_map is None:
+                raise HttpError(404, "Showtime not found")
+            seats = [s for s in query.get("seats", "").split(",") if s]
+            discounts = [{"code": query["promo"]}] if query.get("promo") else []
+            try:
+                return 200, pricing.quote(showtime, seat_map, seats, discounts)
+            except ValueError as exc:
+                raise HttpError(400, str(exc))
+        if len(parts) == 3 and parts[0] == "showtimes" and parts[2] == "waitlist" and method == "POST":
+            if self.waitlist is None:
+                raise HttpError(404, "Waitlist not enabled")
+            try:
+                entry = self.waitlist.join(
+                    parts[1], data.get("seats", 1), data.get("customer"), zone=data.get("zone"), priority=data.get("priority", 0)
+                )
+            except ValueError as exc:
+                raise HttpError(400, str(exc))
+            return 201, dict(entry, position=self.waitlist.position(entry["id"]))
+        if len(parts) >= 2 and parts[0] == "waitlist" and self.waitlist is not None:
+            entry_id = parts[1]
+            if len(parts) == 2 and method == "GET":
+                entry = self.waitlist.get(entry_id)
+                if entry is None:
+                    raise HttpError(404, "Waitlist entry not found")
+                return 200, dict(entry, position=self.waitlist.position(entry_id))
+            if len(parts) == 3 and parts[2] == "accept" and method == "POST":
+                try:
+                    booking = self.waitlist.accept(entry_id, discounts=data.get("discounts"))
+                except ValueError as exc:
+                    raise HttpError(400, str(exc))
+                return 201, self._issue_ticket(booking)
+            if len(parts) == 2 and method == "DELETE":
+                if not self.waitlist.leave(entry_id):
+                    raise HttpError(404, "Waitlist entry not found")
+                return 200, {"success": True}
+        if parts == ["bookings"] and method == "POST":
+            try:
+                booking = self.store.create_booking(
+                    {
+                        "showtime_id": data.get("showtime_id"),
+                        "seats": data.get("seats"),
+                        "customer": data.get("customer"),
+                        "discounts": data.get("discounts"),
+                    }
+                )
+            except ValueError as exc:
+                raise HttpError(400, str(exc))
+            return 201, self._issue_ticket(booking)
+        if parts == ["bookings", "batch"] and method == "POST":
+            items = data.get("bookings")
+            if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+                raise HttpError(400, "bookings must be a list of objects")
+            try:
+                results = self.store.create_bookings_batch(items, atomic=data.get("atomic", "showtime"))
+            except ValueError as exc:
+                raise HttpError(400, str(exc))
+            results = [dict(r, booking=self._issue_ticket(r["booking"])) if r["ok"] else r for r in results]
+            return (201 if any(r["ok"] for r in results) else 400), {"results": results}
+        if parts == ["holds"] and method == "POST":
+            try:
+                ttl = _positive_int(data.get("ttl"), "ttl", None)
+                return 201, self.store.holds.hold_seats(data.get("showtime_id"), data.get("seats"), ttl=ttl)
+            except ValueError as exc:
+                raise HttpError(400, str(exc))
+        if len(parts) == 3 and parts[0] == "holds" and parts[2] == "confirm" and method == "POST":
+            try:
+                booking = self.store.holds.confirm(parts[1], data.get("customer"), discounts=data.get("discounts"))
+            except ValueError as exc:
+                raise HttpError(400, str(exc))
+            return 201, self._issue_ticket(booking)
+        if len(parts) == 2 and parts[0] == "holds" and method == "DELETE":
+            if not self.store.holds.release(parts[1]):
+                raise HttpError(404, "Hold not found or expired")
+            return 200, {"success": True}
+        if len(parts) == 2 and parts[0] == "bookings" and method == "GET":
+            booking = self.store.get_booking(parts[1])
+            if not booking:
+                raise HttpError(404, "Booking not found")
+            return 200, booking
+        if (len(parts) == 2 and parts[0] == "bookings" and method == "DELETE") or (
+            len(parts) == 3 and parts[0] == "bookings" and parts[2] == "cancel" and method == "POST"
+        ):
+            success, msg = self.store.cancel_booking(parts[1])
+            return (200 if success else 400), {"success": success, "message": msg}
+        if len(parts) == 3 and parts[0] == "customers" and parts[2] == "bookings" and method == "GET":
+            return 200, self.store.list_customer_bookings(parts[1])
+        if len(parts) == 2 and parts[0] == "tickets" and method == "GET":
+            text = self.tickets.sink.read(parts[1]) if self.tickets is not None else None
+            if text is None:
+                raise HttpError(404, "Ticket not found (or not written yet)")
+            return 200, {"id": parts[1], "ticket": text}
+        if len(parts) == 2 and parts[0] == "reports" and method == "GET":
+            return 200, self._report(parts[1], query)
+        if parts and parts[0] in ("movies", "showtimes", "holds", "bookings", "customers", "tickets", "waitlist", "reports"):
+            raise HttpError(405, f"Method {method} not allowed")
+        raise HttpError(404, "Not found")
+
+    def _issue_ticket(self, booking: Dict) -> Dict:
+        """Queue the booking's ticket and return the booking with its ticket handle (``GET /tickets/<id>``)."""
+        if self.tickets is None:
+            return booking
+        self.tickets.submit(booking)
+        return dict(booking, ticket=self.tickets.sink.location(booking["id"]))
+
+    def _report(self, name: str, query: Dict[str, str]):
+        store = self.store
+        if name == "occupancy":
+            return reports.occupancy_report(store.showtimes, store.seat_maps, store.bookings, aggregates=store.aggregates)
+        if name == "revenue":
+            if "start" not in query or "end" not in query:
+                raise HttpError(400, "start and end are required")
+            return reports.revenue_summary(
+                store.bookings, (query["start"], query["end"]), aggregates=store.aggregates, archive_dir=self.archive_dir
+            )
+        if name == "top-movies":
+            period = (query["start"], query["end"]) if "start" in query and "end" in query else None
+            return reports.top_movies(
+                store.bookings,
+                store.showtimes,
+                limit=_positive_int(query.get("limit"), "limit", 5),
+                aggregates=store.aggregates,
+                period=period,
+                archive_dir=self.archive_dir,
+            )
+        if name == "breakdown":
+            by = query.get("by", "day")
+            if by not in reports.BREAKDOWNS:
+                raise HttpError(400, f"by must be one of: {', '.join(reports.BREAKDOWNS)}")
+            period = (query["start"], query["end"]) if "start" in query and "end" in query else None
+            return reports.breakdown(store.bookings, store.showtimes, by, period, seat_maps=store.seat_maps)
+        raise HttpError(404, "Unknown report")
+
+    @staticmethod
+    def _json_body(body: bytes) -> Dict:
+        if not body:
+            return {}
+        try:
+            data = json.loads(body)
+        except ValueError:
+            raise HttpError(400, "Body must be JSON")
+        if not isinstance(data, dict):
+            raise HttpError(400, "Body must be a JSON object")
+        return data
+
+
+async def serve(
+    data_dir: str, host: str, port: int, backend_name: str = "json", ticket_dir: str = "tickets", binary: bool = False
+) -> None:
+    backend = storage.open_storage(backend_name, data_dir, binary=binary)
+    movies_list = backend.load_movies()
+    pricing.load_promos(os.path.join(data_dir, "promos.json"))
+    showtimes, seat_maps, bookings_list, history = backend.load_state()
+    # the persister task owns event-log I/O, so appends never block on fsync
+    event_log = backend.open_journal(autoflush=False)
+    store = BookingStore(showtimes, seat_maps, bookings_list, journal=event_log, history=history, movies_list=movies_list)
+    store.ensure_seat_maps()
+    metrics.track_store(store)
+    ticket_pipeline = TicketPipeline(TicketStore(ticket_dir))
+    # the persister task syncs the waitlist log too, so dispatch never waits on fsync
+    waiting = Waitlist(store, os.path.join(data_dir, WAITLIST_FILE), autoflush=False)
+    waiting.match_all()
+    server = BookingServer(
+        store,
+        movies_list,
+        backend=backend,
+        archive_dir=os.path.join(data_dir, "archive"),
+        tickets=ticket_pipeline,
+        waitlist=waiting,
+    )
+    bound_host, bound_port = await server.start(host, port)
+    print(f"Serving on http://{bound_host}:{bound_port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+        waiting.close()
+        ticket_pipeline.close()
+        backend.snapshot(store)
+        event_log.close()
+        backend.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Movie ticket booking HTTP/JSON service")
+    parser.add_argument("--data", default="data")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--backend", choices=("json", "sqlite"), default="json")
+    parser.add_argument("--tickets", default="tickets", help="directory of the append-only ticket store")
+    parser.add_argument(
+        "--snapshot-format", choices=("json", "binary"), default="json", help="snapshot files of the json backend"
+    )
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.data, args.host, args.port, args.backend, args.tickets, args.snapshot_format == "binary"))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+import argparse
+import multiprocessing
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Dict, Optional, Tuple
+
+import movies
+import reports
+from store import BookingStore
+
+
+def shard_of(showtime_id: str, shards: int) -> int:
+    """Owning shard of a showtime: crc32 of its id, so every process agrees."""
+    return zlib.crc32(str(showtime_id).encode("utf-8")) % shards
+
+
+def partition(showtimes: List[Dict], seat_maps: Dict, bookings_list: List[Dict], shards: int) -> List[Tuple]:
+    """Split state into ``shards`` (showtimes, seat_maps, bookings) parts by owning shard."""
+    parts = [([], {}, []) for _ in range(shards)]
+    for st in showtimes:
+        part = parts[shard_of(st["id"], shards)]
+        part[0].append(st)
+        if st["id"] in seat_maps:
+            part[1][st["id"]] = seat_maps[st["id"]]
+    for booking in bookings_list:
+        parts[shard_of(booking.get("showtime_id"), shards)][2].append(booking)
+    return parts
+
+
+def _shard_main(conn, showtimes: List[Dict], seat_maps: Dict, bookings_list: List[Dict]) -> None:
+    """Worker loop: one BookingStore per process, driven by (op, args, kwargs) messages."""
+    store = BookingStore(showtimes, seat_maps, bookings_list)
+    handlers = {
+        "create_booking": store.create_booking,
+        "create_bookings_batch": store.create_bookings_batch,
+        "cancel_booking": store.cancel_booking,
+        "get_booking": store.get_booking,
+        "list_customer_bookings": store.list_customer_bookings,
+        "bookings_for_showtime": store.bookings_for_showtime,
+        "schedule_showtime": store.schedule_showtime,
+        "update_showtime": store.update_showtime,
+        "hold_seats": store.holds.hold_seats,
+        "confirm_hold": store.holds.confirm,
+        "release_hold": store.holds.release,
+        "free_seats": lambda: {sid: seat_map.free for sid, seat_map in store.seat_maps.items()},
+        "occupancy_report": lambda: reports.occupancy_report(
+            store.showtimes, store.seat_maps, store.bookings, aggregates=store.aggregates
+        ),
+        "revenue_between": store.aggregates.revenue_between,
+        "seats_by_movie": lambda period=None: {
+            m["movie_id"]: m["seats_sold"]
+            for m in reports.top_movies(store.bookings, store.showtimes, limit=None, aggregates=store.aggregates, period=period)
+        },
+        "state": lambda: (store.showtimes, store.seat_maps, store.bookings),
+    }
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        op, args, kwargs = message
+        try:
+            conn.send(("ok", handlers[op](*args, **kwargs)))
+        except ValueError as exc:
+            conn.send(("error", str(exc)))
+        except Exception as exc:  # report, keep serving
+            conn.send(("crash", f"{type(exc).__name__}: {exc}"))
+    conn.close()
+
+
+class _Shard:
+    def __init__(self, ctx, index: int, state: Tuple):
+        self.index = index
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_shard_main, args=(child,) + tuple(state), name=f"shard-{index}", daemon=True)
+        self.process.start()
+        child.close()
+        # one request in flight per pipe
+        self.lock = threading.Lock()
+
+    def call(self, op: str, *args, **kwargs):
+        with self.lock:
+            self.conn.send((op, args, kwargs))
+            return _unwrap(self.conn.recv())
+
+
+def _unwrap(reply: Tuple):
+    status, value = reply
+    if status == "ok":
+        return value
+    if status == "error":
+        raise ValueError(value)
+    raise RuntimeError(value)
+
+
+class ShardRouter:
+    """Thin router over N shard processes, each owning the showtimes that hash to it.
+
+    Per-showtime writes (bookings, cancellations, holds, showtime updates)
+    go to the owning shard over a pipe; reads that span showtimes (customer
+    bookings, reports) are scattered to every shard and merged. Each shard
+    runs a full BookingStore, so its locking and aggregates work unchanged;
+    calls from different threads to different shards run in parallel.
+    """
+
+    def __init__(
+        self,
+        shards: int,
+        showtimes: List[Dict],
+        seat_maps: Dict,
+        bookings_list: List[Dict],
+        start_method: Optional[str] = None,
+    ):
+        if shards < 1:
+            raise ValueError("shards must be at least 1")
+        ctx = multiprocessing.get_context(start_method)
+        self.count = shards
+        self._shards = [_Shard(ctx, i, part) for i, part in enumerate(partition(showtimes, seat_maps, bookings_list, shards))]
+        self._showtime_ids = {st["id"] for st in showtimes}
+        # booking/hold id -> shard, so cancels and confirms skip the scatter
+        self._booking_shard = {b["id"]: shard_of(b.get("showtime_id"), shards) for b in bookings_list}
+        self._hold_shard: Dict[str, int] = {}
+
+    def _for_showtime(self, showtime_id: str) -> _Shard:
+        if showtime_id not in self._showtime_ids:
+            raise ValueError("Showtime not found")
+        return self._shards[shard_of(showtime_id, self.count)]
+
+    def _scatter(self, op: str, *args, **kwargs) -> List:
+        """Send ``op`` to every shard, then collect the replies, so shards work concurrently."""
+        for shard in self._shards:
+            shard.lock.acquire()
+        try:
+            for shard in self._shards:
+                shard.conn.send((op, args, kwargs))
+            replies = [shard.conn.recv() for shard in self._shards]
+        finally:
+            for shard in self._shards:
+                shard.lock.release()
+        return [_unwrap(reply) for reply in replies]
+
+    # -- writes ----------------------------------------------------------------
+
+    def create_booking(self, booking_data: Dict) -> Dict:
+        shard = self._for_showtime(booking_data.get("showtime_id"))
+        booking = shard.call("create_booking", booking_data)
+        self._booking_shard[booking["id"]] = shard.index
+        return booking
+
+    def create_bookings_batch(self, requests: List[Dict], atomic: str = "showtime") -> List[Dict]:
+        """Batch booking; ``atomic="batch"`` is only possible when one shard owns every showtime."""
+        by_shard: Dict[int, List[int]] = {}
+        results: List[Optional[Dict]] = [None] * len(requests)
+        for pos, data in enumerate(requests):
+            if data.get("showtime_id") not in self._showtime_ids:
+                results[pos] = {"ok": False, "error": "Showtime not found"}
+                continue
+            by_shard.setdefault(shard_of(data["showtime_id"], self.count), []).append(pos)
+        if atomic == "batch" and (len(by_shard) > 1 or (by_shard and None in results)):
+            raise ValueError("atomic='batch' needs every request on one shard; use atomic='showtime'")
+        for index, positions in by_shard.items():
+            shard_results = self._shards[index].call("create_bookings_batch", [requests[p] for p in positions], atomic=atomic)
+            for pos, result in zip(positions, shard_results):
+                results[pos] = result
+                if result["ok"]:
+                    self._booking_shard[result["booking"]["id"]] = index
+        return results
+
+    def cancel_booking(self, booking_id: str, now: Optional[datetime] = None, cancellation_window_min: int = 30) -> Tuple[bool, str]:
+        index = self._booking_shard.get(booking_id)
+        if index is None:
+            return False, "Booking not found."
+        return self._shards[index].call("cancel_booking", booking_id, now, cancellation_window_min)
+
+    def schedule_showtime(self, showtime_data: Dict) -> Dict:
+        # the id is fixed here so the router knows the owning shard up front
+        if showtime_data.get("id") and showtime_data["id"] in self._showtime_ids:
+            raise ValueError(f"Showtime {showtime_data['id']} already exists")
+        showtime_data = dict(showtime_data, id=showtime_data.get("id") or str(uuid.uuid4())[:10])
+        shard = self._shards[shard_of(showtime_data["id"], self.count)]
+        showtime = shard.call("schedule_showtime", showtime_data)
+        # only known once the shard accepted it (it may reject e.g. a busy screen)
+        self._showtime_ids.add(showtime["id"])
+        return showtime
+
+    def update_showtime(self, showtime_id: str, updates: Dict) -> Optional[Dict]:
+        if showtime_id not in self._showtime_ids:
+            return None
+        return self._for_showtime(showtime_id).call("update_showtime", showtime_id, updates)
+
+    def hold_seats(self, showtime_id: str, seats: List[str], ttl: Optional[float] = None) -> Dict:
+        shard = self._for_showtime(showtime_id)
+        hold = shard.call("hold_seats", showtime_id, seats, ttl=ttl)
+        self._hold_shard[hold["id"]] = shard.index
+        return hold
+
+    def confirm_hold(self, hold_id: str, customer: Optional[Dict] = None, **booking_fields) -> Dict:
+        index = self._hold_shard.pop(hold_id, None)
+        if index is None:
+            raise ValueError("Hold not found or expired.")
+        booking = self._shards[index].call("confirm_hold", hold_id, customer, **booking_fields)
+        self._booking_shard[booking["id"]] = index
+        return booking
+
+    def release_hold(self, hold_id: str) -> bool:
+        index = self._hold_shard.pop(hold_id, None)
+        return index is not None and self._shards[index].call("release_hold", hold_id)
+
+    # -- reads -----------------------------------------------------------------
+
+    def get_booking(self, booking_id: str) -> Optional[Dict]:
+        index = self._booking_shard.get(booking_id)
+        return self._shards[index].call("get_booking", booking_id) if index is not None else None
+
+    def bookings_for_showtime(self, showtime_id: str, status: str = "active") -> List[Dict]:
+        return self._for_showtime(showtime_id).call("bookings_for_showtime", showtime_id, status)
+
+    def list_customer_bookings(self, email: str) -> List[Dict]:
+        merged = [b for part in self._scatter("list_customer_bookings", email) for b in part]
+        return sorted(merged, key=lambda b: b.get("created_at") or "")
+
+    def free_seats(self) -> Dict[str, int]:
+        merged: Dict[str, int] = {}
+        for part in self._scatter("free_seats"):
+            merged.update(part)
+        return merged
+
+    def occupancy_report(self) -> Dict:
+        merged: Dict = {}
+        for part in self._scatter("occupancy_report"):
+            merged.update(part)
+        return merged
+
+    def revenue_summary(self, period: Tuple[str, str]) -> Dict:
+        """Same result as ``reports.revenue_summary``, summed across shards."""
+        start, end = period
+        start_dt = movies.parse_showtime_datetime(start)
+        end_dt = movies.parse_showtime_datetime(end)
+        if start_dt is None or end_dt is None:
+            raise ValueError("period must be two datetimes")
+        parts = self._scatter("revenue_between", start_dt, end_dt)
+        cents = sum(c for c, _ in parts)
+        count = sum(n for _, n in parts)
+        return {"total_revenue": round(cents / 100, 2), "booking_count": count, "period": {"start": start, "end": end}}
+
+    def top_movies(self, limit: int = 5, period: Optional[Tuple[str, str]] = None) -> List[Dict]:
+        counter: Dict[str, int] = {}
+        for part in self._scatter("seats_by_movie", period):
+            for movie_id, seats in part.items():
+                counter[movie_id] = counter.get(movie_id, 0) + seats
+        ranked = sorted(counter.items(), key=lambda kv: kv[1], reverse=True)[:limit]
+        return [{"movie_id": movie_id, "seats_sold": seats} for movie_id, seats in ranked]
+
+    def collect_state(self) -> Tuple[List, Dict, List]:
+        """Gather (showtimes, seat_maps, bookings) from every shard, e.g. to save a snapshot."""
+        showtimes, seat_maps, bookings_list = [], {}, []
+        for part_showtimes, part_seat_maps, part_bookings in self._scatter("state"):
+            showtimes.extend(part_showtimes)
+            seat_maps.update(part_seat_maps)
+            bookings_list.extend(part_bookings)
+        return showtimes, seat_maps, bookings_list
+
+    def close(self) -> None:
+        for shard in self._shards:
+            with shard.lock:
+                try:
+                    shard.conn.send(None)
+                except (BrokenPipeError, OSError):
+                    pass
+        for shard in self._shards:
+            shard.process.join(timeout=5)
+            shard.conn.close()
+
+
+def _bench(router, requests: List[Dict], clients: int, batch: int) -> float:
+    """Bookings per second with ``clients`` threads issuing single bookings or batches."""
+    def book(data):
+        try:
+            router.create_booking(data)
+        except ValueError:
+            pass
+
+    chunks = [requests[i:i + batch] for i in range(0, len(requests), batch)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        if batch > 1:
+            list(pool.map(router.create_bookings_batch, chunks))
+        else:
+            list(pool.map(book, requests))
+    return len(requests) / (time.perf_counter() - started)
+
+
+def main() -> None:
+    from benchmarks import datagen
+
+    parser = argparse.ArgumentParser(description="Booking throughput with showtimes sharded over N processes")
+    parser.add_argument("--shards", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--bookings", type=int, default=20000, help="existing bookings in the dataset")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--batch", type=int, default=1, help="requests per create_bookings_batch call")
+    args = parser.parse_args()
+    for shards in sorted({1, args.shards}):
+        _, showtimes, seat_maps, bookings_list = datagen.generate_dataset(args.bookings, seed=1)
+        requests = []
+        for i in range(args.requests):
+            st = showtimes[i % len(showtimes)]
+            seat_map = seat_maps[st["id"]]
+            free = [code for code in seat_map if seat_map.status_of(code) == "available"]
+            if free:
+                requests.append({"showtime_id": st["id"], "seats": [free[(i // len(showtimes)) % len(free)]]})
+        router = ShardRouter(shards, showtimes, seat_maps, bookings_list)
+        try:
+            print(f"{shards} shard(s): {_bench(router, requests, args.clients, args.batch):,.0f} bookings/s")
+        finally:
+            router.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,433 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import List, Dict, Iterable, Optional, Tuple
+
+import movies
+import seating
+from reports import ReportAggregates, booking_cents
+
+DB_FILE = "cinema.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS movies (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS showtimes (
+    id TEXT PRIMARY KEY,
+    movie_id TEXT,
+    screen TEXT,
+    starts_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS showtimes_movie ON showtimes (movie_id, starts_at);
+CREATE INDEX IF NOT EXISTS showtimes_screen ON showtimes (screen, starts_at);
+CREATE TABLE IF NOT EXISTS seats (
+    showtime_id TEXT NOT NULL,
+    code TEXT NOT NULL,
+    zone TEXT,
+    status INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (showtime_id, code)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS bookings (
+    id TEXT PRIMARY KEY,
+    showtime_id TEXT NOT NULL,
+    email TEXT,
+    status TEXT NOT NULL,
+    starts_at TEXT,
+    seats INTEGER NOT NULL,
+    total_cents INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bookings_showtime ON bookings (showtime_id, status);
+CREATE INDEX IF NOT EXISTS bookings_email ON bookings (email);
+CREATE INDEX IF NOT EXISTS bookings_status_start ON bookings (status, starts_at);
+"""
+
+# hot-path statements, kept as constants so sqlite3's statement cache reuses them
+_RESERVE_SEATS = (
+    "UPDATE seats SET status = 1 WHERE showtime_id = ? AND status = 0 AND code IN (SELECT value FROM json_each(?))"
+)
+_RELEASE_SEATS = "UPDATE seats SET status = 0 WHERE showtime_id = ? AND code IN (SELECT value FROM json_each(?))"
+_INSERT_BOOKING = (
+    "INSERT OR IGNORE INTO bookings (id, showtime_id, email, status, starts_at, seats, total_cents, data) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_CANCEL_BOOKING = (
+    "UPDATE bookings SET status = 'cancelled', data = json_set(data, '$.status', 'cancelled', '$.cancelled_at', ?) "
+    "WHERE id = ? AND status != 'cancelled' "
+    "RETURNING showtime_id, IIF(json_extract(data, '$.seats_voided'), '[]', json_extract(data, '$.seats'))"
+)
+_GET_BOOKING = "SELECT data FROM bookings WHERE id = ?"
+# resident bookings: active and for a showtime that has not started (as in storage.load_state_lazy)
+_RESIDENT = """
+SELECT b.data FROM bookings b LEFT JOIN showtimes s ON s.id = b.showtime_id
+WHERE b.status = 'active' AND COALESCE(s.starts_at, b.starts_at, ?) >= ? ORDER BY b.rowid
+"""
+_HISTORY_ACTIVE = """
+SELECT b.id, b.showtime_id, s.movie_id, b.seats, b.total_cents, b.starts_at, json_extract(b.data, '$.seats_voided')
+FROM bookings b LEFT JOIN showtimes s ON s.id = b.showtime_id
+WHERE b.status = 'active' AND COALESCE(s.starts_at, b.starts_at, ?) < ?
+"""
+
+
+def _minute(value: Optional[str]) -> Optional[str]:
+    """Normalise a showtime datetime to a sortable 'YYYY-MM-DD HH:MM' (None if unparseable)."""
+    dt = movies.parse_showtime_datetime(value)
+    return dt.strftime("%Y-%m-%d %H:%M") if dt else None
+
+
+def _dumps(data) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+class SqliteStorage:
+    """Storage backend over one SQLite database (WAL mode).
+
+    Same interface as ``storage.JsonStorage``. Loading returns the same
+    in-memory structures the store works on, but only active bookings for
+    showtimes that have not started; the rest stay in the database behind
+    a ``SqliteHistory``. Store mutations reach the database through
+    ``SqliteEventLog``, so reserving seats is one indexed UPDATE rather
+    than a rewrite of the dataset.
+    """
+
+    def __init__(self, path: str, lazy: bool = True):
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self.path = path
+        self.lazy = lazy
+        # one connection shared by the store's threads, serialised by _lock
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, cached_statements=256)
+        self._lock = threading.RLock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    # -- transactions --------------------------------------------------------
+
+    def transaction(self):
+        return _Transaction(self)
+
+    # -- backend interface ---------------------------------------------------
+
+    def load_movies(self) -> List[Dict]:
+        with self._lock:
+            return [json.loads(data) for (data,) in self.conn.execute("SELECT data FROM movies ORDER BY rowid")]
+
+    def save_movies(self, movies_list: List[Dict]) -> None:
+        with self.transaction() as cur:
+            cur.execute("DELETE FROM movies")
+            cur.executemany("INSERT INTO movies (id, data) VALUES (?, ?)", [(m.get("id"), _dumps(m)) for m in movies_list])
+
+    def load_state(self) -> Tuple[List, Dict, List, Optional["SqliteHistory"]]:
+        with self._lock:
+            showtimes = [json.loads(data) for (data,) in self.conn.execute("SELECT data FROM showtimes ORDER BY rowid")]
+            seat_maps = {st["id"]: seating.initialize_seat_map(st.get("screen_config", {})) for st in showtimes}
+            for sid, code in self.conn.execute("SELECT showtime_id, code FROM seats WHERE status = 1"):
+                seat_map = seat_maps.get(sid)
+                if seat_map is not None and code in seat_map:
+                    seating.reserve_seat(seat_map, code)
+            if not self.lazy:
+                bookings = [json.loads(data) for (data,) in self.conn.execute("SELECT data FROM bookings ORDER BY rowid")]
+                return showtimes, seat_maps, bookings, None
+            now = datetime.now().strftime("%Y-%m-%d %H:%M")
+            bookings = [json.loads(data) for (data,) in self.conn.execute(_RESIDENT, ("9999", now))]
+            history = SqliteHistory(self, self.conn.execute(_HISTORY_ACTIVE, ("9999", now)))
+        return showtimes, seat_maps, bookings, history
+
+    def open_journal(self, autoflush: bool = True) -> "SqliteEventLog":
+        return SqliteEventLog(self, autoflush=autoflush)
+
+    def save(self, store) -> None:
+        """Write the store's whole state (used when no event log is attached)."""
+        if store.history is not None:
+            # history rows are already in the database; only touch what is resident
+            self.write_state(store.showtimes, store.seat_maps, store.bookings, replace=False)
+        else:
+            self.write_state(store.showtimes, store.seat_maps, store.bookings)
+
+    def snapshot(self, store) -> None:
+        if store.journal is None:
+            self.save(store)
+            return
+        store.journal.flush()
+        self.compact(store.journal)
+
+    def compact(self, event_log: "SqliteEventLog") -> int:
+        """Fold the WAL back into the database file."""
+        event_log.flush()
+        with self._lock:
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        event_log.events_since_snapshot = 0
+        return event_log.seq
+
+    def backup(self, store, backup_dir: str) -> List[str]:
+        """Copy the database with SQLite's online backup API."""
+        if store.journal is not None:
+            store.journal.flush()
+        os.makedirs(backup_dir, exist_ok=True)
+        timestamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+        target_path = os.path.join(backup_dir, f"cinema-{timestamp}.db")
+        target = sqlite3.connect(target_path)
+        try:
+            with self._lock:
+                self.conn.backup(target)
+        finally:
+            target.close()
+        return [target_path]
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+    # -- writes --------------------------------------------------------------
+
+    def write_state(
+        self,
+        showtimes: List[Dict],
+        seat_maps: Dict,
+        bookings: Iterable[Dict],
+        movies_list: Optional[List[Dict]] = None,
+        replace: bool = True,
+    ) -> None:
+        """Upsert a full in-memory state in one transaction (``replace`` clears the tables first)."""
+        with self.transaction() as cur:
+            if replace:
+                cur.execute("DELETE FROM bookings")
+                cur.execute("DELETE FROM seats")
+                cur.execute("DELETE FROM showtimes")
+            if movies_list is not None:
+                cur.execute("DELETE FROM movies")
+                cur.executemany("INSERT INTO movies (id, data) VALUES (?, ?)", [(m.get("id"), _dumps(m)) for m in movies_list])
+            for st in showtimes:
+                self._put_showtime(cur, st, seat_maps.get(st.get("id")))
+            cur.executemany(
+                "INSERT OR REPLACE INTO bookings (id, showtime_id, email, status, starts_at, seats, total_cents, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (self._booking_row(b) for b in bookings),
+            )
+
+    def _put_showtime(self, cur: sqlite3.Cursor, showtime: Dict, seat_map=None) -> None:
+        sid = showtime.get("id")
+        cur.execute(
+            "INSERT OR REPLACE INTO showtimes (id, movie_id, screen, starts_at, data) VALUES (?, ?, ?, ?, ?)",
+            (sid, showtime.get("movie_id"), showtime.get("screen"), _minute(showtime.get("datetime")), _dumps(showtime)),
+        )
+        if seat_map is None:
+            seat_map = seating.initialize_seat_map(showtime.get("screen_config", {}))
+        cur.execute("DELETE FROM seats WHERE showtime_id = ?", (sid,))
+        cur.executemany(
+            "INSERT INTO seats (showtime_id, code, zone, status) VALUES (?, ?, ?, ?)",
+            [
+                (sid, code, seat.get("zone"), 1 if seat.get("status") == "reserved" else 0)
+                for code, seat in seat_map.items()
+            ],
+        )
+
+    @staticmethod
+    def _booking_row(booking: Dict) -> Tuple:
+        return (
+            booking.get("id"),
+            booking.get("showtime_id"),
+            booking.get("customer", {}).get("email"),
+            booking.get("status"),
+            _minute(booking.get("showtime_snapshot", {}).get("datetime")),
+            len(booking.get("seats", [])),
+            booking_cents(booking),
+            _dumps(booking),
+        )
+
+    def apply(self, event: Dict, cur: sqlite3.Cursor) -> None:
+        """Apply one store event (see ``journal._apply`` for the JSON equivalent)."""
+        op = event.get("op")
+        if op == "booking_created":
+            self._insert_booking(cur, event["booking"])
+        elif op == "booking_batch":
+            for booking in event["bookings"]:
+                self._insert_booking(cur, booking)
+        elif op == "booking_cancelled":
+            row = cur.execute(_CANCEL_BOOKING, (event.get("cancelled_at"), event["id"])).fetchone()
+            if row is not None:
+                cur.execute(_RELEASE_SEATS, row)
+        elif op == "showtime_scheduled":
+            if cur.execute("SELECT 1 FROM showtimes WHERE id = ?", (event["showtime"]["id"],)).fetchone() is None:
+                self._put_showtime(cur, event["showtime"])
+        elif op == "showtime_updated":
+            row = cur.execute("SELECT data FROM showtimes WHERE id = ?", (event["id"],)).fetchone()
+            if row is None:
+                return
+            showtime = json.loads(row[0])
+            showtime.update({k: v for k, v in event.get("updates", {}).items() if k != "id"})
+            showtime["updated_at"] = event.get("updated_at")
+            cur.execute(
+                "UPDATE showtimes SET movie_id = ?, screen = ?, starts_at = ?, data = ? WHERE id = ?",
+                (showtime.get("movie_id"), showtime.get("screen"), _minute(showtime.get("datetime")), _dumps(showtime), event["id"]),
+            )
+        elif op == "seat_map_reset":
+            cur.execute("UPDATE seats SET status = 0 WHERE showtime_id = ?", (event["showtime_id"],))
+            cur.execute(
+                "UPDATE bookings SET data = json_set(data, '$.seats_voided', json('true')) "
+                "WHERE id IN (SELECT value FROM json_each(?))",
+                (_dumps(event.get("booking_ids", [])),),
+            )
+        elif op == "showtimes_archived":
+            ids = (_dumps(event["ids"]),)
+            for table, column in (("bookings", "showtime_id"), ("seats", "showtime_id"), ("showtimes", "id")):
+                cur.execute(f"DELETE FROM {table} WHERE {column} IN (SELECT value FROM json_each(?))", ids)
+
+    def _insert_booking(self, cur: sqlite3.Cursor, booking: Dict) -> None:
+        if cur.execute(_INSERT_BOOKING, self._booking_row(booking)).rowcount and booking.get("status") == "active":
+            cur.execute(_RESERVE_SEATS, (booking.get("showtime_id"), _dumps(booking.get("seats", []))))
+
+    # -- queries ---------------------------------------------------------------
+
+    def get_booking(self, booking_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self.conn.execute(_GET_BOOKING, (booking_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+class _Transaction:
+    """``with storage.transaction() as cur``: BEGIN IMMEDIATE ... COMMIT, rolled back on error."""
+
+    def __init__(self, storage: SqliteStorage):
+        self.storage = storage
+
+    def __enter__(self) -> sqlite3.Cursor:
+        self.storage._lock.acquire()
+        self.cursor = self.storage.conn.cursor()
+        self.cursor.execute("BEGIN IMMEDIATE")
+        return self.cursor
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        try:
+            self.cursor.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.cursor.close()
+            self.storage._lock.release()
+        return False
+
+
+class SqliteHistory:
+    """Database-backed counterpart of ``storage.BookingHistory``: bookings not kept in memory."""
+
+    def __init__(self, storage: SqliteStorage, active_rows: Iterable[Tuple]):
+        self.storage = storage
+        self.aggregates = ReportAggregates()
+        self.active_showtimes = set()
+        for _, sid, movie_id, seats, cents, starts_at, voided in active_rows:
+            self.active_showtimes.add(sid)
+            self.aggregates.add(sid, movie_id, seats, cents, starts_at or "", voided=bool(voided))
+
+    def get(self, booking_id: str) -> Optional[Dict]:
+        return self.storage.get_booking(booking_id)
+
+    def for_email(self, email: str) -> List[Dict]:
+        with self.storage._lock:
+            rows = self.storage.conn.execute("SELECT data FROM bookings WHERE email = ? ORDER BY rowid", (email,))
+            return [json.loads(data) for (data,) in rows]
+
+    def for_showtimes(self, showtime_ids) -> List[Dict]:
+        with self.storage._lock:
+            rows = self.storage.conn.execute(
+                "SELECT data FROM bookings WHERE showtime_id IN (SELECT value FROM json_each(?)) ORDER BY rowid",
+                (_dumps(sorted(showtime_ids)),),
+            )
+            return [json.loads(data) for (data,) in rows]
+
+    def discard(self, bookings: List[Dict], showtime_by_id: Dict[str, Dict]) -> None:
+        """Forget archived bookings (their rows go with the showtimes_archived event)."""
+        for booking in bookings:
+            if booking.get("status") == "active":
+                self.aggregates.record_cancellation(booking, showtime_by_id.get(booking.get("showtime_id")))
+
+
+class SqliteEventLog:
+    """Event sink for ``BookingStore`` that applies events to the database.
+
+    It stands in for ``journal.Journal``: events are serialised on
+    ``append`` and applied in one transaction per group (``group_size``
+    events or ``max_delay`` seconds), or on an explicit ``flush``.
+    """
+
+    def __init__(self, storage: SqliteStorage, group_size: int = 64, max_delay: float = 0.05, autoflush: bool = True):
+        self.storage = storage
+        self.group_size = group_size
+        self.max_delay = max_delay
+        self.autoflush = autoflush
+        self.seq = 0
+        self.events_since_snapshot = 0
+        self._buffer: List[str] = []
+        self._first_buffered = 0.0
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def append(self, event: Dict) -> int:
+        with self._lock:
+            self.seq += 1
+            if not self._buffer:
+                self._first_buffered = time.monotonic()
+            # serialise now: the store keeps mutating the same dicts
+            self._buffer.append(_dumps(event))
+            self.events_since_snapshot += 1
+            group_full = self.autoflush and (
+                len(self._buffer) >= self.group_size or time.monotonic() - self._first_buffered >= self.max_delay
+            )
+            seq = self.seq
+        if group_full:
+            self.flush()
+        return seq
+
+    def flush(self) -> None:
+        with self._write_lock:
+            with self._lock:
+                lines, self._buffer = self._buffer, []
+            if not lines:
+                return
+            with self.storage.transaction() as cur:
+                for line in lines:
+                    self.storage.apply(json.loads(line), cur)
+
+    def truncate(self, upto_seq: Optional[int] = None) -> None:
+        self.storage.compact(self)
+
+    def close(self) -> None:
+        self.flush()
+
+
+def migrate_json(data_dir: str, db_path: str) -> Dict[str, int]:
+    """One-shot import of ``data_dir``'s JSON files (plus journal) into a fresh database."""
+    import storage
+
+    showtimes, seat_maps, bookings_list = storage.load_state(data_dir)
+    movies_list = movies.load_movies(os.path.join(data_dir, "movies.json"))
+    db = SqliteStorage(db_path)
+    try:
+        db.write_state(showtimes, seat_maps, bookings_list, movies_list=movies_list)
+    finally:
+        db.close()
+    return {"movies": len(movies_list), "showtimes": len(showtimes), "bookings": len(bookings_list)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Migrate data/*.json into the SQLite backend")
+    parser.add_argument("--data", default="data")
+    parser.add_argument("--db", help=f"database path (default: <data>/{DB_FILE})")
+    args = parser.parse_args()
+    counts = migrate_json(args.data, args.db or os.path.join(args.data, DB_FILE))
+    print(", ".join(f"{count} {name}" for name, count in counts.items()) + " migrated")
+
+
+if __name__ == "__main__":
+    main()
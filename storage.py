@@ -1,70 +1,703 @@
+import codecs
+import gc
+import hashlib
 import json
+import logging
 import os
-import shutil
+import re
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
-from typing import List, Dict, Tuple
+from typing import List, Dict, Iterator, Optional, Tuple
+
+import binary_snapshot
+import journal
+import metrics
+import movies
+import seating
+from reports import ReportAggregates, booking_cents
+
+JOURNAL_FILE = "journal.jsonl"
+MANIFEST_FILE = "manifest.json"
+HISTORY_INDEX_FILE = "bookings.history.json"
+SNAPSHOT_FILE = binary_snapshot.SNAPSHOT_FILE
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s*")
+_SEPARATORS = re.compile(r"[\s,]*")
 
 
 def _ensure_dir(path: str) -> None:
     os.makedirs(path, exist_ok=True)
 
 
-def load_state(base_dir: str) -> Tuple[List, Dict, List]:
+def _json_default(obj):
+    """Serialise compact in-memory structures (e.g. SeatMap) in their legacy JSON shape."""
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _fsync_dir(path: str) -> None:
+    """Flush a directory entry after a rename (no-op where unsupported)."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _atomic_write_json(path: str, data, **dump_kwargs) -> str:
+    """Write JSON to a temp file, fsync and rename it over ``path``; returns the sha256."""
+    encoded = json.dumps(data, **dump_kwargs).encode("utf-8")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(encoded)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return hashlib.sha256(encoded).hexdigest()
+
+
+@contextmanager
+def _gc_paused():
+    """Suspend the cyclic GC while bulk-loading: JSON decoding allocates only
+    acyclic containers, yet each one pushes the collector towards full passes
+    over everything already loaded."""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _read_json(path: str):
+    """Return (data, sha256) for a JSON file."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    return json.loads(raw), hashlib.sha256(raw).hexdigest()
+
+
+def _read_manifest(base_dir: str) -> Dict:
+    path = os.path.join(base_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    try:
+        data, _ = _read_json(path)
+    except ValueError:
+        logger.warning("Ignoring unreadable %s", path)
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def iter_json_array(
+    path: str, chunk_size: int = 1 << 16, digest=None, offset: int = 0
+) -> Iterator[Tuple[Dict, int, int]]:
+    """Yield ``(record, start, end)`` for each element of a top-level JSON array.
+
+    The file is read ``chunk_size`` bytes at a time, so memory stays bounded by
+    one chunk plus the record being decoded. ``start``/``end`` are byte offsets,
+    letting a record be re-read later with a single seek. ``digest`` (a hashlib
+    object) is fed every byte read. A non-zero ``offset`` resumes inside the
+    array, just after a record previously returned.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buf = ""
+    pos = 0
+    byte_pos = offset  # byte offset of buf[pos]
+    eof = False
+    started = offset > 0
+    with open(path, "rb") as f:
+        f.seek(offset)
+
+        def advance(new_pos: int) -> None:
+            nonlocal pos, byte_pos
+            segment = buf[pos:new_pos]
+            byte_pos += len(segment) if segment.isascii() else len(segment.encode("utf-8"))
+            pos = new_pos
+
+        def read_more() -> bool:
+            nonlocal buf, pos, eof
+            if eof:
+                return False
+            raw = f.read(chunk_size)
+            if digest is not None:
+                digest.update(raw)
+            eof = not raw
+            buf = buf[pos:] + utf8.decode(raw, final=eof)
+            pos = 0
+            return True
+
+        while True:
+            advance((_SEPARATORS if started else _WHITESPACE).match(buf, pos).end())
+            if pos >= len(buf):
+                if not read_more():
+                    raise ValueError(f"{path}: unexpected end of JSON array")
+                continue
+            if not started:
+                if buf[pos] != "[":
+                    raise ValueError(f"{path}: expected a JSON array")
+                advance(pos + 1)
+                started = True
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                record, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                # most likely a record split across chunks
+                if not read_more():
+                    raise
+                continue
+            start = byte_pos
+            advance(end)
+            yield record, start, byte_pos
+
+
+class BookingHistory:
+    """Bookings a lazy load left on disk, fetched from bookings.json on demand.
+
+    Only byte offsets, an email index and a short report summary of each
+    active record stay in memory. Saving writes the history records first and
+    a sidecar index (``bookings.history.json``) describing them, so the next
+    lazy load skips straight past them. If bookings.json is rewritten behind
+    our back, e.g. by ``compact_journal``, the offsets are rebuilt with one
+    streaming pass.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.clear()
+
+    def clear(self) -> None:
+        self.offsets: Dict[str, Tuple[int, int]] = {}
+        self.by_email: Dict[str, List[str]] = {}
+        # report summary of active records: id -> [showtime_id, seats, cents, showtime datetime(, seats voided)]
+        self.active: Dict[str, list] = {}
+        # showtimes with active bookings in history; their seat maps are not verified
+        self.active_showtimes = set()
+        self.aggregates = ReportAggregates()
+        self._stat = None
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __contains__(self, booking_id: str) -> bool:
+        return booking_id in self.offsets
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(os.path.dirname(self.path), HISTORY_INDEX_FILE)
+
+    def add(self, booking: Dict, start: int, end: int, showtime: Optional[Dict]) -> None:
+        bid = booking.get("id")
+        self.offsets[bid] = (start, end)
+        self.by_email.setdefault(booking.get("customer", {}).get("email"), []).append(bid)
+        if booking.get("status") == "active":
+            summary = [
+                booking.get("showtime_id"),
+                len(booking.get("seats", [])),
+                booking_cents(booking),
+                booking.get("showtime_snapshot", {}).get("datetime", ""),
+            ]
+            if booking.get("seats_voided"):
+                summary.append(True)
+            self._add_active(bid, summary, showtime.get("movie_id") if showtime else None)
+
+    def _add_active(self, bid: str, summary: list, movie_id: Optional[str]) -> None:
+        self.active[bid] = summary
+        self.active_showtimes.add(summary[0])
+        self.aggregates.add(summary[0], movie_id, summary[1], summary[2], summary[3], voided=len(summary) > 4)
+
+    def get(self, booking_id: str) -> Optional[Dict]:
+        if booking_id not in self.offsets:
+            return None
+        self._check_file()
+        with open(self.path, "rb") as f:
+            return json.loads(self._read_span(f, booking_id))
+
+    def for_email(self, email: str) -> List[Dict]:
+        return [self.get(bid) for bid in self.by_email.get(email, [])]
+
+    def for_showtimes(self, showtime_ids) -> List[Dict]:
+        """History bookings of the given showtimes (one streaming pass)."""
+        self._check_file()
+        return [
+            record
+            for record, _, _ in iter_json_array(self.path)
+            if record.get("id") in self.offsets and record.get("showtime_id") in showtime_ids
+        ]
+
+    def discard(self, bookings: List[Dict], showtime_by_id: Dict[str, Dict]) -> None:
+        """Forget bookings moved elsewhere (e.g. archived); the next save leaves them out."""
+        for booking in bookings:
+            bid = booking.get("id")
+            if self.offsets.pop(bid, None) is None:
+                continue
+            ids = self.by_email.get(booking.get("customer", {}).get("email"), [])
+            if bid in ids:
+                ids.remove(bid)
+            if self.active.pop(bid, None) is not None:
+                self.aggregates.record_cancellation(booking, showtime_by_id.get(booking.get("showtime_id")))
+
+    def mark_file(self) -> None:
+        """Remember the file version the offsets point into."""
+        self._stat = _file_stamp(self.path)
+
+    def _read_span(self, f, booking_id: str) -> bytes:
+        start, end = self.offsets[booking_id]
+        f.seek(start)
+        return f.read(end - start)
+
+    def _check_file(self) -> None:
+        if self._stat is not None and _file_stamp(self.path) == self._stat:
+            return
+        for record, start, end in iter_json_array(self.path):
+            if record.get("id") in self.offsets:
+                self.offsets[record["id"]] = (start, end)
+        self.mark_file()
+
+    def write_index(self, history_end: int, sha256: str) -> None:
+        """Describe the history block at the head of bookings.json for the next load."""
+        by_id_email = {bid: email for email, ids in self.by_email.items() for bid in ids}
+        _atomic_write_json(
+            self.index_path,
+            {
+                "stamp": list(self._stat),
+                "sha256": sha256,
+                "history_end": history_end,
+                "records": {bid: [start, end, by_id_email.get(bid)] for bid, (start, end) in self.offsets.items()},
+                "active": self.active,
+            },
+            separators=(",", ":"),
+        )
+
+    def load_index(self, showtimes: List[Dict]) -> Optional[Tuple[int, str]]:
+        """Adopt a sidecar index that matches bookings.json; returns (history_end, sha256) or None."""
+        try:
+            index, _ = _read_json(self.index_path)
+            if tuple(index["stamp"]) != _file_stamp(self.path):
+                return None
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        movie_of = {st.get("id"): st.get("movie_id") for st in showtimes}
+        for bid, (start, end, email) in index["records"].items():
+            self.offsets[bid] = (start, end)
+            self.by_email.setdefault(email, []).append(bid)
+        for bid, summary in index["active"].items():
+            self._add_active(bid, summary, movie_of.get(summary[0]))
+        self._stat = tuple(index["stamp"])
+        return index["history_end"], index["sha256"]
+
+
+def _file_stamp(path: str) -> Tuple[int, int, int]:
+    st = os.stat(path)
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def _write_bookings(path: str, bookings: List[Dict], history: Optional[BookingHistory], update_offsets: bool = True) -> str:
+    """Write bookings.json atomically with the history records copied verbatim; returns the sha256.
+
+    The output matches ``json.dumps(records, indent=2)`` byte for byte, with
+    the history records first. With ``update_offsets`` the history is moved
+    to the new file and its sidecar index rewritten.
+    """
+    if history is not None and history.offsets:
+        history._check_file()
+    digest = hashlib.sha256()
+    new_offsets: Dict[str, Tuple[int, int]] = {}
+    tmp_path = f"{path}.tmp"
+    written = 0
+    spans = sorted(history.offsets, key=history.offsets.get) if history is not None else []
+    with open(tmp_path, "wb") as out, (open(history.path, "rb") if spans else nullcontext()) as src:
+
+        def emit(data: bytes) -> None:
+            nonlocal written
+            out.write(data)
+            digest.update(data)
+            written += len(data)
+
+        emit(b"[")
+        separator = b"\n  "
+        for bid in spans:
+            raw = history._read_span(src, bid)
+            emit(separator)
+            new_offsets[bid] = (written, written + len(raw))
+            emit(raw)
+            separator = b",\n  "
+        history_end = written
+        for booking in bookings:
+            emit(separator)
+            emit(json.dumps(booking, indent=2, ensure_ascii=False).replace("\n", "\n  ").encode("utf-8"))
+            separator = b",\n  "
+        emit(b"]" if separator == b"\n  " else b"\n]")
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(tmp_path, path)
+    if history is not None and update_offsets:
+        history.offsets = new_offsets
+        history.path = path
+        history.mark_file()
+        history.write_index(history_end, digest.hexdigest())
+    return digest.hexdigest()
+
+
+@metrics.timed("load_state")
+def load_state(base_dir: str, verify: bool = True) -> Tuple[List, Dict, List]:
     """Load showtimes, seat_maps, and bookings."""
+    with _gc_paused():
+        showtimes, seat_maps, bookings, journal_seq, consistent = _load_snapshot(base_dir)
+    # replay the journal tail written since the snapshot
+    journal.replay(os.path.join(base_dir, JOURNAL_FILE), showtimes, seat_maps, bookings, after_seq=journal_seq)
+    if verify or not consistent:
+        for issue in verify_seat_maps(showtimes, seat_maps, bookings, repair=True):
+            logger.warning("Seat map repaired: %s", issue)
+    return showtimes, seat_maps, bookings
+
+
+@metrics.timed("load_state_lazy")
+def load_state_lazy(
+    base_dir: str, now: Optional[datetime] = None, verify: bool = True
+) -> Tuple[List, Dict, List, BookingHistory]:
+    """Load showtimes, seat maps and only the bookings still in play.
+
+    bookings.json is streamed; active bookings for showtimes that have not
+    started stay resident, everything else is left on disk in the returned
+    ``BookingHistory``. Pass the history back to ``save_state`` so it is kept.
+    """
+    history = BookingHistory(os.path.join(base_dir, "bookings.json"))
+    with _gc_paused():
+        showtimes, seat_maps, bookings, journal_seq, consistent = _load_snapshot(base_dir, history, now or datetime.now())
+    journal.replay(os.path.join(base_dir, JOURNAL_FILE), showtimes, seat_maps, bookings, after_seq=journal_seq)
+    if verify or not consistent:
+        # seat maps of showtimes with bookings in history cannot be checked against the resident ones
+        resident = [st for st in showtimes if st.get("id") not in history.active_showtimes]
+        for issue in verify_seat_maps(resident, seat_maps, bookings, repair=True):
+            logger.warning("Seat map repaired: %s", issue)
+    return showtimes, seat_maps, bookings, history
+
+
+def _load_snapshot(
+    base_dir: str, history: Optional[BookingHistory] = None, now: Optional[datetime] = None
+) -> Tuple[List, Dict, List, int, bool]:
+    """Read the snapshot files; returns (showtimes, seat_maps, bookings, journal_seq, consistent).
+
+    With a ``history``, bookings are streamed and the ones not resident at
+    ``now`` are indexed there instead of returned. A binary snapshot (see
+    ``binary_snapshot``) always loads every booking resident.
+    """
     showtimes_path = os.path.join(base_dir, "showtimes.json")
     bookings_path = os.path.join(base_dir, "bookings.json")
+    manifest = _read_manifest(base_dir)
+    expected_hashes = manifest.get("files", {})
+    snapshot_path = os.path.join(base_dir, SNAPSHOT_FILE)
+    if manifest.get("format") == "binary" and os.path.exists(snapshot_path):
+        showtimes, seat_maps, bookings, info = binary_snapshot.read(snapshot_path)
+        consistent = info["intact"] and info["generation"] == manifest.get("generation")
+        if not consistent:
+            logger.warning("Binary snapshot does not match manifest generation %s; repairing from bookings", manifest.get("generation"))
+        return showtimes, seat_maps, bookings, manifest.get("journal_seq", info["journal_seq"]), consistent
 
     showtimes: List[Dict] = []
     seat_maps: Dict = {}
     bookings: List[Dict] = []
+    journal_seq = 0
+    consistent = True
 
     if os.path.exists(showtimes_path):
-        with open(showtimes_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            if isinstance(data, dict):
-                showtimes = data.get("showtimes", [])
-                seat_maps = data.get("seat_maps", {})
-            elif isinstance(data, list):
-                showtimes = data
-
-    if os.path.exists(bookings_path):
-        with open(bookings_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            bookings = data if isinstance(data, list) else []
+        data, digest = _read_json(showtimes_path)
+        consistent &= expected_hashes.get("showtimes.json", digest) == digest
+        if isinstance(data, dict):
+            showtimes = data.get("showtimes", [])
+            journal_seq = data.get("journal_seq", 0)
+            seat_maps = {
+                sid: seating.SeatMap.from_dict(seat_dict) for sid, seat_dict in data.get("seat_maps", {}).items()
+            }
+        elif isinstance(data, list):
+            showtimes = data
+
+    # the manifest is written last, so its journal_seq never skips unsaved events
+    journal_seq = manifest.get("journal_seq", journal_seq)
+    if os.path.exists(bookings_path) and history is not None:
+        # bookings the journal tail still changes must be resident for replay,
+        # and archived showtimes' bookings must not come back as history
+        pinned, archived = set(), set()
+        for event in journal.read_events(os.path.join(base_dir, JOURNAL_FILE), journal_seq):
+            if event.get("op") == "booking_cancelled":
+                pinned.add(event.get("id"))
+            elif event.get("op") == "showtimes_archived":
+                archived.update(event["ids"])
+        bookings, digest = _stream_bookings(bookings_path, showtimes, history, now, pinned, archived)
+        consistent &= expected_hashes.get("bookings.json", digest) == digest
+    elif os.path.exists(bookings_path):
+        data, digest = _read_json(bookings_path)
+        consistent &= expected_hashes.get("bookings.json", digest) == digest
+        bookings = data if isinstance(data, list) else []
+
+    if not consistent:
+        logger.warning("Snapshot files do not match manifest generation %s; repairing from bookings", manifest.get("generation"))
+    return showtimes, seat_maps, bookings, journal_seq, consistent
+
+
+def _stream_bookings(
+    path: str,
+    showtimes: List[Dict],
+    history: BookingHistory,
+    now: datetime,
+    pinned=frozenset(),
+    archived=frozenset(),
+) -> Tuple[List[Dict], str]:
+    """Split bookings.json into resident bookings and history; returns (bookings, sha256)."""
+    starts = {st.get("id"): (st, _parse_start(st.get("datetime"))) for st in showtimes}
+    digest = hashlib.sha256()
+    offset, known_sha = 0, None
+    index = history.load_index(showtimes)
+    if index is not None and not archived and not any(bid in history for bid in pinned):
+        offset, known_sha = index
+        digest = None
+    elif index is not None:
+        # the indexed block needs filtering: fall back to a full pass
+        history.clear()
+    bookings = []
+    for booking, start, end in iter_json_array(path, digest=digest, offset=offset):
+        if booking.get("showtime_id") in archived:
+            continue
+        showtime, show_dt = starts.get(booking.get("showtime_id"), (None, None))
+        if show_dt is None:
+            show_dt = _parse_start(booking.get("showtime_snapshot", {}).get("datetime"))
+        if booking.get("id") in pinned or (booking.get("status") == "active" and (show_dt is None or show_dt >= now)):
+            bookings.append(booking)
+        else:
+            history.add(booking, start, end, showtime)
+    history.mark_file()
+    return bookings, known_sha or digest.hexdigest()
 
-    return showtimes, seat_maps, bookings
 
+def _parse_start(value: Optional[str]) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except ValueError:
+        return None
 
-def save_state(base_dir: str, showtimes: List, seat_maps: Dict, bookings: List) -> None:
-    """Persist showtimes, seat maps, and bookings to disk."""
+
+@metrics.timed("save_state")
+def save_state(
+    base_dir: str,
+    showtimes: List,
+    seat_maps: Dict,
+    bookings: List,
+    journal_seq: int = 0,
+    history: Optional[BookingHistory] = None,
+    binary: bool = False,
+) -> None:
+    """Persist showtimes, seat maps, and bookings to disk.
+
+    Each file is replaced atomically; bookings go first because they are the
+    source of truth, and the manifest tying both to one generation goes last.
+    A ``history`` from ``load_state_lazy`` is written back alongside ``bookings``.
+    With ``binary`` everything goes to one ``state.snap`` file instead (see
+    ``binary_snapshot``); the files of the other format are removed once
+    the manifest points away from them.
+    """
+    _ensure_dir(base_dir)
+    manifest = _read_manifest(base_dir)
+    generation = int(manifest.get("generation", 0)) + 1
+    bookings_path = os.path.join(base_dir, "bookings.json")
+    if binary:
+        if history is not None and len(history):
+            raise ValueError("Binary snapshots keep every booking resident; load the state without a booking history")
+        snapshot_hash = binary_snapshot.write(
+            os.path.join(base_dir, SNAPSHOT_FILE), showtimes, seat_maps, bookings, generation, journal_seq
+        )
+        files = {SNAPSHOT_FILE: snapshot_hash}
+        stale = ["showtimes.json", "bookings.json", HISTORY_INDEX_FILE]
+    else:
+        if history is not None:
+            bookings_hash = _write_bookings(bookings_path, bookings, history)
+        else:
+            bookings_hash = _atomic_write_json(bookings_path, bookings, indent=2, ensure_ascii=False)
+        payload = {"showtimes": showtimes, "seat_maps": seat_maps, "generation": generation}
+        showtimes_hash = _atomic_write_json(
+            os.path.join(base_dir, "showtimes.json"), payload, indent=2, ensure_ascii=False, default=_json_default
+        )
+        files = {"showtimes.json": showtimes_hash, "bookings.json": bookings_hash}
+        stale = [SNAPSHOT_FILE]
+    _atomic_write_json(
+        os.path.join(base_dir, MANIFEST_FILE),
+        {"generation": generation, "journal_seq": journal_seq, "format": "binary" if binary else "json", "files": files},
+        indent=2,
+    )
+    for name in stale:
+        path = os.path.join(base_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
+    _fsync_dir(base_dir)
+
+
+def verify_seat_maps(showtimes: List[Dict], seat_maps: Dict, bookings: List[Dict], repair: bool = True) -> List[str]:
+    """Compare seat maps with the seats held by active bookings.
+
+    Bookings are the source of truth: with ``repair`` set, seats of active
+    bookings (except those voided by a seat-map reset) are reserved and reserved seats without a booking are released.
+    Returns a description of every mismatch found.
+    """
+    expected: Dict[str, set] = {}
+    for b in bookings:
+        if b.get("status") == "active" and not b.get("seats_voided"):
+            expected.setdefault(b.get("showtime_id"), set()).update(b.get("seats", []))
+
+    issues = []
+    for st in showtimes:
+        sid = st.get("id")
+        seat_map = seat_maps.get(sid)
+        if seat_map is None:
+            issues.append(f"{sid}: seat map missing")
+            if not repair:
+                continue
+            seat_map = seat_maps[sid] = seating.initialize_seat_map(st.get("screen_config", {}))
+        wanted = expected.get(sid, set())
+        actual = seating.reserved_seats(seat_map)
+        unknown = sorted(code for code in wanted if code not in seat_map)
+        missing = sorted(code for code in wanted - actual if code in seat_map)
+        extra = sorted(actual - wanted)
+        if unknown:
+            issues.append(f"{sid}: booked seats not in seat map: {', '.join(unknown)}")
+        if missing:
+            issues.append(f"{sid}: booked seats not reserved: {', '.join(missing)}")
+        if extra:
+            issues.append(f"{sid}: reserved seats without booking: {', '.join(extra)}")
+        if repair:
+            for code in missing:
+                seating.reserve_seat(seat_map, code)
+            for code in extra:
+                seating.release_seat(seat_map, code)
+    return issues
+
+
+def open_journal(base_dir: str, group_size: int = 64, autoflush: bool = True) -> journal.Journal:
+    """Open (or create) the append-only event log next to the snapshot files."""
     _ensure_dir(base_dir)
-    with open(os.path.join(base_dir, "showtimes.json"), "w", encoding="utf-8") as f:
-        json.dump({"showtimes": showtimes, "seat_maps": seat_maps}, f, indent=2, ensure_ascii=False)
-    with open(os.path.join(base_dir, "bookings.json"), "w", encoding="utf-8") as f:
-        json.dump(bookings, f, indent=2, ensure_ascii=False)
-
-
-def backup_state(base_dir: str, showtimes: List, seat_maps: Dict, bookings: List, backup_dir: str) -> List[str]:
-    """Create timestamped backup files; returns backup file paths."""
-    _ensure_dir(backup_dir)
-    timestamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
-    showtime_file = os.path.join(backup_dir, f"showtimes-{timestamp}.json")
-    booking_file = os.path.join(backup_dir, f"bookings-{timestamp}.json")
-    seatmap_file = os.path.join(backup_dir, f"seatmaps-{timestamp}.json")
-
-    with open(showtime_file, "w", encoding="utf-8") as f:
-        json.dump(showtimes, f, indent=2, ensure_ascii=False)
-    with open(booking_file, "w", encoding="utf-8") as f:
-        json.dump(bookings, f, indent=2, ensure_ascii=False)
-    with open(seatmap_file, "w", encoding="utf-8") as f:
-        json.dump(seat_maps, f, indent=2, ensure_ascii=False)
-
-    # copy movies file if exists to keep aligned
-    movies_src = os.path.join(base_dir, "movies.json")
-    if os.path.exists(movies_src):
-        shutil.copy(movies_src, os.path.join(backup_dir, f"movies-{timestamp}.json"))
-
-    return [showtime_file, booking_file, seatmap_file]
+    return journal.Journal(os.path.join(base_dir, JOURNAL_FILE), group_size=group_size, autoflush=autoflush)
+
+
+def snapshot_state(
+    base_dir: str,
+    showtimes: List,
+    seat_maps: Dict,
+    bookings: List,
+    event_log: journal.Journal,
+    history: Optional[BookingHistory] = None,
+    binary: bool = False,
+) -> None:
+    """Write a full snapshot and compact the journal it supersedes."""
+    event_log.flush()
+    save_state(base_dir, showtimes, seat_maps, bookings, journal_seq=event_log.seq, history=history, binary=binary)
+    event_log.truncate()
+
+
+@metrics.timed("compact_journal")
+def compact_journal(base_dir: str, event_log: journal.Journal, binary: bool = False) -> int:
+    """Fold the journal into a new snapshot using only the files on disk.
+
+    Unlike ``snapshot_state`` this never reads the live in-memory state, so it
+    is safe to run on a background thread while requests keep mutating it.
+    Returns the sequence number the new snapshot covers.
+    """
+    event_log.flush()
+    # history records are copied through verbatim, so only live bookings are parsed into memory
+    history = None if binary else BookingHistory(os.path.join(base_dir, "bookings.json"))
+    showtimes, seat_maps, bookings, journal_seq, _ = _load_snapshot(base_dir, history, datetime.now())
+    last_seq = journal.replay(os.path.join(base_dir, JOURNAL_FILE), showtimes, seat_maps, bookings, after_seq=journal_seq)
+    resident = [st for st in showtimes if history is None or st.get("id") not in history.active_showtimes]
+    verify_seat_maps(resident, seat_maps, bookings, repair=True)
+    save_state(base_dir, showtimes, seat_maps, bookings, journal_seq=last_seq, history=history, binary=binary)
+    event_log.truncate(upto_seq=last_seq)
+    return last_seq
+
+
+def backup_state(base_dir: str, backup_dir: str, compress: bool = True) -> List[str]:
+    """Take an incremental, deduplicated backup of the data files; returns the manifest path.
+
+    See ``backups.create_backup``: only chunks that changed since earlier
+    backups are written, and ``backups.restore_backup`` restores any of them.
+    """
+    import backups
+
+    return [backups.create_backup(base_dir, backup_dir, compress=compress)["path"]]
+
+
+class JsonStorage:
+    """Storage backend over the JSON files in ``base_dir``.
+
+    Every backend offers the same methods (see ``sqlite_storage.SqliteStorage``
+    for the other one): ``load_movies``/``save_movies``, ``load_state``
+    returning (showtimes, seat_maps, bookings, history), ``open_journal``
+    for the store's event sink, ``save``/``snapshot``/``compact`` to persist,
+    ``backup`` and ``close``. With ``binary`` snapshots are written to
+    ``state.snap``; they load every booking, so ``lazy`` does not apply.
+    """
+
+    def __init__(self, base_dir: str, lazy: bool = True, binary: bool = False):
+        self.base_dir = base_dir
+        self.lazy = lazy and not binary
+        self.binary = binary
+
+    def load_movies(self) -> List[Dict]:
+        return movies.load_movies(os.path.join(self.base_dir, "movies.json"))
+
+    def save_movies(self, movies_list: List[Dict]) -> None:
+        movies.save_movies(os.path.join(self.base_dir, "movies.json"), movies_list)
+
+    def load_state(self) -> Tuple[List, Dict, List, Optional[BookingHistory]]:
+        if self.lazy:
+            return load_state_lazy(self.base_dir)
+        return load_state(self.base_dir) + (None,)
+
+    def open_journal(self, autoflush: bool = True) -> journal.Journal:
+        return open_journal(self.base_dir, autoflush=autoflush)
+
+    def save(self, store) -> None:
+        """Rewrite the snapshot files from the store (no journal)."""
+        save_state(self.base_dir, store.showtimes, store.seat_maps, store.bookings, history=store.history, binary=self.binary)
+
+    def snapshot(self, store) -> None:
+        snapshot_state(
+            self.base_dir, store.showtimes, store.seat_maps, store.bookings, store.journal, history=store.history, binary=self.binary
+        )
+
+    def compact(self, event_log: journal.Journal) -> int:
+        return compact_journal(self.base_dir, event_log, binary=self.binary)
+
+    def backup(self, store, backup_dir: str) -> List[str]:
+        """Back up what is on disk; safe to call from a background thread."""
+        if store.journal is not None:
+            store.journal.flush()
+        return backup_state(self.base_dir, backup_dir)
+
+    def close(self) -> None:
+        pass
+
+
+def open_storage(backend: str, base_dir: str, lazy: bool = True, binary: bool = False):
+    """Return the storage backend named ``backend`` ("json" or "sqlite") for ``base_dir``.
+
+    ``binary`` selects the binary snapshot file for the JSON backend.
+    """
+    if backend == "json":
+        return JsonStorage(base_dir, lazy=lazy, binary=binary)
+    if backend == "sqlite":
+        import sqlite_storage
+
+        return sqlite_storage.SqliteStorage(os.path.join(base_dir, sqlite_storage.DB_FILE), lazy=lazy)
+    raise ValueError(f"Unknown storage backend: {backend}")
 
 
 def validate_showtime(showtime: Dict) -> bool:
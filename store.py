@@ -0,0 +1,360 @@
+import threading
+from contextlib import ExitStack
+from datetime import datetime
+from typing import Callable, List, Dict, Optional, Tuple
+
+import analytics
+import bookings
+import metrics
+import movies
+import pricing
+import seating
+from holds import HoldManager
+from reports import ReportAggregates
+
+
+class BookingStore:
+    """Showtimes, seat maps and bookings held together with hash indexes.
+
+    The underlying ``showtimes`` list, ``seat_maps`` dict and ``bookings`` list
+    keep the same shape as before so they can still be handed to ``storage``
+    and ``reports``; every mutation should go through the store so the
+    indexes stay in step. When a ``journal`` is attached, each mutation also
+    appends a compact event to it (see ``journal.py``).
+
+    The store is thread-safe: seat checks and reservations for a showtime run
+    under that showtime's own lock, so bookings for different showtimes do
+    not contend, while the shared indexes sit behind a short-lived lock.
+    """
+
+    def __init__(
+        self,
+        showtimes: Optional[List[Dict]] = None,
+        seat_maps: Optional[Dict] = None,
+        bookings_list: Optional[List[Dict]] = None,
+        journal=None,
+        history=None,
+        movies_list: Optional[List[Dict]] = None,
+    ):
+        self.showtimes: List[Dict] = showtimes if showtimes is not None else []
+        self.seat_maps: Dict = seat_maps if seat_maps is not None else {}
+        self.bookings: List[Dict] = bookings_list if bookings_list is not None else []
+        self.journal = journal
+        # bookings a backend left on disk (storage.BookingHistory / sqlite_storage.SqliteHistory)
+        self.history = history
+        # movie runtimes for the screen schedule's conflict checks
+        self.movies_list: List[Dict] = movies_list if movies_list is not None else []
+        self._showtime_by_id: Dict[str, Dict] = {}
+        self._booking_by_id: Dict[str, Dict] = {}
+        self._bookings_by_email: Dict[str, Dict[str, Dict]] = {}
+        self._bookings_by_status: Dict[Tuple[str, str], Dict[str, Dict]] = {}
+        self._showtime_locks: Dict[str, threading.RLock] = {}
+        self._locks_guard = threading.Lock()
+        self._index_lock = threading.RLock()
+        # called with a showtime id after seats of it were released (see waitlist.py)
+        self.seat_listeners: List[Callable[[str], None]] = []
+        self.holds = HoldManager(self)
+        self.aggregates = ReportAggregates()
+        # bumped by every logged mutation; keys the cached columnar projection
+        self.revision = 0
+        self._columns: Optional[Tuple[int, object]] = None
+        self.showtime_index = movies.ShowtimeIndex()
+        self.schedule = movies.ScreenSchedule(movies_list=self.movies_list)
+        self.reindex()
+
+    # -- indexes -------------------------------------------------------------
+
+    def reindex(self) -> None:
+        """Rebuild every index from the underlying containers."""
+        with self._index_lock:
+            self._showtime_by_id = {st.get("id"): st for st in self.showtimes}
+            self.showtime_index = movies.ShowtimeIndex(self.showtimes)
+            self.schedule = movies.ScreenSchedule(self.showtimes, self.movies_list)
+            self._booking_by_id = {}
+            self._bookings_by_email = {}
+            self._bookings_by_status = {}
+            for booking in self.bookings:
+                self._index_booking(booking)
+            base = self.history.aggregates if self.history is not None else None
+            self.aggregates = ReportAggregates.build(self.bookings, self.showtimes, base=base)
+
+    def lock_for(self, showtime_id: str) -> threading.RLock:
+        """Return the (re-entrant) lock guarding one showtime's seat map."""
+        lock = self._showtime_locks.get(showtime_id)
+        if lock is None:
+            with self._locks_guard:
+                lock = self._showtime_locks.setdefault(showtime_id, threading.RLock())
+        return lock
+
+    def _index_booking(self, booking: Dict) -> None:
+        bid = booking.get("id")
+        self._booking_by_id[bid] = booking
+        email = booking.get("customer", {}).get("email")
+        self._bookings_by_email.setdefault(email, {})[bid] = booking
+        key = (booking.get("showtime_id"), booking.get("status"))
+        self._bookings_by_status.setdefault(key, {})[bid] = booking
+
+    def _move_status(self, booking: Dict, old_status: str) -> None:
+        bid = booking.get("id")
+        sid = booking.get("showtime_id")
+        bucket = self._bookings_by_status.get((sid, old_status))
+        if bucket is not None:
+            bucket.pop(bid, None)
+            if not bucket:
+                del self._bookings_by_status[(sid, old_status)]
+        self._bookings_by_status.setdefault((sid, booking.get("status")), {})[bid] = booking
+
+    def _log(self, event: Dict) -> None:
+        self.revision += 1
+        if self.journal is not None:
+            self.journal.append(event)
+
+    def columns(self):
+        """``analytics.BookingColumns`` of the resident bookings (None without NumPy).
+
+        Built on first use and kept until the next mutation, so repeated
+        report runs over unchanged data skip the O(history) projection.
+        """
+        with self._index_lock:
+            revision = self.revision
+            if self._columns is None or self._columns[0] != revision:
+                self._columns = (revision, analytics.build_columns(self.bookings, self.showtimes, self.seat_maps))
+            return self._columns[1]
+
+    def seats_freed(self, showtime_id: str) -> None:
+        """Tell the seat listeners that seats of a showtime became available; call without its lock."""
+        for listener in list(self.seat_listeners):
+            listener(showtime_id)
+
+    # -- lookups -------------------------------------------------------------
+
+    def get_showtime(self, showtime_id: str) -> Optional[Dict]:
+        return self._showtime_by_id.get(showtime_id)
+
+    def get_booking(self, booking_id: str) -> Optional[Dict]:
+        booking = self._booking_by_id.get(booking_id)
+        if booking is None and self.history is not None:
+            return self.history.get(booking_id)
+        return booking
+
+    def bookings_for_showtime(self, showtime_id: str, status: str = "active") -> List[Dict]:
+        """Return bookings of a showtime with the given status."""
+        with self._index_lock:
+            return list(self._bookings_by_status.get((showtime_id, status), {}).values())
+
+    def find_showtimes(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        movie_id: Optional[str] = None,
+        screen: Optional[str] = None,
+    ) -> List[Dict]:
+        """Showtimes starting in [start, end) in time order, e.g. tonight on one screen."""
+        with self._index_lock:
+            return self.showtime_index.between(start, end, movie_id=movie_id, screen=screen)
+
+    def list_showtimes(self, movie_id: Optional[str] = None, date: Optional[str] = None, screen: Optional[str] = None) -> List[Dict]:
+        """Filter showtimes by movie, date (YYYY-MM-DD), or screen via the time index."""
+        with self._index_lock:
+            return movies.list_showtimes(self.showtimes, movie_id, date, screen, index=self.showtime_index)
+
+    def list_customer_bookings(self, email: str) -> List[Dict]:
+        """Return active bookings for a given customer email."""
+        with self._index_lock:
+            mine = dict(self._bookings_by_email.get(email, {}))
+        if self.history is not None:
+            # resident records win: a history backend may also return them
+            mine = {**{b["id"]: b for b in self.history.for_email(email)}, **mine}
+        return [b for b in mine.values() if b.get("status") == "active"]
+
+    # -- mutations -----------------------------------------------------------
+
+    @metrics.timed("create_booking")
+    def create_booking(self, booking_data: Dict) -> Dict:
+        """Create a booking, reserve seats, index and return the booking record."""
+        showtime_id = booking_data["showtime_id"]
+        showtime = self._showtime_by_id.get(showtime_id)
+        if not showtime:
+            metrics.booking_failed("unknown_showtime")
+            raise ValueError("Showtime not found")
+        seat_map = self.seat_maps.get(showtime_id)
+        if seat_map is None:
+            metrics.booking_failed("missing_seat_map")
+            raise ValueError("Seat map missing for showtime")
+
+        with self.lock_for(showtime_id):
+            # the seat map may have been rebuilt while we waited for the lock
+            seat_map = self.seat_maps[showtime_id]
+            booking = bookings.book_seats(showtime, seat_map, booking_data)
+            with self._index_lock:
+                self.bookings.append(booking)
+                self._index_booking(booking)
+                self.aggregates.record_booking(booking, showtime)
+            self._log({"op": "booking_created", "booking": booking})
+        metrics.booking_created()
+        return booking
+
+    @metrics.timed("create_bookings_batch")
+    def create_bookings_batch(self, requests: List[Dict], atomic: str = "showtime") -> List[Dict]:
+        """Book many requests across showtimes; returns one result dict per request.
+
+        The locks of every showtime involved are taken in sorted order, so
+        the batch sees a stable view and cannot deadlock with another batch.
+        All successful bookings go to the journal as one ``booking_batch`` event.
+        """
+        showtime_ids = sorted({data.get("showtime_id") for data in requests if data.get("showtime_id") in self._showtime_by_id})
+        with ExitStack() as stack:
+            for showtime_id in showtime_ids:
+                stack.enter_context(self.lock_for(showtime_id))
+            showtimes = [self._showtime_by_id[sid] for sid in showtime_ids]
+            results = bookings.create_bookings_batch(showtimes, self.seat_maps, requests, atomic=atomic)
+            created = [r["booking"] for r in results if r["ok"]]
+            if created:
+                with self._index_lock:
+                    for booking in created:
+                        self.bookings.append(booking)
+                        self._index_booking(booking)
+                        self.aggregates.record_booking(booking, self._showtime_by_id[booking["showtime_id"]])
+                self._log({"op": "booking_batch", "bookings": created})
+        if created:
+            metrics.booking_created(len(created))
+        return results
+
+    @metrics.timed("cancel_booking")
+    def cancel_booking(
+        self,
+        booking_id: str,
+        now: Optional[datetime] = None,
+        cancellation_window_min: int = 30,
+    ) -> (bool, str):
+        """Cancel booking with cutoff; frees seats. Returns (success, message)."""
+        booking = self._booking_by_id.get(booking_id)
+        if not booking:
+            # history bookings are cancelled or past, so this only builds the right message
+            past = self.history.get(booking_id) if self.history is not None else None
+            return bookings.cancel_booking_record(past, self.seat_maps, now, cancellation_window_min)
+        with self.lock_for(booking.get("showtime_id")):
+            old_status = booking.get("status")
+            success, msg = bookings.cancel_booking_record(booking, self.seat_maps, now, cancellation_window_min)
+            if success:
+                with self._index_lock:
+                    self._move_status(booking, old_status)
+                    self.aggregates.record_cancellation(booking, self._showtime_by_id.get(booking.get("showtime_id")))
+                self._log({"op": "booking_cancelled", "id": booking_id, "cancelled_at": booking.get("cancelled_at")})
+                metrics.BOOKINGS_CANCELLED.inc()
+        if success:
+            self.seats_freed(booking.get("showtime_id"))
+        return success, msg
+
+    def schedule_showtime(self, showtime_data: Dict) -> Dict:
+        """Create a showtime with a fresh seat map and index it.
+
+        Raises ValueError if the screen is busy with another show then, or
+        if a showtime with the requested id already exists.
+        """
+        with self._index_lock:
+            if showtime_data.get("id") and showtime_data["id"] in self._showtime_by_id:
+                raise ValueError(f"Showtime {showtime_data['id']} already exists")
+            showtime = movies.schedule_showtime(self.showtimes, showtime_data, schedule=self.schedule)
+            self._add_showtime(showtime)
+        return showtime
+
+    def _add_showtime(self, showtime: Dict) -> None:
+        self.seat_maps[showtime["id"]] = seating.initialize_seat_map(showtime["screen_config"])
+        self._showtime_by_id[showtime["id"]] = showtime
+        self.showtime_index.add(showtime)
+        self._log({"op": "showtime_scheduled", "showtime": showtime})
+
+    def import_schedule(self, entries: List[Dict], partial: bool = False) -> Dict:
+        """Schedule a whole programme (e.g. next week's) after validating it in one pass.
+
+        Returns ``{"scheduled": [...], "rejected": [...]}`` with the problems
+        from ``ScreenSchedule.validate``. Unless ``partial`` is set, any
+        problem rejects the whole programme and nothing is scheduled.
+        """
+        with self._index_lock:
+            rejected = self.schedule.validate(entries, known_ids=self._showtime_by_id)
+            if rejected and not partial:
+                return {"scheduled": [], "rejected": rejected}
+            skip = {problem["index"] for problem in rejected}
+            scheduled = []
+            for pos, entry in enumerate(entries):
+                if pos not in skip:
+                    showtime = movies.schedule_showtime(self.showtimes, entry, schedule=self.schedule)
+                    self._add_showtime(showtime)
+                    scheduled.append(showtime)
+        return {"scheduled": scheduled, "rejected": rejected}
+
+    def update_showtime(self, showtime_id: str, updates: Dict) -> Optional[Dict]:
+        """Update a showtime by id; returns the updated record or None if not found.
+
+        Raises ValueError if the show would move onto a busy screen slot.
+        """
+        showtime = self._showtime_by_id.get(showtime_id)
+        if not showtime:
+            return None
+        with self.lock_for(showtime_id):
+            with self._index_lock:
+                updated = movies.update_showtime([showtime], showtime_id, updates, schedule=self.schedule)
+                self.showtime_index.update(updated)
+            pricing.invalidate(showtime_id)
+            self._log({"op": "showtime_updated", "id": showtime_id, "updates": updates, "updated_at": updated.get("updated_at")})
+        return updated
+
+    def reset_seat_map(self, showtime_id: str) -> bool:
+        """Rebuild a showtime's seat map with every seat available.
+
+        The showtime's active bookings stay active but are marked
+        ``seats_voided``, so a reload does not reserve their seats again.
+        """
+        showtime = self._showtime_by_id.get(showtime_id)
+        if not showtime:
+            return False
+        with self.lock_for(showtime_id):
+            self.seat_maps[showtime_id] = seating.initialize_seat_map(showtime.get("screen_config", {}))
+            with self._index_lock:
+                voided = self.bookings_for_showtime(showtime_id)
+                for booking in voided:
+                    booking["seats_voided"] = True
+                self.aggregates.reset_showtime(showtime_id)
+            self._log({"op": "seat_map_reset", "showtime_id": showtime_id, "booking_ids": [b["id"] for b in voided]})
+        self.seats_freed(showtime_id)
+        return True
+
+    def archive_showtimes(self, showtime_ids: List[str], write) -> None:
+        """Drop showtimes, their seat maps and bookings once ``write`` has stored them elsewhere.
+
+        ``write(showtimes, seat_maps, bookings)`` runs under the showtime and
+        index locks, so nothing can book into a showtime while it moves.
+        """
+        ids = sorted(set(showtime_ids) & self._showtime_by_id.keys())
+        wanted = set(ids)
+        with ExitStack() as stack:
+            for showtime_id in ids:
+                stack.enter_context(self.lock_for(showtime_id))
+            with self._index_lock:
+                resident = [b for b in self.bookings if b.get("showtime_id") in wanted]
+                past = self.history.for_showtimes(wanted) if self.history is not None else []
+                # a database history also returns rows that are resident here; the resident copy is current
+                resident_ids = {b.get("id") for b in resident}
+                past = [b for b in past if b.get("id") not in resident_ids]
+                write(
+                    [self._showtime_by_id[sid] for sid in ids],
+                    {sid: self.seat_maps[sid] for sid in ids if sid in self.seat_maps},
+                    past + resident,
+                )
+                if self.history is not None:
+                    self.history.discard(past, self._showtime_by_id)
+                self.showtimes[:] = [st for st in self.showtimes if st.get("id") not in wanted]
+                self.bookings[:] = [b for b in self.bookings if b.get("showtime_id") not in wanted]
+                for showtime_id in ids:
+                    self.seat_maps.pop(showtime_id, None)
+                self.reindex()
+                self._log({"op": "showtimes_archived", "ids": ids})
+
+    def ensure_seat_maps(self) -> None:
+        """Generate seat maps for showtimes missing one."""
+        for st in self.showtimes:
+            sid = st.get("id")
+            if sid not in self.seat_maps:
+                self.seat_maps[sid] = seating.initialize_seat_map(st.get("screen_config", {}))
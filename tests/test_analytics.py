@@ -0,0 +1,94 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+import reports
+import seating
+from store import BookingStore
+
+np = pytest.importorskip("numpy")
+
+import analytics  # noqa: E402
+
+
+def _store():
+    base = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=3)
+    showtimes = []
+    for n in range(8):
+        st_dt = base + timedelta(days=n // 3, hours=10 + 4 * (n % 3))
+        showtimes.append(
+            {
+                "id": f"ST-A{n}",
+                "movie_id": f"MV00{n % 3}",
+                "screen": f"Screen {n % 2 + 1}",
+                "language": "TR" if n % 4 else "EN",
+                "datetime": st_dt.strftime("%Y-%m-%d %H:%M"),
+                "pricing": {"standard": 10.0, "premium": 14.5},
+                "screen_config": {"rows": ["A", "B", "C"], "seats_per_row": 6, "premium_rows": ["A"]},
+            }
+        )
+    seat_maps = {st["id"]: seating.initialize_seat_map(st["screen_config"]) for st in showtimes}
+    store = BookingStore(showtimes, seat_maps, [])
+    rng = random.Random(11)
+    created = []
+    for _ in range(80):
+        st = rng.choice(store.showtimes)
+        try:
+            created.append(
+                store.create_booking(
+                    {"showtime_id": st["id"], "seats": rng.sample(list(store.seat_maps[st["id"]]), rng.randint(1, 3))}
+                )
+            )
+        except ValueError:
+            pass
+    for booking in rng.sample(created, len(created) // 4):
+        store.cancel_booking(booking["id"])
+    return store, base
+
+
+def test_columnar_reports_match_pure_python():
+    store, base = _store()
+    columns = analytics.build_columns(store.bookings, store.showtimes, store.seat_maps)
+
+    assert reports.occupancy_report(
+        store.showtimes, store.seat_maps, store.bookings, columns=columns
+    ) == reports.occupancy_report(store.showtimes, store.seat_maps, store.bookings)
+    period = (base.strftime("%Y-%m-%d 12:00"), (base + timedelta(days=1)).strftime("%Y-%m-%d 23:59"))
+    assert reports.revenue_summary(store.bookings, period, columns=columns) == reports.revenue_summary(
+        store.bookings, period
+    )
+    expected = {m["movie_id"]: m["seats_sold"] for m in reports.top_movies(store.bookings, store.showtimes)}
+    got = {m["movie_id"]: m["seats_sold"] for m in reports.top_movies(store.bookings, store.showtimes, columns=columns)}
+    assert got == expected
+    expected = {m["movie_id"]: m["seats_sold"] for m in reports.top_movies(store.bookings, store.showtimes, period=period)}
+    got = {
+        m["movie_id"]: m["seats_sold"]
+        for m in reports.top_movies(store.bookings, store.showtimes, period=period, columns=columns)
+    }
+    assert got == expected
+
+
+def test_breakdowns_match_pure_python():
+    store, base = _store()
+    columns = analytics.BookingColumns(store.bookings, store.showtimes, store.seat_maps)
+    period = (base.strftime("%Y-%m-%d 00:00"), (base + timedelta(days=1)).strftime("%Y-%m-%d 23:59"))
+    for by in reports.BREAKDOWNS:
+        for p in (None, period):
+            expected = reports.breakdown(store.bookings, store.showtimes, by, p, seat_maps=store.seat_maps)
+            assert reports.breakdown(store.bookings, store.showtimes, by, p, columns=columns) == expected
+    zones = reports.breakdown(store.bookings, store.showtimes, "zone", columns=columns)
+    assert set(zones) == {"premium", "standard"}
+    total = reports.revenue_summary(store.bookings, (base.strftime("%Y-%m-%d 00:00"), "9999-12-31 23:59"))
+    assert round(sum(z["revenue"] for z in zones.values()), 2) == pytest.approx(total["total_revenue"], abs=0.02)
+    with pytest.raises(ValueError):
+        reports.breakdown(store.bookings, store.showtimes, "weekday")
+
+
+def test_store_columns_are_cached_until_the_next_change():
+    store, _ = _store()
+    columns = store.columns()
+    assert store.columns() is columns
+    store.schedule_showtime({"movie_id": "MV009", "screen": "Screen 9", "datetime": "2031-01-01 10:00"})
+    rebuilt = store.columns()
+    assert rebuilt is not columns and "MV009" in rebuilt.movies
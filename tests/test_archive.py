@@ -0,0 +1,96 @@
+import os
+from datetime import datetime, timedelta
+
+import archive
+import reports
+import seating
+import sqlite_storage
+import storage
+from store import BookingStore
+
+
+def _showtime(sid, movie_id, dt):
+    return {
+        "id": sid,
+        "movie_id": movie_id,
+        "screen": "Screen 1",
+        "datetime": dt,
+        "pricing": {"standard": 10.0, "premium": 14.0},
+        "screen_config": {"rows": ["A", "B"], "seats_per_row": 3, "premium_rows": ["A"]},
+    }
+
+
+def _store(journal=None):
+    future = (datetime.now() + timedelta(days=3)).strftime("%Y-%m-%d %H:%M")
+    showtimes = [
+        _showtime("ST-JAN", "MV001", "2024-01-15 19:30"),
+        _showtime("ST-FEB", "MV002", "2024-02-10 20:00"),
+        _showtime("ST-NOW", "MV001", future),
+    ]
+    seat_maps = {st["id"]: seating.initialize_seat_map(st["screen_config"]) for st in showtimes}
+    store = BookingStore(showtimes, seat_maps, [], journal=journal)
+    store.create_booking({"showtime_id": "ST-JAN", "seats": ["A1", "A2"]})
+    store.create_booking({"showtime_id": "ST-FEB", "seats": ["B1", "B2", "B3"]})
+    store.create_booking({"showtime_id": "ST-NOW", "seats": ["B1"]})
+    return store
+
+
+def test_archive_moves_past_showtimes_into_monthly_partitions(tmp_path):
+    store = _store()
+    period = ("2024-01-01 00:00", "2024-12-31 23:59")
+    before_revenue = reports.revenue_summary(store.bookings, period)
+    before_top = reports.top_movies(store.bookings, store.showtimes)
+    archive_dir = str(tmp_path / "archive")
+
+    counts = archive.archive_past(store, archive_dir)
+    assert counts == {"showtimes": 2, "bookings": 2, "partitions": 2}
+    assert sorted(os.listdir(archive_dir)) == ["2024-01.json.gz", "2024-02.json.gz"]
+    assert os.stat(os.path.join(archive_dir, "2024-01.json.gz")).st_mode & 0o222 == 0
+    assert [st["id"] for st in store.showtimes] == ["ST-NOW"]
+    assert set(store.seat_maps) == {"ST-NOW"}
+    assert len(store.bookings) == 1
+
+    after = reports.revenue_summary(store.bookings, period, aggregates=store.aggregates, archive_dir=archive_dir)
+    assert after["booking_count"] == before_revenue["booking_count"] == 2
+    assert after["total_revenue"] == before_revenue["total_revenue"]
+    assert reports.top_movies(store.bookings, store.showtimes, aggregates=store.aggregates, archive_dir=archive_dir) == before_top
+    january = reports.top_movies(
+        store.bookings, store.showtimes, period=("2024-01-01 00:00", "2024-01-31 23:59"), archive_dir=archive_dir
+    )
+    assert january == [{"movie_id": "MV001", "seats_sold": 2}]
+    months = [part["month"] for part in archive.iter_partitions(archive_dir, datetime(2024, 2, 1), datetime(2024, 2, 28))]
+    assert months == ["2024-02"]
+
+
+def test_archive_is_journaled(tmp_path):
+    base = str(tmp_path)
+    store = _store(journal=storage.open_journal(base))
+    storage.snapshot_state(base, store.showtimes, store.seat_maps, store.bookings, store.journal)
+    archive.archive_past(store, str(tmp_path / "archive"))
+    store.journal.close()
+
+    showtimes, seat_maps, bookings_list, history = storage.load_state_lazy(base)
+    assert [st["id"] for st in showtimes] == ["ST-NOW"]
+    assert len(bookings_list) == 1 and len(history) == 0
+    assert set(seat_maps) == {"ST-NOW"}
+
+
+def test_archive_on_sqlite_backend_writes_each_booking_once(tmp_path):
+    db = sqlite_storage.SqliteStorage(str(tmp_path / "cinema.db"))
+    db.save(_store())
+    showtimes, seat_maps, bookings_list, history = db.load_state()
+    store = BookingStore(showtimes, seat_maps, bookings_list, journal=db.open_journal(), history=history)
+    # booked this session: resident and already in the database
+    store.create_booking({"showtime_id": "ST-JAN", "seats": ["B1"]})
+    store.journal.flush()
+    archive_dir = str(tmp_path / "archive")
+
+    assert archive.archive_past(store, archive_dir)["bookings"] == 3
+    january = archive.load_partition(archive.partition_path(archive_dir, "2024-01"))
+    assert sorted(len(b["seats"]) for b in january["bookings"]) == [1, 2]
+    assert all(count >= 0 for count in store.aggregates.seats_by_movie.values())
+    assert store.aggregates.seats_by_movie["MV001"] == 1
+    assert all(count >= 0 for count in store.aggregates.reserved_by_showtime.values())
+    top = reports.top_movies(store.bookings, store.showtimes, aggregates=store.aggregates, archive_dir=archive_dir)
+    assert top == [{"movie_id": "MV001", "seats_sold": 4}, {"movie_id": "MV002", "seats_sold": 3}]
+    db.close()
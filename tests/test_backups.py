@@ -0,0 +1,43 @@
+import os
+from datetime import datetime
+
+import backups
+import storage
+from benchmarks import datagen
+from store import BookingStore
+
+
+def test_incremental_backup_and_point_in_time_restore(tmp_path):
+    data_dir, backup_dir = str(tmp_path / "data"), str(tmp_path / "backups")
+    movies_list, showtimes, seat_maps, bookings_list = datagen.generate_dataset(2000, screens=2, seed=5)
+    storage.JsonStorage(data_dir).save_movies(movies_list)
+    storage.save_state(data_dir, showtimes, seat_maps, bookings_list)
+
+    first = backups.create_backup(data_dir, backup_dir, now=datetime(2030, 1, 1, 12, 0))
+    assert first["counts"]["bookings"] == 2000 and first["stats"]["new_chunks"] == first["stats"]["chunks"]
+
+    # one cancellation logged in the journal: the second backup only adds the journal chunk
+    showtimes, seat_maps, bookings_list = storage.load_state(data_dir)
+    store = BookingStore(showtimes, seat_maps, bookings_list, journal=storage.open_journal(data_dir))
+    cancelled = next(b for b in bookings_list if b["status"] == "active")
+    store.cancel_booking(cancelled["id"], now=datetime(2000, 1, 1))
+    store.journal.flush()
+    second = backups.create_backup(data_dir, backup_dir, now=datetime(2030, 1, 1, 13, 0))
+    assert second["stats"]["new_chunks"] == 1 and second["counts"]["journal"] == 1
+    # then a snapshot rewrites bookings.json: only the chunk holding that booking changes
+    storage.snapshot_state(data_dir, store.showtimes, store.seat_maps, store.bookings, store.journal)
+    store.journal.close()
+    third = backups.create_backup(data_dir, backup_dir, now=datetime(2030, 1, 1, 14, 0))
+    assert third["stats"]["new_chunks"] <= 3 < third["stats"]["chunks"]
+
+    restored_dir = str(tmp_path / "restored")
+    backups.restore_backup(backup_dir, restored_dir, at=datetime(2030, 1, 1, 12, 30))
+    _, _, old_bookings = storage.load_state(restored_dir)
+    assert next(b for b in old_bookings if b["id"] == cancelled["id"])["status"] == "active"
+    assert len(storage.JsonStorage(restored_dir).load_movies()) == len(movies_list)
+
+    backups.restore_backup(backup_dir, restored_dir, at=datetime(2030, 1, 1, 13, 30))
+    _, _, new_bookings = storage.load_state(restored_dir)
+    assert next(b for b in new_bookings if b["id"] == cancelled["id"])["status"] == "cancelled"
+    assert len(backups.list_backups(backup_dir)) == 3
+    assert os.path.isdir(os.path.join(backup_dir, backups.OBJECTS_DIR))
@@ -0,0 +1,22 @@
+from benchmarks import datagen, run
+
+
+def test_datagen_is_reproducible():
+    first = datagen.generate_dataset(300, screens=2, rows=4, seats_per_row=5, seed=3)
+    second = datagen.generate_dataset(300, screens=2, rows=4, seats_per_row=5, seed=3)
+    assert [b["seats"] for b in first[3]] == [b["seats"] for b in second[3]]
+    assert len(first[3]) == 300
+
+
+def test_bench_size_reports_every_path():
+    result = run.bench_size(200, ops=10, repeats=1, seed=1)
+    assert set(result["paths"]) == {
+        "create_booking",
+        "cancel_booking",
+        "occupancy_report_scan",
+        "occupancy_report_aggregates",
+        "save_state",
+        "load_state",
+        "load_state_lazy",
+    }
+    assert result["paths"]["create_booking"]["ops"] == 10
@@ -0,0 +1,61 @@
+import json
+import os
+from datetime import datetime
+
+import backups
+import seating
+import storage
+from benchmarks import datagen
+from store import BookingStore
+
+
+def _dataset():
+    _, showtimes, seat_maps, bookings_list = datagen.generate_dataset(1500, screens=2, seed=11)
+    bookings_list[0].update(status="cancelled", cancelled_at="2026-01-01T10:00:00+00:00")
+    for code in bookings_list[0]["seats"]:
+        seating.release_seat(seat_maps[bookings_list[0]["showtime_id"]], code)
+    bookings_list[1]["ticket"] = {"channel": "web"}  # extra key
+    bookings_list[2]["pricing"]["total"] = 10.125  # not whole cents: stored as JSON
+    return showtimes, seat_maps, bookings_list
+
+
+def test_binary_round_trip_size_and_journal(tmp_path):
+    showtimes, seat_maps, bookings_list = _dataset()
+    json_dir, bin_dir = str(tmp_path / "json"), str(tmp_path / "bin")
+    storage.save_state(json_dir, showtimes, seat_maps, bookings_list)
+    storage.save_state(bin_dir, showtimes, seat_maps, bookings_list, binary=True)
+
+    assert sorted(os.listdir(bin_dir)) == [storage.MANIFEST_FILE, storage.SNAPSHOT_FILE]
+    json_size = sum(os.path.getsize(os.path.join(json_dir, name)) for name in ("showtimes.json", "bookings.json"))
+    assert os.path.getsize(os.path.join(bin_dir, storage.SNAPSHOT_FILE)) * 10 < json_size
+
+    loaded_showtimes, loaded_maps, loaded_bookings = storage.load_state(bin_dir)
+    assert loaded_showtimes == showtimes and loaded_bookings == bookings_list
+    assert {sid: m.to_dict() for sid, m in loaded_maps.items()} == {sid: m.to_dict() for sid, m in seat_maps.items()}
+
+    # the backend keeps journalling on top of the binary snapshot; a held seat is saved as free
+    backend = storage.open_storage("json", bin_dir, binary=True)
+    showtimes, seat_maps, bookings_list, history = backend.load_state()
+    store = BookingStore(showtimes, seat_maps, bookings_list, journal=backend.open_journal(), history=history)
+    sid = showtimes[0]["id"]
+    free = [code for code in seat_maps[sid] if seat_maps[sid].status_of(code) == "available"]
+    booking = store.create_booking({"showtime_id": sid, "seats": free[:1]})
+    store.holds.hold_seats(sid, free[1:2])
+    store.journal.flush()
+    assert storage.load_state(bin_dir)[2][-1] == booking
+    backend.snapshot(store)
+    store.journal.close()
+    _, seat_maps, _ = storage.load_state(bin_dir)
+    assert seat_maps[sid].status_of(free[0]) == "reserved" and seat_maps[sid].status_of(free[1]) == "available"
+    assert json.load(open(os.path.join(bin_dir, storage.MANIFEST_FILE)))["format"] == "binary"
+
+
+def test_backup_of_binary_snapshot_restores_as_json(tmp_path):
+    showtimes, seat_maps, bookings_list = _dataset()
+    data_dir, backup_dir, restored = str(tmp_path / "data"), str(tmp_path / "backups"), str(tmp_path / "restored")
+    storage.save_state(data_dir, showtimes, seat_maps, bookings_list, binary=True)
+    backups.create_backup(data_dir, backup_dir, now=datetime(2030, 1, 1))
+    backups.restore_backup(backup_dir, restored)
+    assert os.path.exists(os.path.join(restored, "bookings.json"))
+    assert storage.load_state(restored)[2] == bookings_list
+    assert seating.free_seat_count(storage.load_state(restored)[1][showtimes[0]["id"]]) == seat_maps[showtimes[0]["id"]].free
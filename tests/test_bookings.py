@@ -5,12 +5,13 @@ from datetime import datetime, timedelta
 
 
 def setup_state():
+    st_dt = (datetime.now() + timedelta(days=2)).strftime("%Y-%m-%d %H:%M")
     showtimes = [
         {
             "id": "ST-TST",
             "movie_id": "MV001",
             "screen": "Screen 1",
-            "datetime": "2026-01-07 19:30",
+            "datetime": st_dt,
             "language": "OV",
             "pricing": {"standard": 10.0, "premium": 14.0},
             "screen_config": {"rows": ["A", "B"], "seats_per_row": 3, "premium_rows": ["A"]},
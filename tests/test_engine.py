@@ -0,0 +1,92 @@
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+import seating
+from engine import BookingEngine
+from store import BookingStore
+
+
+def _store():
+    st_dt = (datetime.now() + timedelta(days=2)).strftime("%Y-%m-%d %H:%M")
+    showtimes = []
+    for sid in ("ST-P1", "ST-P2"):
+        showtimes.append(
+            {
+                "id": sid,
+                "movie_id": "MV001",
+                "screen": "Screen 1",
+                "datetime": st_dt,
+                "pricing": {"standard": 10.0, "premium": 14.0},
+                "screen_config": {"rows": ["A", "B", "C", "D"], "seats_per_row": 5, "premium_rows": ["A"]},
+            }
+        )
+    seat_maps = {st["id"]: seating.initialize_seat_map(st["screen_config"]) for st in showtimes}
+    return BookingStore(showtimes, seat_maps, [])
+
+
+def test_no_double_booking_under_64_concurrent_clients(monkeypatch):
+    store = _store()
+    is_available = seating.is_seat_available
+
+    def slow_check(seat_map, code):
+        # widen the check-then-reserve window so a missing lock shows up reliably
+        result = is_available(seat_map, code)
+        time.sleep(0)
+        return result
+
+    monkeypatch.setattr(seating, "is_seat_available", slow_check)
+    codes = list(store.seat_maps["ST-P1"])
+    barrier = threading.Barrier(64)
+
+    def client(n):
+        rng = random.Random(n)
+        barrier.wait()
+        for _ in range(20):
+            sid = rng.choice(["ST-P1", "ST-P2"])
+            try:
+                booking = store.create_booking(
+                    {"showtime_id": sid, "seats": rng.sample(codes, rng.randint(1, 3)), "customer": {"email": f"c{n}@test.com"}}
+                )
+            except ValueError:
+                continue
+            if rng.random() < 0.3:
+                store.cancel_booking(booking["id"])
+
+    old_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=client, args=(n,)) for n in range(64)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        sys.setswitchinterval(old_interval)
+
+    for sid, seat_map in store.seat_maps.items():
+        sold = [code for b in store.bookings_for_showtime(sid) for code in b["seats"]]
+        assert len(sold) == len(set(sold)), "seat sold twice"
+        assert set(sold) == seating.reserved_seats(seat_map)
+        assert seat_map.free == len(seat_map) - len(sold)
+
+
+def test_engine_books_in_parallel_and_rejects_conflicts():
+    store = _store()
+    requests = [{"showtime_id": "ST-P1", "seats": ["A1", "A2"]} for _ in range(10)]
+    requests += [{"showtime_id": "ST-P2", "seats": [f"B{n}"]} for n in range(1, 6)]
+    with BookingEngine(store, max_workers=8) as engine:
+        results = engine.book_many(requests)
+    assert sum(r["ok"] for r in results[:10]) == 1
+    assert all(r["ok"] for r in results[10:])
+
+
+def test_duplicate_seat_codes_do_not_leak_reservations():
+    store = _store()
+    try:
+        store.create_booking({"showtime_id": "ST-P1", "seats": ["A1", "A1"]})
+    except ValueError:
+        pass
+    assert seating.is_seat_available(store.seat_maps["ST-P1"], "A1")
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import reports
+import seating
+from store import BookingStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _store():
+    st_dt = (datetime.now() + timedelta(days=2)).strftime("%Y-%m-%d %H:%M")
+    showtimes = [
+        {
+            "id": "ST-HOLD",
+            "movie_id": "MV001",
+            "screen": "Screen 1",
+            "datetime": st_dt,
+            "pricing": {"standard": 10.0, "premium": 14.0},
+            "screen_config": {"rows": ["A"], "seats_per_row": 4, "premium_rows": []},
+        }
+    ]
+    seat_maps = {"ST-HOLD": seating.initialize_seat_map(showtimes[0]["screen_config"])}
+    store = BookingStore(showtimes, seat_maps, [])
+    store.holds.clock = FakeClock()
+    return store
+
+
+def test_hold_blocks_seats_and_expires():
+    store = _store()
+    store.holds.hold_seats("ST-HOLD", ["A1", "A2"], ttl=60)
+    seat_map = store.seat_maps["ST-HOLD"]
+    assert seating.render_seat_map(seat_map) == "A: H H O O"
+    assert reports.occupancy_report(store.showtimes, store.seat_maps, [])["ST-HOLD"]["held"] == 2
+    with pytest.raises(ValueError):
+        store.create_booking({"showtime_id": "ST-HOLD", "seats": ["A1"]})
+
+    store.holds.clock.now += 61
+    assert store.holds.expire() == 1
+    assert seat_map.free == 4
+    store.create_booking({"showtime_id": "ST-HOLD", "seats": ["A1"]})
+
+
+def test_confirm_hold_creates_booking():
+    store = _store()
+    hold = store.holds.hold_seats("ST-HOLD", ["A3"], ttl=60)
+    # a rejected booking keeps the hold, so the customer can retry
+    with pytest.raises(ValueError, match="promo"):
+        store.holds.confirm(hold["id"], {"name": "Test"}, discounts=[{"code": "NO-SUCH-CODE"}])
+    assert store.seat_maps["ST-HOLD"]["A3"]["status"] == "held"
+    booking = store.holds.confirm(hold["id"], {"name": "Test", "email": "a@test.com"})
+    assert booking["seats"] == ["A3"]
+    assert store.seat_maps["ST-HOLD"]["A3"]["status"] == "reserved"
+    # a confirmed hold is gone; its stale heap entry must not free the seat
+    store.holds.clock.now += 120
+    assert store.holds.expire() == 0
+    assert store.seat_maps["ST-HOLD"]["A3"]["status"] == "reserved"
+    with pytest.raises(ValueError):
+        store.holds.confirm(hold["id"], {})
+
+
+def test_held_seats_are_not_persisted():
+    store = _store()
+    store.holds.hold_seats("ST-HOLD", ["A4"])
+    assert store.seat_maps["ST-HOLD"].to_dict()["A4"]["status"] == "available"
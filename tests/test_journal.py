@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+
+import seating
+import storage
+from store import BookingStore
+
+
+def _showtime_data(sid):
+    return {
+        "id": sid,
+        "movie_id": "MV001",
+        "screen": "Screen 1",
+        "datetime": (datetime.now() + timedelta(days=2)).strftime("%Y-%m-%d %H:%M"),
+        "screen_config": {"rows": ["A", "B"], "seats_per_row": 3, "premium_rows": ["A"]},
+    }
+
+
+def test_journal_replay_restores_changes(tmp_path):
+    base = str(tmp_path)
+    storage.save_state(base, [], {}, [])
+    store = BookingStore(journal=storage.open_journal(base))
+    store.schedule_showtime(_showtime_data("ST-J"))
+    first = store.create_booking({"showtime_id": "ST-J", "seats": ["A1"], "customer": {"email": "a@test.com"}})
+    store.create_booking({"showtime_id": "ST-J", "seats": ["B2"], "customer": {"email": "b@test.com"}})
+    store.cancel_booking(first["id"])
+    store.update_showtime("ST-J", {"language": "TR"})
+    store.journal.close()
+
+    showtimes, seat_maps, bookings_list = storage.load_state(base)
+    assert showtimes[0]["language"] == "TR"
+    assert [b["status"] for b in bookings_list] == ["cancelled", "active"]
+    assert seat_maps["ST-J"]["A1"]["status"] == "available"
+    assert seat_maps["ST-J"]["B2"]["status"] == "reserved"
+
+
+def test_snapshot_compacts_journal_and_keeps_sequence(tmp_path):
+    base = str(tmp_path)
+    store = BookingStore(journal=storage.open_journal(base))
+    store.schedule_showtime(_showtime_data("ST-S"))
+    store.create_booking({"showtime_id": "ST-S", "seats": ["A2"], "customer": {"email": "a@test.com"}})
+    storage.snapshot_state(base, store.showtimes, store.seat_maps, store.bookings, store.journal)
+    seq = store.journal.seq
+    store.journal.close()
+
+    reopened = storage.open_journal(base)
+    assert reopened.seq == seq
+    assert reopened.events_since_snapshot == 0
+
+    showtimes, seat_maps, bookings_list = storage.load_state(base)
+    store = BookingStore(showtimes, seat_maps, bookings_list, journal=reopened)
+    store.create_booking({"showtime_id": "ST-S", "seats": ["A3"], "customer": {"email": "c@test.com"}})
+    reopened.close()
+
+    _, seat_maps, bookings_list = storage.load_state(base)
+    assert len(bookings_list) == 2
+    assert seat_maps["ST-S"].free == 4
+
+
+def test_seat_map_reset_survives_reload(tmp_path):
+    base = str(tmp_path)
+    store = BookingStore(journal=storage.open_journal(base))
+    store.schedule_showtime(_showtime_data("ST-R"))
+    first = store.create_booking({"showtime_id": "ST-R", "seats": ["A1"], "customer": {"email": "a@test.com"}})
+    store.create_booking({"showtime_id": "ST-R", "seats": ["A2"], "customer": {"email": "b@test.com"}})
+    store.reset_seat_map("ST-R")
+    store.journal.flush()
+
+    # replayed from the journal, then from a snapshot
+    showtimes, seat_maps, bookings_list = storage.load_state(base)
+    assert seating.reserved_seats(seat_maps["ST-R"]) == set()
+    assert [b["status"] for b in bookings_list] == ["active", "active"]
+    storage.snapshot_state(base, store.showtimes, store.seat_maps, store.bookings, store.journal)
+    store.journal.close()
+
+    showtimes, seat_maps, bookings_list = storage.load_state(base)
+    assert seating.reserved_seats(seat_maps["ST-R"]) == set()
+    store = BookingStore(showtimes, seat_maps, bookings_list, journal=storage.open_journal(base))
+    assert store.aggregates.reserved_by_showtime.get("ST-R", 0) == 0
+    store.create_booking({"showtime_id": "ST-R", "seats": ["A1"], "customer": {"email": "c@test.com"}})
+    assert store.cancel_booking(first["id"])[0]
+    store.journal.close()
+
+    _, seat_maps, _ = storage.load_state(base)
+    assert seating.reserved_seats(seat_maps["ST-R"]) == {"A1"}
+
+
+def test_batch_is_one_journal_record(tmp_path):
+    base = str(tmp_path)
+    storage.save_state(base, [], {}, [])
+    store = BookingStore(journal=storage.open_journal(base))
+    store.schedule_showtime(_showtime_data("ST-BJ"))
+    seq = store.journal.seq
+    results = store.create_bookings_batch(
+        [{"showtime_id": "ST-BJ", "seats": [code]} for code in ("A1", "A2", "B1")]
+    )
+    assert all(r["ok"] for r in results)
+    assert store.journal.seq == seq + 1
+    store.journal.close()
+
+    _, seat_maps, bookings_list = storage.load_state(base)
+    assert len(bookings_list) == 3
+    assert seating.free_seat_count(seat_maps["ST-BJ"]) == 3
+
+
+def test_lazy_load_replays_cancel_of_booking_now_in_the_past(tmp_path):
+    base = str(tmp_path)
+    store = BookingStore(journal=storage.open_journal(base))
+    store.schedule_showtime(_showtime_data("ST-L"))
+    booking = store.create_booking({"showtime_id": "ST-L", "seats": ["A1"], "customer": {"email": "a@test.com"}})
+    storage.snapshot_state(base, store.showtimes, store.seat_maps, store.bookings, store.journal)
+    store.cancel_booking(booking["id"])
+    store.journal.close()
+
+    later = datetime.now() + timedelta(days=3)
+    _, seat_maps, resident, history = storage.load_state_lazy(base, now=later)
+    assert [b["status"] for b in resident] == ["cancelled"]
+    assert len(history) == 0
+    assert seating.is_seat_available(seat_maps["ST-L"], "A1")
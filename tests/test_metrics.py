@@ -0,0 +1,73 @@
+import pytest
+
+import metrics
+import seating
+from server import BookingServer
+from store import BookingStore
+
+
+def _store():
+    showtimes = [
+        {
+            "id": "ST-M",
+            "movie_id": "MV001",
+            "screen": "Screen 1",
+            "datetime": "2030-01-01 19:30",
+            "pricing": {"standard": 10.0},
+            "screen_config": {"rows": ["A"], "seats_per_row": 2, "premium_rows": []},
+        }
+    ]
+    return BookingStore(showtimes, {"ST-M": seating.initialize_seat_map(showtimes[0]["screen_config"])}, [])
+
+
+def test_histogram_counter_and_prometheus_text():
+    registry = metrics.Registry()
+    hist = registry.histogram("op_seconds", "Latency", ("operation",))
+    for value in (0.0002, 0.0003, 0.02, 3.0):
+        hist.observe(value, "save")
+    counter = registry.counter("fails_total", "Failures", ("reason",))
+    counter.inc("sold_out")
+    counter.inc("sold_out")
+    registry.gauge("free", "Free seats", ("showtime",), callback=lambda: {("ST-1",): 7})
+
+    assert hist.count("save") == 4 and hist.quantile(0.5, "save") == 0.0005
+    text = registry.render()
+    assert "# TYPE op_seconds histogram" in text
+    assert 'op_seconds_bucket{operation="save",le="0.0005"} 2' in text
+    assert 'op_seconds_bucket{operation="save",le="+Inf"} 4' in text
+    assert 'fails_total{reason="sold_out"} 2' in text
+    assert 'free{showtime="ST-1"} 7' in text
+
+
+def test_store_records_latency_failures_and_gauges():
+    store = _store()
+    metrics.track_store(store)
+    created = metrics.BOOKINGS_CREATED.value()
+    timed = metrics.LATENCY.count("create_booking")
+    unavailable = metrics.BOOKING_FAILURES.value("unavailable_seats")
+    invalid = metrics.BOOKING_FAILURES.value("invalid_seats")
+    sold_out = metrics.BOOKING_FAILURES.value("sold_out")
+
+    store.create_booking({"showtime_id": "ST-M", "seats": ["A1"]})
+    for seats in (["A1"], ["Z9"]):
+        with pytest.raises(ValueError):
+            store.create_booking({"showtime_id": "ST-M", "seats": seats})
+    store.create_booking({"showtime_id": "ST-M", "seats": ["A2"]})
+    with pytest.raises(ValueError):
+        store.create_booking({"showtime_id": "ST-M", "seats": ["A1"]})
+
+    assert metrics.BOOKINGS_CREATED.value() == created + 2
+    assert metrics.LATENCY.count("create_booking") == timed + 5
+    assert metrics.BOOKING_FAILURES.value("unavailable_seats") == unavailable + 1
+    assert metrics.BOOKING_FAILURES.value("invalid_seats") == invalid + 1
+    assert metrics.BOOKING_FAILURES.value("sold_out") == sold_out + 1
+
+    status, text = BookingServer(store, []).dispatch("GET", "/metrics")
+    assert status == 200 and 'cinema_free_seats{showtime="ST-M"} 0' in text
+    assert "cinema_bookings_per_minute" in text
+
+    metrics.start_profiling(sample_every=1, trace_memory=True)
+    store.cancel_booking(store.bookings[0]["id"], cancellation_window_min=0)
+    result = metrics.stop_profiling()
+    assert result["samples"] == 1 and "cancel_booking" in result["profile"]
+    assert not metrics.profiling_active()
@@ -0,0 +1,99 @@
+from datetime import datetime
+
+import pytest
+
+import movies
+from store import BookingStore
+
+
+def _showtimes():
+    data = [
+        ("S1", "MV1", "Screen 1", "2030-05-01 20:00"),
+        ("S2", "MV2", "Screen 3", "2030-05-01 21:30"),
+        ("S3", "MV1", "Screen 3", "2030-05-01 18:00"),
+        ("S4", "MV1", "Screen 3", "2030-05-04 18:00"),
+        ("S5", "MV2", "Screen 1", "2030-05-09 12:00"),
+        ("S6", "MV1", "Screen 2", "not a date"),
+    ]
+    return [{"id": sid, "movie_id": mv, "screen": screen, "datetime": dt} for sid, mv, screen, dt in data]
+
+
+def test_index_range_queries():
+    index = movies.ShowtimeIndex(_showtimes())
+    tonight = index.between(datetime(2030, 5, 1, 17), datetime(2030, 5, 2), screen="Screen 3")
+    assert [st["id"] for st in tonight] == ["S3", "S2"]
+    week = index.between(datetime(2030, 5, 1), datetime(2030, 5, 8), movie_id="MV1")
+    assert [st["id"] for st in week] == ["S3", "S1", "S4"]
+    assert [st["id"] for st in index.between(movie_id="MV1")] == ["S3", "S1", "S4", "S6"]
+
+
+def test_list_showtimes_with_index_matches_scan():
+    showtimes = _showtimes()
+    index = movies.ShowtimeIndex(showtimes)
+    for kwargs in ({"date": "2030-05-01"}, {"date": "2030-05-01", "screen": "Screen 3"}, {"movie_id": "MV2"}, {"date": "2030-05"}):
+        scanned = movies.list_showtimes(showtimes, **kwargs)
+        indexed = movies.list_showtimes(showtimes, index=index, **kwargs)
+        assert sorted(st["id"] for st in indexed) == sorted(st["id"] for st in scanned)
+
+
+def test_store_keeps_index_current_on_update():
+    store = BookingStore(_showtimes(), {}, [])
+    store.update_showtime("S5", {"datetime": "2030-05-01 23:00"})
+    assert [st["id"] for st in store.list_showtimes(date="2030-05-01")] == ["S3", "S1", "S2", "S5"]
+    assert store.list_showtimes(date="2030-05-09") == []
+
+
+def test_store_rejects_overlapping_shows_on_a_screen():
+    movies_list = [{"id": "MV1", "duration_min": 120}, {"id": "MV2", "duration_min": 90}]
+    store = BookingStore(_showtimes(), {}, [], movies_list=movies_list)
+    # S3 holds Screen 3 from 18:00 to 20:15 (120 min + cleaning)
+    with pytest.raises(ValueError, match="S3"):
+        store.schedule_showtime({"movie_id": "MV2", "screen": "Screen 3", "datetime": "2030-05-01 20:00"})
+    late = store.schedule_showtime({"movie_id": "MV2", "screen": "Screen 3", "datetime": "2030-05-01 16:00"})
+    assert store.get_showtime(late["id"]) is late
+    with pytest.raises(ValueError):
+        store.update_showtime("S1", {"screen": "Screen 3", "datetime": "2030-05-01 19:00"})
+    assert store.get_showtime("S1")["screen"] == "Screen 1"
+    store.update_showtime("S3", {"datetime": "2030-05-02 18:00"})
+    store.update_showtime("S1", {"screen": "Screen 3", "datetime": "2030-05-01 19:00"})
+    assert store.schedule.conflicts({"movie_id": "MV2", "screen": "Screen 3", "datetime": "2030-05-02 20:00"}) == ["S3"]
+
+
+def test_import_schedule_validates_the_whole_programme():
+    store = BookingStore(_showtimes(), {}, [], movies_list=[{"id": "MV1", "duration_min": 100}])
+    week = [
+        {"movie_id": "MV1", "screen": "Screen 2", "datetime": "2030-05-06 18:00"},
+        {"movie_id": "MV1", "screen": "Screen 2", "datetime": "2030-05-06 19:30"},
+        {"movie_id": "MV1", "screen": "Screen 1", "datetime": "2030-05-01 21:00"},
+        {"movie_id": "MV1", "screen": "Screen 2", "datetime": "someday"},
+        {"movie_id": "MV1", "screen": "Screen 2", "datetime": "2030-05-06 20:00"},
+    ]
+    result = store.import_schedule(week)
+    assert result["scheduled"] == []
+    assert [(p["index"], p["conflicts"]) for p in result["rejected"]] == [(1, ["#0"]), (2, ["S1"]), (3, [])]
+    assert len(store.showtimes) == 6
+
+    result = store.import_schedule(week, partial=True)
+    assert [st["datetime"] for st in result["scheduled"]] == ["2030-05-06 18:00", "2030-05-06 20:00"]
+    assert len(store.list_showtimes(date="2030-05-06")) == 2
+
+    # ids already scheduled, or repeated within the programme, are rejected rather than overwritten
+    with pytest.raises(ValueError, match="already exists"):
+        store.schedule_showtime({"id": "S1", "movie_id": "MV1", "screen": "Screen 8", "datetime": "2030-06-01 10:00"})
+    again = [
+        {"id": "S1", "movie_id": "MV1", "screen": "Screen 8", "datetime": "2030-06-01 10:00"},
+        {"id": "NEW", "movie_id": "MV1", "screen": "Screen 8", "datetime": "2030-06-02 10:00"},
+        {"id": "NEW", "movie_id": "MV1", "screen": "Screen 8", "datetime": "2030-06-03 10:00"},
+    ]
+    result = store.import_schedule(again, partial=True)
+    assert [(p["index"], p["conflicts"]) for p in result["rejected"]] == [(0, ["S1"]), (2, ["#1"])]
+    assert [st["id"] for st in store.showtimes].count("S1") == 1 and store.get_showtime("S1")["screen"] == "Screen 1"
+
+
+def test_empty_filters_mean_no_filter_on_both_paths():
+    showtimes = _showtimes()
+    index = movies.ShowtimeIndex(showtimes)
+    for kwargs in ({"movie_id": ""}, {"screen": "", "date": "2030-05-01"}):
+        scanned = movies.list_showtimes(showtimes, **kwargs)
+        assert sorted(st["id"] for st in movies.list_showtimes(showtimes, index=index, **kwargs)) == sorted(st["id"] for st in scanned)
+    assert len(movies.list_showtimes(showtimes, movie_id="", index=index)) == 6
@@ -0,0 +1,66 @@
+import pytest
+
+import bookings
+import pricing
+import seating
+from store import BookingStore
+
+
+def _showtime(**extra):
+    showtime = {
+        "id": "ST-P",
+        "movie_id": "MV001",
+        "screen": "Screen 1",
+        "datetime": "2030-06-01 20:30",
+        "pricing": {"standard": 10.0, "premium": 14.0},
+        "screen_config": {"rows": ["A", "B"], "seats_per_row": 5, "premium_rows": ["A"]},
+    }
+    showtime.update(extra)
+    return showtime
+
+
+def test_rules_compile_and_match_calculate_booking_total():
+    showtime = _showtime()
+    seat_map = seating.initialize_seat_map(showtime["screen_config"])
+    engine = pricing.PricingEngine()
+    plain = bookings.calculate_booking_total(["A1", "B1", "B2"], showtime["pricing"], seat_map=seat_map)
+    assert engine.quote(showtime, seat_map, ["A1", "B1", "B2"]) == plain
+
+    engine = pricing.PricingEngine(
+        rules=[
+            {"type": "time_of_day", "from": "18:00", "to": "23:59", "percent": 10, "zones": ["standard"]},
+            {"type": "surge", "min_occupancy": 50, "percent": 20},
+        ],
+        promos={"half": {"type": "percent", "value": 50}},
+    )
+    assert engine.table(showtime).zone_cents == {"standard": 1100, "premium": 1400}
+    assert engine.quote(showtime, seat_map, ["B1"])["subtotal"] == 11.0
+    # seats taken by others push the quote into the surge band; the customer's own seats do not
+    for code in ["A1", "A2", "A3", "A4", "A5"]:
+        seating.reserve_seat(seat_map, code)
+    assert engine.quote(showtime, seat_map, ["B1"])["subtotal"] == 13.2
+    assert engine.quote(showtime, seat_map, ["A5"])["subtotal"] == 14.0
+    assert engine.quote(showtime, seat_map, ["B1"], [{"code": "HALF"}])["discount"] == 6.6
+    with pytest.raises(ValueError):
+        engine.quote(showtime, seat_map, ["B1"], [{"code": "NOPE"}])
+
+
+def test_preview_matches_booking_and_update_invalidates(monkeypatch):
+    monkeypatch.setitem(pricing.ENGINE.promos, "TENOFF", {"type": "flat", "value": 10})
+    showtime = _showtime(pricing_rules=[{"type": "surge", "min_occupancy": 20, "percent": 50}])
+    seat_map = seating.initialize_seat_map(showtime["screen_config"])
+    store = BookingStore([showtime], {"ST-P": seat_map}, [])
+    store.create_booking({"showtime_id": "ST-P", "seats": ["B4", "B5"]})
+
+    hold = store.holds.hold_seats("ST-P", ["A1", "A2"], ttl=60)
+    preview = pricing.quote(showtime, seat_map, ["A1", "A2"], [{"code": "tenoff"}])
+    booking = store.holds.confirm(hold["id"], {"name": "P"}, discounts=[{"code": "tenoff"}])
+    assert booking["pricing"] == preview
+    assert preview["subtotal"] == 42.0 and preview["discount"] == 10.0
+
+    store.update_showtime("ST-P", {"pricing": {"standard": 20.0, "premium": 30.0}})
+    assert pricing.quote(showtime, seat_map, ["B1"])["subtotal"] == 30.0
+
+    with pytest.raises(ValueError, match="promo"):
+        store.create_booking({"showtime_id": "ST-P", "seats": ["B1"], "discounts": [{"code": "NOPE"}]})
+    assert seating.is_seat_available(seat_map, "B1")
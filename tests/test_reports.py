@@ -0,0 +1,72 @@
+import random
+from datetime import datetime, timedelta
+
+import reports
+import seating
+from store import BookingStore
+
+
+def _store():
+    base = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=3)
+    showtimes = []
+    for n in range(6):
+        st_dt = base + timedelta(days=n // 2, hours=10 + 5 * (n % 2))
+        showtimes.append(
+            {
+                "id": f"ST-R{n}",
+                "movie_id": f"MV00{n % 3}",
+                "screen": "Screen 1",
+                "datetime": st_dt.strftime("%Y-%m-%d %H:%M"),
+                "pricing": {"standard": 10.0, "premium": 14.5},
+                "screen_config": {"rows": ["A", "B", "C"], "seats_per_row": 6, "premium_rows": ["A"]},
+            }
+        )
+    seat_maps = {st["id"]: seating.initialize_seat_map(st["screen_config"]) for st in showtimes}
+    return BookingStore(showtimes, seat_maps, []), base
+
+
+def test_aggregates_match_full_scan():
+    store, base = _store()
+    rng = random.Random(7)
+    created = []
+    for _ in range(60):
+        st = rng.choice(store.showtimes)
+        try:
+            created.append(
+                store.create_booking({"showtime_id": st["id"], "seats": rng.sample(list(store.seat_maps[st["id"]]), 2)})
+            )
+        except ValueError:
+            pass
+    for booking in rng.sample(created, len(created) // 3):
+        store.cancel_booking(booking["id"])
+
+    agg = store.aggregates
+    assert reports.occupancy_report(store.showtimes, store.seat_maps, store.bookings, aggregates=agg) == reports.occupancy_report(
+        store.showtimes, store.seat_maps, store.bookings
+    )
+    assert reports.top_movies(store.bookings, store.showtimes, aggregates=agg) == reports.top_movies(
+        store.bookings, store.showtimes
+    )
+    periods = [
+        ((base).strftime("%Y-%m-%d 00:00"), (base + timedelta(days=5)).strftime("%Y-%m-%d 23:59")),
+        ((base).strftime("%Y-%m-%d 12:00"), (base + timedelta(days=1)).strftime("%Y-%m-%d 12:00")),
+        ((base + timedelta(days=1)).strftime("%Y-%m-%d 10:00"), (base + timedelta(days=1)).strftime("%Y-%m-%d 10:00")),
+    ]
+    for period in periods:
+        assert reports.revenue_summary(store.bookings, period, aggregates=agg) == reports.revenue_summary(
+            store.bookings, period
+        )
+
+
+def test_reset_seat_map_then_cancel_keeps_reserved_count():
+    store, _ = _store()
+    first = store.create_booking({"showtime_id": "ST-R0", "seats": ["A1", "A2"]})
+    store.create_booking({"showtime_id": "ST-R0", "seats": ["B1"]})
+    store.reset_seat_map("ST-R0")
+    assert store.cancel_booking(first["id"])[0]
+    store.create_booking({"showtime_id": "ST-R0", "seats": ["C1", "C2"]})
+
+    assert store.aggregates.reserved_by_showtime["ST-R0"] == 2
+    assert reports.occupancy_report(
+        store.showtimes, store.seat_maps, store.bookings, aggregates=store.aggregates
+    ) == reports.occupancy_report(store.showtimes, store.seat_maps, store.bookings)
@@ -0,0 +1,123 @@
+import json
+
+import seating
+
+
+def test_seat_map_tracks_free_count():
+    seat_map = seating.initialize_seat_map({"rows": ["A", "B"], "seats_per_row": 3, "premium_rows": ["A"]})
+    assert len(seat_map) == 6
+    assert seating.free_seat_count(seat_map) == 6
+    seating.reserve_seat(seat_map, "A1")
+    seating.reserve_seat(seat_map, "B3")
+    assert seating.free_seat_count(seat_map) == 4
+    seating.release_seat(seat_map, "A1")
+    seating.release_seat(seat_map, "A1")
+    assert seating.free_seat_count(seat_map) == 5
+    assert seating.render_seat_map(seat_map) == "A: O O O\nB: O O X"
+
+
+def test_dict_view_compatibility():
+    seat_map = seating.initialize_seat_map({"rows": ["A"], "seats_per_row": 2, "premium_rows": ["A"]})
+    assert seat_map["A1"] == {"row": "A", "number": 1, "zone": "premium", "status": "available"}
+    seat_map["A2"]["status"] = "reserved"
+    assert not seating.is_seat_available(seat_map, "A2")
+    assert seating.free_seat_count(seat_map) == 1
+    assert "Z9" not in seat_map
+
+
+def test_layout_shared_and_round_trip():
+    config = {"rows": ["A", "B"], "seats_per_row": 4, "premium_rows": []}
+    first = seating.initialize_seat_map(config)
+    second = seating.initialize_seat_map(dict(config))
+    assert first.layout is second.layout
+
+    seating.reserve_seat(first, "B2")
+    restored = seating.SeatMap.from_dict(json.loads(json.dumps(first.to_dict())))
+    assert restored.to_dict() == first.to_dict()
+    assert seating.free_seat_count(restored) == 7
+
+
+def _brute_force_best(seat_map, n, zone=None):
+    layout = seat_map.layout
+    n_rows = len(layout.row_order)
+    ideal_row = (n_rows - 1) * 2 / 3
+    best = None
+    for r, (_, indexes) in enumerate(layout.row_order):
+        row_len = len(indexes)
+        for start in range(row_len - n + 1):
+            block = indexes[start:start + n]
+            if any(seat_map.status[i] != seating.AVAILABLE for i in block):
+                continue
+            if zone and any(layout.zones[i] != zone for i in block):
+                continue
+            score = abs(r - ideal_row) / n_rows + abs(start + (n - 1) / 2 - (row_len - 1) / 2) / row_len
+            if best is None or score < best[0] - 1e-12:
+                best = (score, [layout.codes[i] for i in block])
+    return best
+
+
+def test_find_best_seats_matches_brute_force_score():
+    import random
+
+    rng = random.Random(5)
+    config = {"rows": list("ABCDEFGHIJ"), "seats_per_row": 14, "premium_rows": ["A", "B"]}
+    seat_map = seating.initialize_seat_map(config)
+    seating.find_best_seats(seat_map, 1)  # build the row masks, then keep them in step
+    codes = list(seat_map)
+    for _ in range(300):
+        code = rng.choice(codes)
+        if seating.is_seat_available(seat_map, code):
+            seating.reserve_seat(seat_map, code)
+        else:
+            seating.release_seat(seat_map, code)
+        n = rng.randint(1, 6)
+        zone = rng.choice([None, "premium", "standard"])
+        found = seating.find_best_seats(seat_map, n, zone=zone)
+        expected = _brute_force_best(seat_map, n, zone)
+        if expected is None:
+            assert found == []
+            continue
+        assert len(found) == n
+        assert all(seating.is_seat_available(seat_map, c) for c in found)
+        layout = seat_map.layout
+        r, start = layout.seat_pos[layout.index[found[0]]]
+        row_len = len(layout.row_order[r][1])
+        n_rows = len(layout.row_order)
+        score = abs(r - (n_rows - 1) * 2 / 3) / n_rows + abs(start + (n - 1) / 2 - (row_len - 1) / 2) / row_len
+        assert abs(score - expected[0]) < 1e-9
+
+
+def test_find_best_seats_is_fast_on_large_room():
+    import time
+
+    seat_map = seating.initialize_seat_map({"rows": [f"R{r:02d}" for r in range(25)], "seats_per_row": 40})
+    for code in list(seat_map)[::3]:
+        seating.reserve_seat(seat_map, code)
+    seating.find_best_seats(seat_map, 2)
+    t0 = time.perf_counter()
+    for _ in range(100):
+        assert seating.find_best_seats(seat_map, 2)
+    assert (time.perf_counter() - t0) / 100 < 0.001
+
+
+def test_cached_render_patches_changed_seats():
+    import random
+
+    rng = random.Random(3)
+    config = {"rows": ["AA", "B", "C"], "seats_per_row": 5, "premium_rows": ["AA"]}
+    seat_map = seating.initialize_seat_map(config)
+    first = seating.render_seat_map(seat_map)
+    assert seating.render_seat_map(seat_map) is first  # unchanged: served from the cache
+    assert seating.zone_rows(seat_map, "premium") == ["AA"] and seating.zone_rows(seat_map, "standard") == ["B", "C"]
+    codes = list(seat_map)
+    for step in range(200):
+        version = seat_map.version
+        code = rng.choice(codes)
+        seat_map.set_status(code, rng.choice(["available", "reserved", "held"]))
+        assert seat_map.version >= version
+        if step % 7 == 0:
+            fresh = seating.SeatMap(seat_map.layout, bytearray(seat_map.status))
+            assert seating.render_seat_map(seat_map) == fresh.render()
+    encoded = seating.encode_seat_map(seat_map)
+    assert encoded["version"] == seat_map.token and encoded["free"] == seat_map.free
+    assert [f"{row}: {' '.join(cells)}" for row, cells in encoded["rows"].items()] == seat_map.render().split("\n")
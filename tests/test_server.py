@@ -0,0 +1,126 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import seating
+import storage
+from server import BookingServer, HttpError
+from store import BookingStore
+from tickets import TicketPipeline, TicketStore
+
+
+def _store():
+    st_dt = (datetime.now() + timedelta(days=2)).strftime("%Y-%m-%d %H:%M")
+    showtimes = [
+        {
+            "id": "ST-H",
+            "movie_id": "MV001",
+            "screen": "Screen 1",
+            "datetime": st_dt,
+            "language": "OV",
+            "pricing": {"standard": 10.0, "premium": 14.0},
+            "screen_config": {"rows": ["A", "B"], "seats_per_row": 3, "premium_rows": ["A"]},
+        }
+    ]
+    seat_maps = {"ST-H": seating.initialize_seat_map(showtimes[0]["screen_config"])}
+    return BookingStore(showtimes, seat_maps, [])
+
+
+async def _request(port, method, path, payload=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head, _, body = raw.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body)
+
+
+def test_http_booking_flow(tmp_path):
+    async def scenario():
+        store = _store()
+        store.journal = storage.open_journal(str(tmp_path), autoflush=False)
+        ticket_pipeline = TicketPipeline(TicketStore(str(tmp_path / "tickets")))
+        server = BookingServer(store, [{"id": "MV001", "title": "Test"}], flush_interval=0.01, tickets=ticket_pipeline)
+        _, port = await server.start("127.0.0.1", 0)
+        try:
+            status, showtimes = await _request(port, "GET", "/showtimes?movie_id=MV001")
+            assert status == 200 and [st["id"] for st in showtimes] == ["ST-H"]
+
+            bookings = await asyncio.gather(
+                *[
+                    _request(port, "POST", "/bookings", {"showtime_id": "ST-H", "seats": ["A1"], "customer": {"email": "a@test.com"}})
+                    for _ in range(5)
+                ]
+            )
+            assert sorted(status for status, _ in bookings) == [201, 400, 400, 400, 400]
+            booking = next(body for status, body in bookings if status == 201)
+            assert booking["ticket"].endswith(booking["id"])
+            ticket_pipeline.flush()
+            status, ticket = await _request(port, "GET", f"/tickets/{booking['id']}")
+            assert status == 200 and f"Booking ID : {booking['id']}" in ticket["ticket"]
+
+            status, seats = await _request(port, "GET", "/showtimes/ST-H/seats")
+            assert status == 200 and seats["free"] == 5
+
+            status, mine = await _request(port, "GET", "/customers/a@test.com/bookings")
+            assert [b["id"] for b in mine] == [booking["id"]]
+
+            status, occupancy = await _request(port, "GET", "/reports/occupancy")
+            assert occupancy["ST-H"]["reserved"] == 1
+            status, by_screen = await _request(port, "GET", "/reports/breakdown?by=screen")
+            assert status == 200 and sum(row["seats"] for row in by_screen.values()) == 1
+
+            status, result = await _request(port, "DELETE", f"/bookings/{booking['id']}")
+            assert status == 200 and result["success"]
+
+            status, _ = await _request(port, "GET", "/nowhere")
+            assert status == 404
+            for length in ("abc", "-5"):
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.write(f"POST /bookings HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode())
+                raw = await reader.read()
+                writer.close()
+                assert raw.startswith(b"HTTP/1.1 400") and b"Connection: close" in raw
+            await asyncio.sleep(0.05)
+            assert store.journal.pending == 0
+        finally:
+            await server.stop()
+            ticket_pipeline.close()
+            store.journal.close()
+
+    asyncio.run(scenario())
+    _, seat_maps, bookings_list = storage.load_state(str(tmp_path))
+    assert [b["status"] for b in bookings_list] == ["cancelled"]
+
+
+def test_bad_numeric_parameters_are_400():
+    server = BookingServer(_store(), [])
+    for method, target, body in (
+        ("GET", "/showtimes/ST-H/best-seats?n=two", b""),
+        ("GET", "/reports/top-movies?limit=abc", b""),
+        ("POST", "/holds", json.dumps({"showtime_id": "ST-H", "seats": ["A1"], "ttl": "soon"}).encode()),
+        ("POST", "/holds", json.dumps({"showtime_id": "ST-H", "seats": ["A1"], "ttl": -5}).encode()),
+    ):
+        with pytest.raises(HttpError) as exc:
+            server.dispatch(method, target, body)
+        assert exc.value.status == 400
+    assert server.store.holds.hold_seats("ST-H", ["A1"])["seats"] == ["A1"]
+
+
+def test_seat_poll_token_changes_across_seat_map_reset():
+    server = BookingServer(_store(), [])
+    server.store.create_booking({"showtime_id": "ST-H", "seats": ["A1"]})
+    _, first = server.dispatch("GET", "/showtimes/ST-H/seats?format=compact")
+    # the rebuilt map counts changes from scratch: one booking brings it back to the polled count
+    server.store.reset_seat_map("ST-H")
+    server.store.create_booking({"showtime_id": "ST-H", "seats": ["B3"]})
+    _, polled = server.dispatch("GET", f"/showtimes/ST-H/seats?format=compact&since={first['version']}")
+    assert "unchanged" not in polled and polled["rows"]["B"] == "OOX"
+    _, again = server.dispatch("GET", f"/showtimes/ST-H/seats?since={polled['version']}")
+    assert again["unchanged"] is True
@@ -0,0 +1,44 @@
+import pytest
+
+import reports
+import sharding
+from benchmarks import datagen
+from store import BookingStore
+
+
+def test_router_matches_single_store():
+    _, showtimes, seat_maps, bookings_list = datagen.generate_dataset(400, screens=3, seed=9)
+    single = BookingStore(*datagen.generate_dataset(400, screens=3, seed=9)[1:])
+    router = sharding.ShardRouter(3, showtimes, seat_maps, bookings_list)
+    try:
+        st = showtimes[0]
+        free = next(code for code in single.seat_maps[st["id"]] if single.seat_maps[st["id"]].status_of(code) == "available")
+        request = {"showtime_id": st["id"], "seats": [free], "customer": {"name": "A", "email": "a@x.io"}}
+        booking = router.create_booking(request)
+        single.create_booking(request)
+        with pytest.raises(ValueError):
+            router.create_booking(request)
+        assert router.get_booking(booking["id"])["seats"] == [free]
+        assert [b["id"] for b in router.list_customer_bookings("a@x.io")] == [booking["id"]]
+        assert router.cancel_booking("missing")[0] is False
+
+        # a show rejected by its shard (same screen and time as st) leaves no id behind
+        clash_id = next(f"CLASH{i}" for i in range(100) if sharding.shard_of(f"CLASH{i}", 3) == sharding.shard_of(st["id"], 3))
+        with pytest.raises(ValueError):
+            router.schedule_showtime(dict(st, id=clash_id))
+        assert clash_id not in router._showtime_ids
+        with pytest.raises(ValueError, match="already exists"):
+            router.schedule_showtime(dict(st, datetime="2099-01-01 10:00"))
+        assert router.free_seats()[st["id"]] == single.seat_maps[st["id"]].free
+
+        period = ("2000-01-01 00:00", "2100-01-01 00:00")
+        expected = reports.revenue_summary(single.bookings, period, aggregates=single.aggregates)
+        assert router.revenue_summary(period) == expected
+        expected_top = reports.top_movies(single.bookings, single.showtimes, limit=3, aggregates=single.aggregates)
+        assert sorted(m["seats_sold"] for m in router.top_movies(3)) == sorted(m["seats_sold"] for m in expected_top)
+        assert router.free_seats()[st["id"]] == single.seat_maps[st["id"]].free
+
+        showtimes_out, seat_maps_out, bookings_out = router.collect_state()
+        assert len(showtimes_out) == len(showtimes) and len(bookings_out) == len(single.bookings)
+    finally:
+        router.close()
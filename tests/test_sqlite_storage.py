@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+import seating
+import sqlite_storage
+import storage
+from store import BookingStore
+
+
+def _showtime(sid, days):
+    return {
+        "id": sid,
+        "movie_id": "MV001",
+        "screen": "Screen 1",
+        "datetime": (datetime.now() + timedelta(days=days)).strftime("%Y-%m-%d %H:%M"),
+        "pricing": {"standard": 10.0, "premium": 14.0},
+        "screen_config": {"rows": ["A", "B"], "seats_per_row": 3, "premium_rows": ["A"]},
+    }
+
+
+def _json_dir(path):
+    base = str(path)
+    store = BookingStore()
+    store.schedule_showtime(_showtime("ST-NEW", 2))
+    store.schedule_showtime(_showtime("ST-OLD", -2))
+    store.create_booking({"showtime_id": "ST-NEW", "seats": ["A1"], "customer": {"email": "a@test.com"}})
+    store.create_booking({"showtime_id": "ST-OLD", "seats": ["B1", "B2"], "customer": {"email": "a@test.com"}})
+    storage.save_state(base, store.showtimes, store.seat_maps, store.bookings)
+    return base
+
+
+def test_migration_and_lazy_load(tmp_path):
+    base = _json_dir(tmp_path)
+    db_path = str(tmp_path / "cinema.db")
+    assert sqlite_storage.migrate_json(base, db_path)["bookings"] == 2
+
+    db = sqlite_storage.SqliteStorage(db_path)
+    showtimes, seat_maps, bookings_list, history = db.load_state()
+    assert [st["id"] for st in showtimes] == ["ST-NEW", "ST-OLD"]
+    assert [b["seats"] for b in bookings_list] == [["A1"]]
+    assert seating.reserved_seats(seat_maps["ST-OLD"]) == {"B1", "B2"}
+    assert history.aggregates.reserved_by_showtime == {"ST-OLD": 2}
+
+    store = BookingStore(showtimes, seat_maps, bookings_list, history=history)
+    assert len(store.list_customer_bookings("a@test.com")) == 2
+    assert store.aggregates.seats_by_movie == {"MV001": 3}
+    db.close()
+
+
+def test_event_log_keeps_database_in_step(tmp_path):
+    db = sqlite_storage.SqliteStorage(str(tmp_path / "cinema.db"))
+    store = BookingStore(journal=db.open_journal())
+    store.schedule_showtime(_showtime("ST-S", 1))
+    first = store.create_booking({"showtime_id": "ST-S", "seats": ["A1", "A2"], "customer": {"email": "s@test.com"}})
+    store.create_bookings_batch([{"showtime_id": "ST-S", "seats": ["B3"]}])
+    store.cancel_booking(first["id"])
+    store.journal.flush()
+
+    assert db.get_booking(first["id"])["status"] == "cancelled"
+
+    _, seat_maps, bookings_list, _ = sqlite_storage.SqliteStorage(str(tmp_path / "cinema.db")).load_state()
+    assert seating.reserved_seats(seat_maps["ST-S"]) == {"B3"}
+    assert len(bookings_list) == 1
+
+
+def test_seat_map_reset_survives_reload(tmp_path):
+    db = sqlite_storage.SqliteStorage(str(tmp_path / "cinema.db"))
+    store = BookingStore(journal=db.open_journal())
+    store.schedule_showtime(_showtime("ST-R", 1))
+    first = store.create_booking({"showtime_id": "ST-R", "seats": ["A1"], "customer": {"email": "a@test.com"}})
+    store.create_booking({"showtime_id": "ST-R", "seats": ["A2"], "customer": {"email": "b@test.com"}})
+    store.reset_seat_map("ST-R")
+    store.journal.flush()
+
+    showtimes, seat_maps, bookings_list, history = db.load_state()
+    assert seating.reserved_seats(seat_maps["ST-R"]) == set()
+    assert all(b["seats_voided"] for b in bookings_list)
+    store = BookingStore(showtimes, seat_maps, bookings_list, journal=store.journal, history=history)
+    assert store.aggregates.reserved_by_showtime.get("ST-R", 0) == 0
+    store.create_booking({"showtime_id": "ST-R", "seats": ["A1"], "customer": {"email": "c@test.com"}})
+    assert store.cancel_booking(first["id"])[0]
+    store.journal.flush()
+
+    _, seat_maps, _, _ = db.load_state()
+    assert seating.reserved_seats(seat_maps["ST-R"]) == {"A1"}
+    db.close()
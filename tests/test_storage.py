@@ -0,0 +1,106 @@
+import json
+import os
+
+import seating
+import storage
+
+
+def _state():
+    showtimes = [
+        {
+            "id": "ST-V",
+            "movie_id": "MV001",
+            "screen": "Screen 1",
+            "datetime": "2030-01-01 19:30",
+            "pricing": {"standard": 10.0},
+            "screen_config": {"rows": ["A"], "seats_per_row": 4, "premium_rows": []},
+        }
+    ]
+    seat_maps = {"ST-V": seating.initialize_seat_map(showtimes[0]["screen_config"])}
+    bookings_list = [{"id": "B1", "showtime_id": "ST-V", "seats": ["A1", "A2"], "status": "active"}]
+    return showtimes, seat_maps, bookings_list
+
+
+def test_verifier_repairs_seat_maps_from_bookings():
+    showtimes, seat_maps, bookings_list = _state()
+    seating.reserve_seat(seat_maps["ST-V"], "A2")
+    seating.reserve_seat(seat_maps["ST-V"], "A4")
+    issues = storage.verify_seat_maps(showtimes, seat_maps, bookings_list)
+    assert any("A1" in issue for issue in issues)
+    assert any("A4" in issue for issue in issues)
+    assert seating.reserved_seats(seat_maps["ST-V"]) == {"A1", "A2"}
+    assert storage.verify_seat_maps(showtimes, seat_maps, bookings_list) == []
+
+
+def test_save_writes_manifest_and_no_temp_files(tmp_path):
+    base = str(tmp_path)
+    showtimes, seat_maps, bookings_list = _state()
+    storage.save_state(base, showtimes, seat_maps, bookings_list)
+    storage.save_state(base, showtimes, seat_maps, bookings_list)
+    with open(os.path.join(base, storage.MANIFEST_FILE), encoding="utf-8") as f:
+        manifest = json.load(f)
+    assert manifest["generation"] == 2
+    assert sorted(os.listdir(base)) == ["bookings.json", "manifest.json", "showtimes.json"]
+
+
+def test_load_repairs_pair_from_different_generations(tmp_path):
+    base = str(tmp_path)
+    showtimes, seat_maps, bookings_list = _state()
+    storage.save_state(base, showtimes, seat_maps, bookings_list)
+    # simulate a crash after bookings.json of the next generation was renamed into place
+    bookings_list.append({"id": "B2", "showtime_id": "ST-V", "seats": ["A3"], "status": "active"})
+    with open(os.path.join(base, "bookings.json"), "w", encoding="utf-8") as f:
+        json.dump(bookings_list, f)
+
+    _, loaded_maps, loaded_bookings = storage.load_state(base)
+    assert len(loaded_bookings) == 2
+    assert seating.reserved_seats(loaded_maps["ST-V"]) == {"A1", "A2", "A3"}
+
+
+def test_iter_json_array_offsets_across_chunks(tmp_path):
+    path = str(tmp_path / "records.json")
+    records = [{"id": f"R{i}", "name": "Şule Çağlar" * (i % 3)} for i in range(50)]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(records, f, indent=2, ensure_ascii=False)
+    with open(path, "rb") as f:
+        raw = f.read()
+    seen = []
+    for record, start, end in storage.iter_json_array(path, chunk_size=7):
+        assert json.loads(raw[start:end]) == record
+        seen.append(record)
+    assert seen == records
+
+
+def test_lazy_load_keeps_history_on_disk(tmp_path):
+    base = str(tmp_path)
+    showtimes, seat_maps, bookings_list = _state()
+    showtimes.append(dict(showtimes[0], id="ST-OLD", datetime="2020-01-01 19:30"))
+    seat_maps["ST-OLD"] = seating.initialize_seat_map(showtimes[1]["screen_config"])
+    seating.reserve_seat(seat_maps["ST-OLD"], "A3")
+    bookings_list += [
+        {"id": "B2", "showtime_id": "ST-V", "seats": ["A4"], "status": "cancelled"},
+        {"id": "B3", "showtime_id": "ST-OLD", "seats": ["A3"], "status": "active", "customer": {"email": "o@test.com"}},
+    ]
+    storage.save_state(base, showtimes, seat_maps, bookings_list)
+
+    _, seat_maps, resident, history = storage.load_state_lazy(base)
+    assert [b["id"] for b in resident] == ["B1"]
+    assert len(history) == 2
+    assert history.get("B3")["seats"] == ["A3"]
+    assert history.aggregates.bookings_by_showtime == {"ST-OLD": 1}
+    assert seating.reserved_seats(seat_maps["ST-OLD"]) == {"A3"}
+
+    resident.append({"id": "B4", "showtime_id": "ST-V", "seats": ["A3"], "status": "active"})
+    storage.save_state(base, showtimes, seat_maps, resident, history=history)
+    assert history.get("B2")["status"] == "cancelled"
+    _, _, everything = storage.load_state(base)
+    assert sorted(b["id"] for b in everything) == ["B1", "B2", "B3", "B4"]
+    with open(os.path.join(base, "bookings.json"), encoding="utf-8") as f:
+        assert f.read() == json.dumps(everything, indent=2, ensure_ascii=False)
+
+    assert os.path.exists(os.path.join(base, storage.HISTORY_INDEX_FILE))
+    _, _, resident, history = storage.load_state_lazy(base)
+    assert sorted(b["id"] for b in resident) == ["B1", "B4"]
+    assert sorted(history.offsets) == ["B2", "B3"]
+    assert history.get("B3")["customer"]["email"] == "o@test.com"
+    assert history.aggregates.bookings_by_showtime == {"ST-OLD": 1}
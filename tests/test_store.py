@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+import seating
+from store import BookingStore
+
+
+def setup_store():
+    st_dt = (datetime.now() + timedelta(days=2)).strftime("%Y-%m-%d %H:%M")
+    showtimes = [
+        {
+            "id": "ST-IDX",
+            "movie_id": "MV001",
+            "screen": "Screen 1",
+            "datetime": st_dt,
+            "language": "OV",
+            "pricing": {"standard": 10.0, "premium": 14.0},
+            "screen_config": {"rows": ["A", "B"], "seats_per_row": 3, "premium_rows": ["A"]},
+        }
+    ]
+    seat_maps = {"ST-IDX": seating.initialize_seat_map(showtimes[0]["screen_config"])}
+    return BookingStore(showtimes, seat_maps, [])
+
+
+def test_indexes_follow_create_and_cancel():
+    store = setup_store()
+    booking = store.create_booking(
+        {"showtime_id": "ST-IDX", "seats": ["A1", "A2"], "customer": {"name": "Test", "email": "a@test.com"}}
+    )
+    assert store.get_booking(booking["id"]) is booking
+    assert store.bookings == [booking]
+    assert store.list_customer_bookings("a@test.com") == [booking]
+    assert store.bookings_for_showtime("ST-IDX") == [booking]
+
+    success, msg = store.cancel_booking(booking["id"])
+    assert success, msg
+    assert store.list_customer_bookings("a@test.com") == []
+    assert store.bookings_for_showtime("ST-IDX") == []
+    assert store.bookings_for_showtime("ST-IDX", "cancelled") == [booking]
+    assert seating.is_seat_available(store.seat_maps["ST-IDX"], "A1")
+
+
+def test_loaded_bookings_are_indexed():
+    store = setup_store()
+    booking = store.create_booking(
+        {"showtime_id": "ST-IDX", "seats": ["B1"], "customer": {"name": "Test", "email": "b@test.com"}}
+    )
+    reloaded = BookingStore(store.showtimes, store.seat_maps, list(store.bookings))
+    assert reloaded.get_booking(booking["id"]) == booking
+    assert reloaded.list_customer_bookings("b@test.com") == [booking]
+    assert reloaded.get_showtime("missing") is None
+
+
+def test_batch_booking_is_atomic_per_showtime():
+    store = setup_store()
+    store.schedule_showtime(
+        {
+            "id": "ST-B2",
+            "movie_id": "MV001",
+            "screen": "Screen 2",
+            "datetime": store.get_showtime("ST-IDX")["datetime"],
+            "pricing": {"standard": 8.0},
+            "screen_config": {"rows": ["A"], "seats_per_row": 4, "premium_rows": []},
+        }
+    )
+    results = store.create_bookings_batch(
+        [
+            {"showtime_id": "ST-IDX", "seats": ["A1", "A2"], "customer": {"email": "g@test.com"}},
+            {"showtime_id": "ST-B2", "seats": ["A1"], "customer": {"email": "g@test.com"}},
+            {"showtime_id": "ST-B2", "seats": ["A1", "A2"], "customer": {"email": "g@test.com"}},
+            {"showtime_id": "missing", "seats": ["A1"]},
+        ]
+    )
+    assert [r["ok"] for r in results] == [True, False, False, False]
+    assert results[2]["error"] == "Seats not available: A1"
+    assert results[3]["error"] == "Showtime not found"
+    assert seating.free_seat_count(store.seat_maps["ST-B2"]) == 4
+    assert store.list_customer_bookings("g@test.com") == [results[0]["booking"]]
+
+    results = store.create_bookings_batch(
+        [
+            {"showtime_id": "ST-B2", "seats": ["A3"]},
+            {"showtime_id": "ST-IDX", "seats": ["A1"]},
+        ],
+        atomic="batch",
+    )
+    assert not any(r["ok"] for r in results)
+    assert seating.is_seat_available(store.seat_maps["ST-B2"], "A3")
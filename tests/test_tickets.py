@@ -0,0 +1,78 @@
+import os
+import threading
+
+import tickets
+
+
+def _booking(n, screen="Screen 1"):
+    return {
+        "id": f"BK{n}",
+        "showtime_id": "ST-T",
+        "seats": ["A1", "A2"],
+        "status": "active",
+        "customer": {"name": "Ada", "email": "ada@test.com"},
+        "pricing": {"total": 21.6},
+        "showtime_snapshot": {"datetime": "2030-01-01 20:00", "screen": screen},
+    }
+
+
+def test_template_renders_classic_ticket(tmp_path):
+    text = tickets.render(_booking(1))
+    assert text.splitlines() == [
+        "=== MOVIE TICKET ===",
+        "Booking ID : BK1",
+        "Showtime   : 2030-01-01 20:00",
+        "Screen     : Screen 1",
+        "Seats      : A1, A2",
+        "Status     : active",
+        "Name       : Ada",
+        "Email      : ada@test.com",
+        "Total      : 21.60",
+    ]
+    pipeline = tickets.TicketPipeline(tickets.DirectorySink(str(tmp_path)))
+    handle = pipeline.submit(_booking(1))
+    assert handle.result(timeout=5) == os.path.join(str(tmp_path), "ticket_BK1.txt")
+    pipeline.close()
+    with open(handle.result(), encoding="utf-8") as f:
+        assert f.read() == text
+
+
+def test_ticket_store_batches_reissues_and_recovers(tmp_path):
+    directory = str(tmp_path)
+    pipeline = tickets.TicketPipeline(tickets.TicketStore(directory), workers=3, batch_size=16)
+    handles = [pipeline.submit(_booking(n)) for n in range(100)]
+    pipeline.flush()
+    assert all(h.done() for h in handles)
+    pipeline.reissue([_booking(7)], showtime={"datetime": "2030-01-02 21:00", "screen": "Screen 9"})
+    pipeline.close()
+
+    # a torn index line (crash mid-append) is dropped on reopen
+    with open(os.path.join(directory, tickets.INDEX_FILE), "a", encoding="utf-8") as f:
+        f.write("BK999 0")
+    store = tickets.TicketStore(directory)
+    assert len(store.index) == 100
+    assert "Screen 9" in store.read("BK7") and "2030-01-02 21:00" in store.read("BK7")
+    assert store.read("BK42") == tickets.render(_booking(42))
+    assert store.read("missing") is None
+    store.close()
+
+
+def test_reissue_beats_an_older_render_still_in_flight(tmp_path):
+    started, release = threading.Event(), threading.Event()
+
+    class SlowFirstRender(tickets.TicketTemplate):
+        def render(self, booking, showtime=None):
+            if showtime is None:  # the original ticket: stall it on its worker
+                started.set()
+                release.wait(5)
+            return super().render(booking, showtime)
+
+    pipeline = tickets.TicketPipeline(tickets.TicketStore(str(tmp_path)), template=SlowFirstRender(), workers=2)
+    original = pipeline.submit(_booking(1))
+    assert started.wait(5)
+    reissued = pipeline.submit(_booking(1), {"datetime": "2030-01-02 21:00", "screen": "Screen 9"})
+    reissued.result(5)
+    release.set()
+    assert original.result(5) == reissued.result()
+    assert "Screen 9" in pipeline.sink.read("BK1")
+    pipeline.close()
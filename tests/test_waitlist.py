@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+import seating
+import waitlist
+from server import BookingServer, HttpError
+from store import BookingStore
+
+
+def _sold_out_store():
+    showtime = {
+        "id": "ST-W",
+        "movie_id": "MV001",
+        "screen": "Screen 1",
+        "datetime": "2030-01-01 19:30",
+        "pricing": {"standard": 10.0, "premium": 15.0},
+        "screen_config": {"rows": ["A", "B"], "seats_per_row": 2, "premium_rows": ["A"]},
+    }
+    store = BookingStore([showtime], {"ST-W": seating.initialize_seat_map(showtime["screen_config"])}, [])
+    premium = store.create_booking({"showtime_id": "ST-W", "seats": ["A1", "A2"]})
+    b1 = store.create_booking({"showtime_id": "ST-W", "seats": ["B1"]})
+    store.create_booking({"showtime_id": "ST-W", "seats": ["B2"]})
+    return store, premium, b1
+
+
+def test_cancellations_are_offered_by_priority_and_zone(tmp_path):
+    store, premium, b1 = _sold_out_store()
+    clock = [1000.0]
+    store.holds.clock = lambda: clock[0]
+    path = str(tmp_path / waitlist.WAITLIST_FILE)
+    offers = []
+    queue = waitlist.Waitlist(store, path, offer_ttl=60, on_offer=offers.append, autoflush=False)
+    pair = queue.join("ST-W", 2, {"email": "pair@x.io"}, zone="premium")
+    single = queue.join("ST-W", 1, {"email": "single@x.io"})
+    vip = queue.join("ST-W", 1, {"email": "vip@x.io"}, priority=5)
+    # group commit: nothing is synced until the owner flushes
+    assert queue.pending == 3 and os.path.getsize(path) == 0
+    queue.flush()
+    assert queue.pending == 0 and os.path.getsize(path) > 0
+    assert [e["id"] for e in queue.entries("ST-W")] == [vip["id"], pair["id"], single["id"]]
+    with pytest.raises(ValueError):
+        queue.join("ST-W", 3, zone="premium")
+
+    # one standard seat frees: the 2-seat premium request cannot use it, the VIP gets it first
+    store.cancel_booking(b1["id"], cancellation_window_min=0)
+    assert [e["id"] for e in offers] == [vip["id"]] and vip["offer"]["seats"] == ["B1"]
+    assert store.seat_maps["ST-W"].status_of("B1") == "held"
+
+    # the VIP lets the offer lapse: the seat moves on to the next compatible waiter
+    clock[0] += 61
+    store.holds.expire()
+    assert queue.get(vip["id"]) is None and single["status"] == "offered"
+
+    store.cancel_booking(premium["id"], cancellation_window_min=0)
+    booking = queue.accept(pair["id"])
+    assert sorted(booking["seats"]) == ["A1", "A2"] and booking["customer"]["email"] == "pair@x.io"
+    queue.close()
+
+    # the queue survives a restart; offers are made again from scratch
+    store, _, _ = _sold_out_store()
+    reloaded = waitlist.Waitlist(store, path)
+    assert [e["id"] for e in reloaded.entries()] == [single["id"]]
+    assert reloaded.get(single["id"])["status"] == "waiting" and reloaded.position(single["id"]) == 1
+    reloaded.close()
+
+
+def test_waitlist_endpoints():
+    store, premium, _ = _sold_out_store()
+    server = BookingServer(store, [], waitlist=waitlist.Waitlist(store))
+    status, entry = server.dispatch("POST", "/showtimes/ST-W/waitlist", b'{"seats": 2, "customer": {"email": "a@x.io"}}')
+    assert status == 201 and entry["position"] == 1
+    store.cancel_booking(premium["id"], cancellation_window_min=0)
+    status, entry = server.dispatch("GET", f"/waitlist/{entry['id']}")
+    assert entry["status"] == "offered" and entry["position"] is None
+    status, booking = server.dispatch("POST", f"/waitlist/{entry['id']}/accept", b"{}")
+    assert status == 201 and booking["showtime_id"] == "ST-W"
+    with pytest.raises(HttpError):
+        server.dispatch("DELETE", f"/waitlist/{entry['id']}")
@@ -0,0 +1,335 @@
+import argparse
+import itertools
+import os
+import queue
+import string
+import threading
+from concurrent.futures import Future
+from typing import List, Dict, Iterable, Optional, Tuple
+
+import storage
+
+TICKET_TEMPLATE = "\n".join(
+    [
+        "=== MOVIE TICKET ===",
+        "Booking ID : {id}",
+        "Showtime   : {datetime}",
+        "Screen     : {screen}",
+        "Seats      : {seats}",
+        "Status     : {status}",
+        "Name       : {name}",
+        "Email      : {email}",
+        "Total      : {total:.2f}",
+    ]
+)
+STORE_FILE = "tickets.dat"
+INDEX_FILE = "tickets.idx"
+
+
+class TicketTemplate:
+    """A ticket template parsed once into literal text and (field, format spec) slots."""
+
+    def __init__(self, text: str = TICKET_TEMPLATE):
+        self.text = text
+        self._parts: List[Tuple[str, Optional[str], str]] = [
+            (literal, field, spec or "") for literal, field, spec, _ in string.Formatter().parse(text)
+        ]
+
+    def render(self, booking: Dict, showtime: Optional[Dict] = None) -> str:
+        values = ticket_fields(booking, showtime)
+        out = []
+        for literal, field, spec in self._parts:
+            out.append(literal)
+            if field is not None:
+                out.append(format(values[field], spec))
+        return "".join(out)
+
+
+def ticket_fields(booking: Dict, showtime: Optional[Dict] = None) -> Dict:
+    """Values a template can use; ``showtime`` (current record) overrides the booking's snapshot."""
+    snapshot = dict(booking.get("showtime_snapshot", {}))
+    if showtime is not None:
+        snapshot.update({key: showtime.get(key) for key in ("movie_id", "screen", "datetime", "language")})
+    customer = booking.get("customer", {})
+    return {
+        "id": booking["id"],
+        "showtime_id": booking.get("showtime_id", ""),
+        "movie_id": snapshot.get("movie_id") or "",
+        "datetime": snapshot.get("datetime") or "",
+        "screen": snapshot.get("screen") or "",
+        "language": snapshot.get("language") or "",
+        "seats": ", ".join(booking.get("seats", [])),
+        "status": booking.get("status"),
+        "name": customer.get("name", ""),
+        "email": customer.get("email", ""),
+        "phone": customer.get("phone", ""),
+        "total": booking.get("pricing", {}).get("total", 0),
+    }
+
+
+DEFAULT_TEMPLATE = TicketTemplate()
+
+
+def render(booking: Dict, showtime: Optional[Dict] = None) -> str:
+    return DEFAULT_TEMPLATE.render(booking, showtime)
+
+
+class DirectorySink:
+    """One ``ticket_<id>.txt`` file per ticket (the classic layout)."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def location(self, ticket_id: str) -> str:
+        return os.path.join(self.directory, f"ticket_{ticket_id}.txt")
+
+    def write_many(self, tickets: List[Tuple[str, str]]) -> List[str]:
+        paths = []
+        for ticket_id, text in tickets:
+            path = self.location(ticket_id)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+            paths.append(path)
+        return paths
+
+    def read(self, ticket_id: str) -> Optional[str]:
+        try:
+            with open(self.location(ticket_id), "r", encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def close(self) -> None:
+        pass
+
+
+class TicketStore:
+    """Append-only ticket file plus an append-only ``id offset length`` index.
+
+    A batch of tickets costs one data append, one index append and one
+    fsync. Re-issued tickets are appended again; the newest index entry
+    wins. Index lines pointing past the end of the data file (a crash
+    between the two appends) are ignored on open.
+    """
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, STORE_FILE)
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self.index: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self._load_index()
+        self._data = open(self.path, "ab")
+        self._index_file = open(self.index_path, "a", encoding="utf-8")
+
+    def _load_index(self) -> None:
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if not os.path.exists(self.index_path):
+            return
+        valid_bytes = 0
+        with open(self.index_path, "rb") as f:
+            for raw in f:
+                parts = raw.decode("utf-8", "replace").split()
+                if not raw.endswith(b"\n") or len(parts) != 3:
+                    break
+                valid_bytes += len(raw)
+                ticket_id, offset, length = parts[0], int(parts[1]), int(parts[2])
+                if offset + length <= size:
+                    self.index[ticket_id] = (offset, length)
+        if valid_bytes != os.path.getsize(self.index_path):
+            with open(self.index_path, "r+b") as f:
+                f.truncate(valid_bytes)
+
+    def location(self, ticket_id: str) -> str:
+        return f"{self.path}#{ticket_id}"
+
+    def write_many(self, tickets: List[Tuple[str, str]]) -> List[str]:
+        with self._lock:
+            offset = self._data.seek(0, os.SEEK_END)
+            chunks, entries = [], []
+            for ticket_id, text in tickets:
+                raw = text.encode("utf-8") + b"\n"
+                chunks.append(raw)
+                entries.append((ticket_id, offset, len(raw)))
+                offset += len(raw)
+            self._data.write(b"".join(chunks))
+            self._data.flush()
+            os.fsync(self._data.fileno())
+            self._index_file.write("".join(f"{tid} {off} {length}\n" for tid, off, length in entries))
+            self._index_file.flush()
+            for ticket_id, off, length in entries:
+                self.index[ticket_id] = (off, length)
+        return [self.location(ticket_id) for ticket_id, _ in tickets]
+
+    def read(self, ticket_id: str) -> Optional[str]:
+        entry = self.index.get(ticket_id)
+        if entry is None:
+            return None
+        offset, length = entry
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return f.read(length)[:-1].decode("utf-8")
+
+    def close(self) -> None:
+        with self._lock:
+            self._data.close()
+            self._index_file.close()
+
+
+_STOP = object()
+
+
+class TicketPipeline:
+    """Renders and writes tickets on worker threads, off the booking path.
+
+    ``submit`` queues a booking and returns a ``Future`` handle at once; the
+    handle resolves to the ticket's location once it is written. Each worker
+    takes up to ``batch_size`` queued tickets, renders them and hands the
+    whole batch to the sink in one call. Submissions are numbered: when a
+    booking is re-issued while an older render is still in flight, only the
+    newest render is written, whichever worker finishes last.
+    """
+
+    def __init__(self, sink, template: Optional[TicketTemplate] = None, workers: int = 2, batch_size: int = 64):
+        self.sink = sink
+        self.template = template or DEFAULT_TEMPLATE
+        self.batch_size = batch_size
+        self._queue: "queue.Queue" = queue.Queue()
+        self._seq = itertools.count(1)
+        # ticket id -> [newest submitted seq, renders in flight]
+        self._latest: Dict[str, List[int]] = {}
+        # serialises the newest-wins check with the sink write
+        self._lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"tickets-{n}", daemon=True) for n in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, booking: Dict, showtime: Optional[Dict] = None) -> Future:
+        handle: Future = Future()
+        handle.ticket_id = booking["id"]
+        with self._lock:
+            seq = next(self._seq)
+            latest = self._latest.setdefault(booking["id"], [0, 0])
+            latest[0] = seq
+            latest[1] += 1
+        self._queue.put((booking, showtime, handle, seq))
+        return handle
+
+    def reissue(self, bookings: Iterable[Dict], showtime: Optional[Dict] = None) -> List[Future]:
+        """Queue fresh tickets for many bookings, e.g. every booking of a changed showtime."""
+        return [self.submit(booking, showtime) for booking in bookings]
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                return
+            batch = [item]
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                self._queue.task_done()
+                return
+
+    def _write(self, batch: List[Tuple[Dict, Optional[Dict], Future, int]]) -> None:
+        rendered = []
+        for booking, showtime, handle, seq in batch:
+            if not handle.set_running_or_notify_cancel():
+                continue
+            try:
+                rendered.append((booking["id"], self.template.render(booking, showtime), handle, seq))
+            except Exception as exc:
+                handle.set_exception(exc)
+        with self._lock:
+            try:
+                # a newer render of the same ticket exists: writing this one could bury it
+                fresh = [item for item in rendered if item[3] == self._latest[item[0]][0]]
+                stale = [item for item in rendered if item[3] != self._latest[item[0]][0]]
+                if fresh:
+                    try:
+                        locations = self.sink.write_many([(ticket_id, text) for ticket_id, text, _, _ in fresh])
+                    except Exception as exc:
+                        for _, _, handle, _ in fresh:
+                            handle.set_exception(exc)
+                    else:
+                        for (_, _, handle, _), location in zip(fresh, locations):
+                            handle.set_result(location)
+                for ticket_id, _, handle, _ in stale:
+                    handle.set_result(self.sink.location(ticket_id))
+            finally:
+                for booking, _, _, _ in batch:
+                    latest = self._latest[booking["id"]]
+                    latest[1] -= 1
+                    if not latest[1]:
+                        del self._latest[booking["id"]]
+
+    def flush(self) -> None:
+        """Block until every queued ticket has been written."""
+        self._queue.join()
+
+    def close(self) -> None:
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        self.sink.close()
+
+
+def open_sink(kind: str, directory: str):
+    """``"files"`` for one text file per ticket, ``"store"`` for the append-only ticket store."""
+    if kind == "files":
+        return DirectorySink(directory)
+    if kind == "store":
+        return TicketStore(directory)
+    raise ValueError(f"Unknown ticket output: {kind}")
+
+
+def reissue_showtime(data_dir: str, showtime_id: str, sink, backend: str = "json") -> int:
+    """Re-render the tickets of every active booking of one showtime with its current details."""
+    db = storage.open_storage(backend, data_dir)
+    try:
+        showtimes, _, bookings_list, _ = db.load_state()
+    finally:
+        db.close()
+    showtime = next((st for st in showtimes if st.get("id") == showtime_id), None)
+    if showtime is None:
+        raise ValueError("Showtime not found")
+    active = [b for b in bookings_list if b.get("showtime_id") == showtime_id and b.get("status") == "active"]
+    pipeline = TicketPipeline(sink)
+    try:
+        for handle in pipeline.reissue(active, showtime):
+            handle.result()
+    finally:
+        pipeline.close()
+    return len(active)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Re-issue the tickets of a showtime")
+    parser.add_argument("showtime_id")
+    parser.add_argument("--data", default="data")
+    parser.add_argument("--backend", default="json", choices=["json", "sqlite"])
+    parser.add_argument("--out", default="tickets")
+    parser.add_argument("--output", default="files", choices=["files", "store"])
+    args = parser.parse_args()
+    count = reissue_showtime(args.data, args.showtime_id, open_sink(args.output, args.out), backend=args.backend)
+    print(f"{count} tickets re-issued")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+import heapq
+import itertools
+import json
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, List, Dict, Optional, Tuple
+
+import seating
+from journal import Journal
+
+WAITLIST_FILE = "waitlist.jsonl"
+# how long freed seats stay held for the waiter they were offered to
+OFFER_TTL = 900
+
+
+class Waitlist:
+    """Per-showtime waitlists that are offered seats as soon as they free up.
+
+    Waiters ask for a number of seats, optionally in one zone, and are
+    served by priority (higher first), then in arrival order. Each showtime
+    keeps one heap per (zone, seat count), so a match only compares the
+    heap heads and pops one entry: O(log n) per offer. An offer puts the
+    seats on a ``HoldManager`` hold; when it lapses the seats go to the
+    next waiter. The queue is an append-only JSONL log replayed on start,
+    written through a group-commit ``journal.Journal``: with ``autoflush``
+    off nothing touches the disk until ``flush``, so the HTTP server can
+    sync it from its persister task. Holds are not persisted, so offers
+    pending at shutdown are made again.
+    """
+
+    def __init__(
+        self,
+        store,
+        path: Optional[str] = None,
+        offer_ttl: int = OFFER_TTL,
+        on_offer: Optional[Callable[[Dict], None]] = None,
+        autoflush: bool = True,
+    ):
+        self.store = store
+        self.path = path
+        self.offer_ttl = offer_ttl
+        self.on_offer = on_offer
+        self._entries: Dict[str, Dict] = {}
+        # showtime id -> (zone, seat count) -> heap of (-priority, seq, entry id)
+        self._queues: Dict[str, Dict[Tuple[Optional[str], int], List[Tuple[int, int, str]]]] = {}
+        self._seq = itertools.count()
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._pending: set = set()
+        # showtime id -> hold id -> entry id of its outstanding offers
+        self._offered: Dict[str, Dict[str, str]] = {}
+        self._log: Optional[Journal] = None
+        if path:
+            self._load()
+            self._log = Journal(path, autoflush=autoflush)
+        store.seat_listeners.append(self.seats_freed)
+
+    # -- queue ---------------------------------------------------------------
+
+    def join(
+        self,
+        showtime_id: str,
+        seats: int,
+        customer: Optional[Dict] = None,
+        zone: Optional[str] = None,
+        priority: int = 0,
+    ) -> Dict:
+        """Queue a request for ``seats`` seats (in ``zone`` if given); returns the entry."""
+        showtime = self.store.get_showtime(showtime_id)
+        if not showtime:
+            raise ValueError("Showtime not found")
+        try:
+            seats = int(seats)
+        except (TypeError, ValueError):
+            raise ValueError("seats must be a number")
+        seat_map = self.store.seat_maps.get(showtime_id)
+        if seats <= 0 or (seat_map is not None and seats > self._capacity(seat_map, zone)):
+            raise ValueError("Requested seats exceed what the showtime can offer")
+        entry = {
+            "id": str(uuid.uuid4())[:10],
+            "showtime_id": showtime_id,
+            "seats": seats,
+            "zone": zone or None,
+            "priority": int(priority or 0),
+            "customer": customer or {},
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "seq": next(self._seq),
+            "status": "waiting",
+            "offer": None,
+        }
+        with self._lock:
+            self._enqueue(entry)
+            self._append({"op": "joined", "entry": _stored(entry)})
+        self.match(showtime_id)
+        return entry
+
+    def get(self, entry_id: str) -> Optional[Dict]:
+        return self._entries.get(entry_id)
+
+    def entries(self, showtime_id: Optional[str] = None, email: Optional[str] = None) -> List[Dict]:
+        """Live entries, filtered by showtime and/or customer email, in serving order."""
+        with self._lock:
+            found = [
+                e for e in self._entries.values()
+                if (showtime_id is None or e["showtime_id"] == showtime_id)
+                and (email is None or e["customer"].get("email") == email)
+            ]
+        return sorted(found, key=lambda e: (-e["priority"], e["seq"]))
+
+    def position(self, entry_id: str) -> Optional[int]:
+        """1-based place among the waiters of the same showtime; None once offered or gone."""
+        entry = self._entries.get(entry_id)
+        if entry is None or entry["status"] != "waiting":
+            return None
+        waiting = [e for e in self.entries(entry["showtime_id"]) if e["status"] == "waiting"]
+        return waiting.index(entry) + 1
+
+    def leave(self, entry_id: str) -> bool:
+        """Drop an entry; an outstanding offer's seats go to the next waiter."""
+        with self._lock:
+            entry = self._entries.get(entry_id)
+            if entry is None or entry["status"] in ("offering", "accepting"):
+                return False
+            self._remove(entry, "left")
+        if entry["offer"]:
+            # the release notifies seats_freed, which offers the seats on
+            self.store.holds.release(entry["offer"]["hold_id"])
+        return True
+
+    def accept(self, entry_id: str, **booking_fields) -> Dict:
+        """Book the seats held for an offer; returns the booking."""
+        with self._lock:
+            entry = self._entries.get(entry_id)
+            if entry is None:
+                raise ValueError("Waitlist entry not found.")
+            if entry["status"] != "offered":
+                raise ValueError("No seats have been offered yet.")
+            entry["status"] = "accepting"
+        try:
+            booking = self.store.holds.confirm(entry["offer"]["hold_id"], entry["customer"], **booking_fields)
+        except ValueError:
+            with self._lock:
+                if self.store.holds.get(entry["offer"]["hold_id"]) is not None:
+                    # the booking was rejected but the hold stands: the offer can be retried
+                    entry["status"] = "offered"
+                    raise
+                self._remove(entry, "expired")
+            raise ValueError("Offer expired.")
+        with self._lock:
+            self._remove(entry, "booked")
+        return booking
+
+    # -- matching ------------------------------------------------------------
+
+    def seats_freed(self, showtime_id: str) -> None:
+        """Store listener: seats of ``showtime_id`` were released."""
+        if getattr(self._local, "matching", False):
+            # a hold expired inside our own hold_seats call; the running match picks it up
+            self._pending.add(showtime_id)
+            return
+        self.match(showtime_id)
+
+    def match(self, showtime_id: str) -> List[Dict]:
+        """Offer free seats to compatible waiters, best first; returns the new offers."""
+        made: List[Dict] = []
+        self._local.matching = True
+        try:
+            pending = {showtime_id}
+            while pending:
+                sid = pending.pop()
+                made.extend(self._match_showtime(sid))
+                with self._lock:
+                    pending |= self._pending
+                    self._pending.clear()
+        finally:
+            self._local.matching = False
+        if self.on_offer is not None:
+            for entry in made:
+                self.on_offer(entry)
+        return made
+
+    def match_all(self) -> List[Dict]:
+        """Run the matcher for every showtime with waiters, e.g. after a restart."""
+        made: List[Dict] = []
+        for showtime_id in list(self._queues):
+            made.extend(self.match(showtime_id))
+        return made
+
+    def _match_showtime(self, showtime_id: str) -> List[Dict]:
+        made = []
+        while True:
+            with self.store.lock_for(showtime_id), self._lock:
+                picked = self._pick(showtime_id)
+            if picked is None:
+                return made
+            entry, seats = picked
+            # held outside the showtime lock: hold_seats may expire holds of other showtimes
+            try:
+                hold = self.store.holds.hold_seats(showtime_id, seats, ttl=self.offer_ttl)
+            except ValueError:
+                # taken between the pick and the hold: back to its place in line
+                with self._lock:
+                    if entry["id"] in self._entries:
+                        entry["status"] = "waiting"
+                        self._enqueue(entry)
+                continue
+            with self._lock:
+                if entry["id"] in self._entries:
+                    entry["status"] = "offered"
+                    entry["offer"] = {"hold_id": hold["id"], "seats": hold["seats"], "expires_at": hold["expires_at"]}
+                    self._offered.setdefault(showtime_id, {})[hold["id"]] = entry["id"]
+                    made.append(entry)
+                    continue
+            self.store.holds.release(hold["id"])
+
+    def _pick(self, showtime_id: str) -> Optional[Tuple[Dict, List[str]]]:
+        """Pop the best waiter whose request fits the free seats, with the seats to offer."""
+        self._drop_lapsed(showtime_id)
+        seat_map = self.store.seat_maps.get(showtime_id)
+        queues = self._queues.get(showtime_id)
+        if not queues or seat_map is None or not seat_map.free:
+            return None
+        best = None
+        for key, heap in list(queues.items()):
+            while heap and self._entries.get(heap[0][2], {}).get("status") != "waiting":
+                heapq.heappop(heap)
+            if not heap:
+                del queues[key]
+                continue
+            zone, count = key
+            if (best is None or heap[0] < best[0]) and count <= self._free_in(seat_map, zone):
+                best = (heap[0], key)
+        if not queues:
+            del self._queues[showtime_id]
+        if best is None:
+            return None
+        zone, count = best[1]
+        entry = self._entries[heapq.heappop(queues[best[1]])[2]]
+        entry["status"] = "offering"
+        return entry, seating.find_best_seats(seat_map, count, zone) or _first_free(seat_map, count, zone)
+
+    def _drop_lapsed(self, showtime_id: str) -> None:
+        """Expire this showtime's offers whose holds are gone; only its open offers are looked at."""
+        for hold_id, entry_id in list(self._offered.get(showtime_id, {}).items()):
+            entry = self._entries.get(entry_id)
+            if entry is not None and entry["status"] == "offered" and self.store.holds.get(hold_id) is None:
+                self._remove(entry, "expired")
+
+    @staticmethod
+    def _free_in(seat_map, zone: Optional[str]) -> int:
+        if zone is None:
+            return seat_map.free
+        zone_masks = seat_map.layout.zone_masks.get(zone)
+        if zone_masks is None:
+            return 0
+        return sum(bin(free & mask).count("1") for free, mask in zip(seat_map.row_free_masks(), zone_masks))
+
+    @staticmethod
+    def _capacity(seat_map, zone: Optional[str]) -> int:
+        if zone is None:
+            return len(seat_map)
+        return sum(bin(mask).count("1") for mask in seat_map.layout.zone_masks.get(zone, []))
+
+    # -- bookkeeping and persistence -----------------------------------------
+
+    def _enqueue(self, entry: Dict) -> None:
+        self._entries[entry["id"]] = entry
+        key = (entry["zone"], entry["seats"])
+        heap = self._queues.setdefault(entry["showtime_id"], {}).setdefault(key, [])
+        heapq.heappush(heap, (-entry["priority"], entry["seq"], entry["id"]))
+
+    def _remove(self, entry: Dict, reason: str) -> None:
+        # heap slots of removed entries are skipped lazily by the matcher
+        if entry["offer"]:
+            offered = self._offered.get(entry["showtime_id"], {})
+            offered.pop(entry["offer"]["hold_id"], None)
+            if not offered:
+                self._offered.pop(entry["showtime_id"], None)
+        if self._entries.pop(entry["id"], None) is not None:
+            entry["status"] = reason
+            self._append({"op": "removed", "id": entry["id"], "reason": reason})
+
+    def _append(self, event: Dict) -> None:
+        if self._log is not None:
+            self._log.append(event)
+
+    @property
+    def pending(self) -> int:
+        """Logged changes not yet on disk."""
+        return self._log.pending if self._log is not None else 0
+
+    def flush(self) -> None:
+        """Write and fsync the buffered log events as one group."""
+        if self._log is not None:
+            self._log.flush()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        removed = 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    break  # torn tail from a crash mid-write
+                if event.get("op") == "joined":
+                    entry = dict(event["entry"], status="waiting", offer=None)
+                    if self.store.get_showtime(entry["showtime_id"]):
+                        self._enqueue(entry)
+                elif event.get("op") == "removed" and self._entries.pop(event.get("id"), None) is not None:
+                    removed += 1
+        self._seq = itertools.count(max((e["seq"] for e in self._entries.values()), default=-1) + 1)
+        if removed > len(self._entries):
+            self._compact()
+
+    def _compact(self) -> None:
+        """Rewrite the log with only the live entries."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in sorted(self._entries.values(), key=lambda e: e["seq"]):
+                f.write(json.dumps({"op": "joined", "entry": _stored(entry)}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def close(self) -> None:
+        if self.seats_freed in self.store.seat_listeners:
+            self.store.seat_listeners.remove(self.seats_freed)
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+
+def _stored(entry: Dict) -> Dict:
+    return {k: v for k, v in entry.items() if k not in ("status", "offer")}
+
+
+def _first_free(seat_map, count: int, zone: Optional[str]) -> List[str]:
+    """Any ``count`` free seats (in ``zone``), in row order, when no adjacent block is left."""
+    layout = seat_map.layout
+    seats = []
+    for _, indexes in layout.row_order:
+        for i in indexes:
+            if (zone is None or layout.zones[i] == zone) and seating.is_seat_available(seat_map, layout.codes[i]):
+                seats.append(layout.codes[i])
+                if len(seats) == count:
+                    return seats
+    return seats